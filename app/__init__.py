@@ -14,21 +14,40 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from .config import Config
+from .utils.db_router import RoutingSession
 
 # Initialize SQLAlchemy ORM for database operations
-db = SQLAlchemy()
+# The routing session sends read-only requests to replicas when configured
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
-def create_app() -> Flask:
+def create_app(config_class: type = Config) -> Flask:
     """
     Application factory function that creates and configures the Flask application.
     
     This function initializes the Flask application with the following components:
     - Database configuration and initialization
+    - Connection pool instrumentation
+    - Read-replica routing for read-only endpoints
+    - Request timing (Server-Timing header and Prometheus metrics)
+    - Slow-query log and per-request query budget (N+1 detection)
+    - Opt-in request capture for traffic replay
+    - Opt-in sampled or on-demand request profiling
     - CORS (Cross-Origin Resource Sharing) support
-    - Static file serving for uploads
+    - Password hashing worker pool
+    - User read cache
+    - Image serving with proxy offload, ranges and long-lived caching
+    - Content-addressed image storage
+    - Resumable (tus-style) image uploads
+    - Background image derivative (thumbnail) generation
+    - Deferred image deletion and the ``flask uploads-gc`` sweeper
+    - User change feed sequencing and the ``flask changes-prune`` command
     - API blueprints and routes
     
+    Args:
+        config_class (type): Configuration class to load (default: Config).
+            Tests pass a subclass pointing at a local SQLite database.
+    
     Returns:
         Flask: Configured Flask application instance ready for running.
         
@@ -38,34 +57,108 @@ def create_app() -> Flask:
     # Get the base directory path (project root)
     base_dir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
 
-    # Define uploads directory path for storing user-uploaded files
-    uploads_path = os.path.join(base_dir, 'uploads')
-
-    # Create Flask app instance with static file configuration
-    app = Flask(
-        __name__,
-        static_url_path='/uploads',
-        static_folder=uploads_path
-    )
+    # Create Flask app instance; uploaded images are served by the media
+    # routes (app/routes/media.py) rather than a static folder
+    app = Flask(__name__, static_folder=None)
 
-    # Configure upload folder for user profile images
-    app.config['UPLOAD_FOLDER'] = 'uploads/photos'
-    
-    # Create uploads directory if it doesn't exist
-    if not os.path.exists(app.config['UPLOAD_FOLDER']):
-        os.makedirs(app.config['UPLOAD_FOLDER'])
-    
     # Load configuration from Config class
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
+
+    # Validate and stream file uploads to disk while the body is parsed
+    from .utils.uploads import UploadRequest
+    app.request_class = UploadRequest
+
+    # Resolve the upload folder against the project root and set up the
+    # content-addressed image storage (creates the directory if needed)
+    from .utils.file_handler import init_image_storage, resolve_upload_folder
+    app.config['UPLOAD_FOLDER'] = resolve_upload_folder(app, base_dir)
+    storage = init_image_storage(app, app.config['UPLOAD_FOLDER'])
+
+    # Keep resumable upload sessions next to the image storage
+    from .utils.resumable import init_resumable_uploads
+    init_resumable_uploads(app, storage)
+
+    # Generate resized image derivatives on a background process pool
+    from .utils.thumbnails import init_thumbnail_pipeline
+    init_thumbnail_pipeline(app, storage)
 
     # Enable CORS for all routes to allow cross-origin requests
     CORS(app)
     
-    # Initialize database with Flask app
+    # Use the instrumented connection pool, then initialize the database
+    from .utils.pool_metrics import engine_options_with_instrumentation, init_pool_metrics
+    from .utils.db_router import init_replica_routing, replica_binds
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options_with_instrumentation(
+        app.config["SQLALCHEMY_DATABASE_URI"],
+        app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    )
+
+    # Register read replicas as extra binds with the primary's pool settings
+    app.config["SQLALCHEMY_BINDS"] = {
+        **app.config.get("SQLALCHEMY_BINDS", {}),
+        **replica_binds(
+            app.config["SQLALCHEMY_REPLICA_URIS"],
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"],
+            engine_options_with_instrumentation
+        )
+    }
     db.init_app(app)
 
+    # Collect pool statistics and route read-only requests to replicas
+    with app.app_context():
+        init_pool_metrics(app, db.engines)
+        init_replica_routing(app, db.engines)
+
+        # Time every request and count the SQL statements it issues
+        from .utils.request_metrics import init_request_metrics
+        init_request_metrics(app, db.engines)
+
+        # Log slow statements and check each request's query budget
+        from .utils.query_log import init_query_monitor
+        init_query_monitor(app)
+
+    # Record API traffic for replay when REQUEST_CAPTURE_ENABLED is set
+    from .utils.capture import init_request_capture
+    init_request_capture(app, base_dir)
+
+    # Profile sampled or token-tagged requests when REQUEST_PROFILING_ENABLED is set
+    from .utils.profiling import init_request_profiling
+    init_request_profiling(app, base_dir)
+
+    # Set up the bounded process pool used for password hashing
+    from .utils.password_hasher import init_password_hasher
+    init_password_hasher(app)
+
+    # Delete released images after commit and register `flask uploads-gc`
+    from .utils.file_gc import init_image_deletion
+    init_image_deletion(app, storage)
+
+    # Stamp user changes for the change feed and register `flask changes-prune`
+    from .utils.changes import init_change_feed
+    init_change_feed(app)
+
+    # Set up the read-through cache for single-user lookups
+    from .utils.cache import init_user_cache
+    init_user_cache(app)
+
     # Register user management blueprint
     from .routes.users import users_bp
     app.register_blueprint(users_bp, url_prefix="/api/users")
 
+    # Register resumable upload routes
+    from .routes.uploads import uploads_bp
+    app.register_blueprint(uploads_bp, url_prefix="/api/uploads")
+
+    # Register image routes (/uploads/photos/<name>, /uploads/<size>/<name>)
+    from .routes.media import media_bp
+    app.register_blueprint(media_bp, url_prefix="/uploads")
+
+    # Register internal operations blueprint (cache and runtime stats)
+    from .routes.internal import internal_bp
+    app.register_blueprint(internal_bp, url_prefix="/internal")
+
+    # Register Prometheus metrics endpoint
+    from .routes.metrics import metrics_bp
+    app.register_blueprint(metrics_bp)
+
     return app
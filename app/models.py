@@ -1,13 +1,18 @@
 """
 Database Models Module
 
-This module defines the SQLAlchemy ORM models for the application.
-Currently contains the User model for user management.
+This module defines the SQLAlchemy ORM models for the application:
+the User model for user management, plus the tombstones and sequence
+counter behind the user change feed.
 
 Author: Backend API Team
 Version: 1.0.0
 """
 
+from datetime import datetime
+
+from sqlalchemy import DDL, Index, event, func
+
 from . import db
 
 
@@ -24,7 +29,12 @@ class User(db.Model):
         last_name (str): User's last name (max 100 characters)
         email (str): User's email address (must be unique)
         password (str): User's password (hashed in production)
-        image (str): Filename of user's profile image (optional)
+        image (str): Stored name of user's profile image (optional)
+        version (int): Row version, incremented by every ORM update and
+            used to build ETags for conditional GET requests
+        change_seq (int): Change feed position of the last change to a
+            public field (see ``utils.changes``)
+        updated_at (datetime): UTC time of the last update
     
     Example:
         user = User(
@@ -40,6 +50,9 @@ class User(db.Model):
     
     __tablename__ = "users"
 
+    # Columns exposed through the API (password is intentionally excluded)
+    PUBLIC_FIELDS = ("id", "first_name", "last_name", "email", "image")
+
     # Primary key
     id = db.Column(db.Integer, primary_key=True)
     
@@ -54,16 +67,67 @@ class User(db.Model):
     # Increase column length to accommodate hashed values
     password = db.Column(db.String(1000), nullable=False)
     
-    # Optional profile image filename
-    image = db.Column(db.String(200))
+    # Optional profile image name (content-addressed, e.g. "ab/cd/<sha256>.png")
+    # Indexed because blob reference counts are computed from this column
+    image = db.Column(db.String(200), index=True)
+
+    # Row version for optimistic concurrency and ETags
+    # The ORM increments it on every flush that updates the row; Core
+    # UPDATE statements must bump it explicitly
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    # Change feed position, stamped from ChangeSequence at commit after every
+    # change to a public field; indexed so GET /api/users/changes is a range scan
+    change_seq = db.Column(db.BigInteger, nullable=False, default=0, server_default="0", index=True)
 
-    def to_dict(self) -> dict:
+    # Last update time (UTC), maintained for Core and ORM statements alike
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (
+        # Case-insensitive email lookups (?email=). SQL Server has no
+        # expression indexes; its default collation is case-insensitive, so
+        # the unique index on email serves the same queries there
+        Index("ix_users_email_lower", func.lower(email)).ddl_if(
+            dialect=("sqlite", "postgresql", "mysql")
+        ),
+        # Filtering and sorting by name (?last_name=, ?sort=last_name)
+        Index("ix_users_last_first", last_name, first_name),
+        # Full-text search (?q=) on MySQL; SQLite uses the FTS5 table below
+        Index(
+            "ix_users_fulltext", first_name, last_name, email, mysql_prefix="FULLTEXT"
+        ).ddl_if(dialect="mysql"),
+    )
+
+    @classmethod
+    def public_columns(cls, fields=None) -> list:
+        """
+        Return the column attributes for a subset of the public fields.
+        
+        Used to build Core ``select()`` projections that skip ORM instance
+        construction entirely.
+        
+        Args:
+            fields (Iterable[str], optional): Field names (default: PUBLIC_FIELDS)
+        
+        Returns:
+            list: Column attributes in the given order
+        """
+        return [getattr(cls, field) for field in (fields or cls.PUBLIC_FIELDS)]
+
+    def to_dict(self, fields=None) -> dict:
         """
         Convert user object to dictionary representation.
         
         This method is used for JSON serialization in API responses.
         Note: Password is intentionally excluded for security reasons.
         
+        Args:
+            fields (Iterable[str], optional): Subset of PUBLIC_FIELDS to include
+        
         Returns:
             dict: Dictionary containing user data
                 - id: User identifier
@@ -72,10 +136,77 @@ class User(db.Model):
                 - email: User's email address
                 - image: User's profile image filename or None
         """
-        return {
-            "id": self.id,
-            "first_name": self.first_name,
-            "last_name": self.last_name,
-            "email": self.email,
-            "image": self.image
-        }
+        return {field: getattr(self, field) for field in (fields or self.PUBLIC_FIELDS)}
+
+
+# SQLite full-text index for ?q= searches: an external-content FTS5 table
+# kept in sync with users by triggers. SQL Server uses a full-text index
+# created by a migration (see README).
+SQLITE_FULLTEXT_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "first_name, last_name, email, content='users', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, first_name, last_name, email) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, first_name, last_name, email) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update "
+    "AFTER UPDATE OF first_name, last_name, email ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, first_name, last_name, email) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); "
+    "INSERT INTO users_fts(rowid, first_name, last_name, email) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email); END",
+)
+
+for _statement in SQLITE_FULLTEXT_DDL:
+    event.listen(User.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    User.__table__, "after_drop",
+    DDL("DROP TABLE IF EXISTS users_fts").execute_if(dialect="sqlite")
+)
+
+
+class UserTombstone(db.Model):
+    """
+    Record of a deleted user, so change feed clients learn about deletes.
+
+    Attributes:
+        change_seq (int): Change feed position of the delete (primary key)
+        user_id (int): ID of the deleted user
+        deleted_at (datetime): UTC time of the delete
+    """
+
+    __tablename__ = "user_tombstones"
+
+    change_seq = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class ChangeSequence(db.Model):
+    """
+    Single-row counter handing out change feed positions.
+
+    Writers increment ``value`` as the last statement before committing,
+    which locks the row until the commit completes. Positions therefore
+    become visible in increasing order.
+
+    Attributes:
+        id (int): Always 1
+        value (int): Last position handed out
+        pruned_through (int): Highest position of a pruned tombstone; feed
+            cursors older than this must resync
+    """
+
+    __tablename__ = "change_sequence"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    pruned_through = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+event.listen(
+    ChangeSequence.__table__, "after_create",
+    DDL("INSERT INTO change_sequence (id, value, pruned_through) VALUES (1, 0, 0)")
+)
@@ -0,0 +1,237 @@
+"""
+Internal Operations Routes Module
+
+This module defines endpoints used by operators to inspect the running
+application. They are not part of the public API and should not be exposed
+through the public load balancer.
+
+Endpoints:
+    GET    /internal/cache      - User cache hit/miss/eviction counters
+    GET    /internal/pool       - Database connection pool statistics
+    GET    /internal/replicas   - Read replica health
+    GET    /internal/thumbnails - Image derivative queue depth and job counters
+    GET    /internal/deletions  - Deferred image deletion queue depth and counters
+    GET    /internal/capture    - Request capture queue depth and counters
+    GET    /internal/slow-queries - Recent slow statements and query budget counters
+    GET    /internal/profiles   - Stored request profiles, newest first
+    GET    /internal/profiles/<name> - Download a profile (pstats file or text report)
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+from flask import Blueprint, current_app, jsonify, request, send_file
+from ..utils.cache import get_user_cache
+from ..utils.capture import get_request_capture
+from ..utils.pool_metrics import pool_stats
+from ..utils.profiling import get_request_profiler
+from ..utils.query_log import get_query_monitor
+from ..utils.thumbnails import get_thumbnail_pipeline
+
+# Create Blueprint for internal operations routes
+internal_bp = Blueprint("internal", __name__)
+
+
+@internal_bp.route("/cache", methods=["GET"])
+def cache_stats():
+    """
+    Report user cache counters for this process.
+    
+    Returns:
+        tuple: JSON response with cache statistics and HTTP status code
+            - 200: {"hits": ..., "misses": ..., "evictions": ..., ...}
+    """
+    return jsonify(get_user_cache().stats()), 200
+
+
+@internal_bp.route("/pool", methods=["GET"])
+def connection_pool_stats():
+    """
+    Report connection pool statistics for this process.
+    
+    Includes the configured size and overflow, connections currently
+    checked out, overflow in use, checkout timeouts and a histogram of
+    time spent waiting for a connection.
+    
+    Returns:
+        tuple: JSON response keyed by bind ("default" for the primary)
+            - 200: Pool statistics
+    """
+    return jsonify(pool_stats()), 200
+
+
+@internal_bp.route("/replicas", methods=["GET"])
+def replica_status():
+    """
+    Report read replica health for this process.
+    
+    Returns:
+        tuple: JSON response keyed by replica bind and HTTP status code
+            - 200: {"replica_0": {"healthy": true, "ejected_for": 0.0}, ...};
+              empty when no replicas are configured
+    """
+    router = current_app.extensions.get("replica_router")
+    return jsonify(router.status() if router is not None else {}), 200
+
+
+@internal_bp.route("/thumbnails", methods=["GET"])
+def thumbnail_stats():
+    """
+    Report image derivative queue depth and job counters for this process.
+    
+    Returns:
+        tuple: JSON response and HTTP status code
+            - 200: {"enabled": true, "queued": ..., "completed": ..., "failed": ...,
+              "retries": ..., ...}; only {"enabled": false} when disabled
+    """
+    pipeline = get_thumbnail_pipeline()
+    if pipeline is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **pipeline.stats()}), 200
+
+
+@internal_bp.route("/deletions", methods=["GET"])
+def deletion_stats():
+    """
+    Report the deferred image deletion queue for this process.
+    
+    Returns:
+        tuple: JSON response and HTTP status code
+            - 200: {"queued": ..., "deleted": ..., "kept": ..., "errors": ...}
+    """
+    return jsonify(current_app.extensions["image_deletion_queue"].stats()), 200
+
+
+@internal_bp.route("/capture", methods=["GET"])
+def capture_stats():
+    """
+    Report request capture counters for this process.
+    
+    Returns:
+        tuple: JSON response and HTTP status code
+            - 200: {"enabled": true, "path": ..., "queued": ..., "captured": ...,
+              "dropped": ..., "errors": ...}; only {"enabled": false} when disabled
+    """
+    capture = get_request_capture()
+    if capture is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **capture.stats()}), 200
+
+
+@internal_bp.route("/slow-queries", methods=["GET"])
+def slow_query_log():
+    """
+    Report the most recent slow SQL statements of this process.
+    
+    Statements are shown normalized, with parameter types instead of
+    values, together with the route and application stack that issued them.
+    
+    Returns:
+        tuple: JSON response and HTTP status code
+            - 200: {"slow_query_ms": ..., "slow_queries": ..., "budget_violations": ...,
+              "recent": [{"duration_ms": ..., "statement": ..., "parameters": ...,
+              "route": ..., "stack": [...]}]}
+    """
+    monitor = get_query_monitor()
+    return jsonify({**monitor.stats(), "recent": monitor.recent_slow_queries()}), 200
+
+
+def _profile_access_denied(profiler):
+    """
+    Build the 403 response for a profile request without a valid token.
+    
+    Args:
+        profiler (RequestProfiler): Profiler of the application
+    
+    Returns:
+        tuple | None: (JSON response, 403), or None if access is allowed
+    """
+    if not profiler.token:
+        return jsonify({"error": "Set REQUEST_PROFILING_TOKEN to read profiles"}), 403
+    if not profiler.requested():
+        return jsonify({"error": "Missing or invalid X-Profile-Token"}), 403
+    return None
+
+
+@internal_bp.route("/profiles", methods=["GET"])
+def list_profiles():
+    """
+    List the request profiles stored by this deployment, newest first.
+    
+    The request must carry REQUEST_PROFILING_TOKEN in ``X-Profile-Token``:
+    profiles expose source paths and call graphs. While no token is
+    configured, profiles cannot be read at all.
+    
+    Query Parameters:
+        endpoint (str, optional): Only list profiles of this endpoint, e.g. users.get_user
+    
+    Returns:
+        tuple: JSON response and HTTP status code
+            - 200: {"enabled": true, "profiles": [{"name": ..., "created_at": ...,
+              "method": ..., "endpoint": ..., "duration_ms": ..., "size": ...}],
+              "written": ..., ...}; only {"enabled": false} when disabled
+            - 403: Missing or invalid X-Profile-Token, or no token configured
+    """
+    profiler = get_request_profiler()
+    if profiler is None:
+        return jsonify({"enabled": False}), 200
+    denied = _profile_access_denied(profiler)
+    if denied is not None:
+        return denied
+    return jsonify({
+        "enabled": True,
+        **profiler.stats(),
+        "profiles": profiler.list_profiles(request.args.get("endpoint")),
+    }), 200
+
+
+@internal_bp.route("/profiles/<name>", methods=["GET"])
+def download_profile(name: str):
+    """
+    Download a stored request profile.
+    
+    The default is the binary pstats file, readable with ``python -m pstats``
+    or snakeviz. ``?format=text`` returns a report of the slowest functions.
+    Requires ``X-Profile-Token``, and is refused while REQUEST_PROFILING_TOKEN
+    is not set.
+    
+    Args:
+        name (str): Profile name from GET /internal/profiles
+    
+    Query Parameters:
+        format (str, optional): "pstats" (default) or "text"
+        sort (str, optional): pstats sort key for text reports (default: cumulative)
+        limit (int, optional): Functions in text reports (default: 50)
+    
+    Returns:
+        Response: Profile file or text report
+            - 200: Profile
+            - 400: Unknown format or sort key
+            - 403: Missing or invalid X-Profile-Token, or no token configured
+            - 404: Profiling disabled or unknown profile
+    """
+    profiler = get_request_profiler()
+    denied = _profile_access_denied(profiler) if profiler is not None else None
+    if denied is not None:
+        return denied
+    path = profiler.path_of(name) if profiler is not None else None
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+
+    output = request.args.get("format", "pstats")
+    if output == "pstats":
+        return send_file(
+            path, mimetype="application/octet-stream", as_attachment=True, download_name=name
+        )
+    if output != "text":
+        return jsonify({"error": "format must be pstats or text"}), 400
+
+    try:
+        report = profiler.render_text(
+            path,
+            sort=request.args.get("sort", "cumulative"),
+            limit=request.args.get("limit", 50, type=int),
+        )
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    return current_app.response_class(report, mimetype="text/plain"), 200
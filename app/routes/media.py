@@ -0,0 +1,155 @@
+"""
+Media Routes Module
+
+This module serves stored profile images and their resized derivatives.
+
+Endpoints:
+    GET    /uploads/photos/<name>   - Original image ``name``
+    GET    /uploads/<size>/<name>   - Image ``name`` resized to ``size`` pixels
+
+``name`` is the value of ``User.image`` (``ab/cd/<sha256>.<ext>``) and
+``size`` one of THUMBNAIL_SIZES. Until a derivative has been generated, the
+original image is served with ``Cache-Control: no-cache`` and a job is
+queued, so clients pick up the derivative on a later request.
+
+Image bytes are meant to be sent by the front proxy: with IMAGE_OFFLOAD set
+to ``x-sendfile`` (Apache, lighttpd) or ``x-accel-redirect`` (nginx) the
+worker only answers with headers. Without offload, Werkzeug serves the file
+through the server's ``wsgi.file_wrapper``. ``Range`` requests and
+``If-None-Match``/``If-Modified-Since`` validation are supported either way.
+Content-addressed names never change content, so they are served with a
+one-year ``Cache-Control: immutable`` and their digest as the ETag.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import mimetypes
+import os
+
+from flask import Blueprint, Response, abort, current_app, request
+from werkzeug.utils import send_file
+from ..utils.file_gc import INTERNAL_DIRS
+from ..utils.file_handler import ImageStorage, get_image_storage
+from ..utils.thumbnails import get_thumbnail_pipeline
+
+# Create Blueprint for image routes
+media_bp = Blueprint("media", __name__)
+
+
+def _resolve(name: str) -> str:
+    """Return the absolute path of a stored file, aborting with 404 if absent."""
+    # Temp files, upload sessions and derivatives live in dot directories
+    # next to the images; none of them may be fetched by name
+    segments = name.replace("\\", "/").split("/")
+    if segments[0] in INTERNAL_DIRS or any(segment.startswith(".") for segment in segments):
+        abort(404)
+    try:
+        path = get_image_storage().path_for(name)
+    except ValueError:
+        abort(404)
+    if not os.path.isfile(path):
+        abort(404)
+    return path
+
+
+def _send_image(name: str, path: str, cacheable: bool = True) -> Response:
+    """
+    Build the response for a stored image file.
+
+    Args:
+        name (str): Name relative to the storage root
+        path (str): Absolute path of the file
+        cacheable (bool): False to force revalidation (``no-cache``), used
+            while a derivative is served by its original
+
+    Returns:
+        Response: File response, or a header-only response for the proxy
+    """
+    config = current_app.config
+    immutable = cacheable and ImageStorage.is_content_addressed(name)
+    if immutable:
+        # The digest in the name is a strong validator; no need to hash again
+        etag = os.path.splitext(os.path.basename(name))[0]
+        max_age = config["IMAGE_IMMUTABLE_MAX_AGE"]
+    else:
+        etag = True
+        max_age = config["IMAGE_MAX_AGE"] if cacheable else None
+
+    offload = config["IMAGE_OFFLOAD"]
+    if offload == "x-accel-redirect":
+        response = Response(mimetype=mimetypes.guess_type(path)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = config["IMAGE_ACCEL_REDIRECT_PREFIX"] + name
+        response.last_modified = os.stat(path).st_mtime
+        if etag is True:
+            response.add_etag()
+        else:
+            response.set_etag(etag)
+        if max_age is not None:
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+        response.make_conditional(request.environ)
+    else:
+        response = send_file(
+            path,
+            request.environ,
+            etag=etag,
+            max_age=max_age,
+            use_x_sendfile=offload == "x-sendfile",
+            response_class=current_app.response_class,
+        )
+
+    if immutable:
+        response.cache_control.immutable = True
+    if not cacheable:
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+    return response
+
+
+@media_bp.route("/photos/<path:name>", methods=["GET"])
+def get_image(name: str):
+    """
+    Serve a stored original image.
+
+    Args:
+        name (str): Stored image name
+
+    Returns:
+        Response: Image file
+            - 200: Image (206 for ranges, 304 when the client copy is current)
+            - 404: Unknown image
+    """
+    return _send_image(name, _resolve(name))
+
+
+@media_bp.route("/<int:size>/<path:name>", methods=["GET"])
+def get_image_derivative(size: int, name: str):
+    """
+    Serve a resized derivative of a stored image.
+
+    Args:
+        size (int): Longest edge in pixels, one of THUMBNAIL_SIZES
+        name (str): Stored image name
+
+    Returns:
+        Response: Image file
+            - 200: Derivative, or the original while it is being generated
+            - 404: Unknown size or image
+    """
+    if size not in current_app.config["THUMBNAIL_SIZES"]:
+        abort(404)
+    original = _resolve(name)
+
+    pipeline = get_thumbnail_pipeline()
+    if pipeline is not None:
+        derivative_name = pipeline.storage.derivative_name(name, size, pipeline.image_format)
+        derivative = pipeline.storage.path_for(derivative_name)
+        if os.path.isfile(derivative):
+            return _send_image(derivative_name, derivative)
+
+        # Covers images stored before the pipeline existed
+        pipeline.enqueue(name)
+
+    # Fall back to the original; it must not be cached in place of the derivative
+    return _send_image(name, original, cacheable=False)
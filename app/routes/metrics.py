@@ -0,0 +1,79 @@
+"""
+Metrics Routes Module
+
+This module exposes runtime metrics in the Prometheus text format.
+
+Endpoints:
+    GET    /metrics             - Request latency histograms, pool and thumbnail gauges
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+from flask import Blueprint, Response
+from ..utils.pool_metrics import pool_stats
+from ..utils.request_metrics import get_request_metrics
+from ..utils.thumbnails import get_thumbnail_pipeline
+
+# Create Blueprint for the metrics endpoint
+metrics_bp = Blueprint("metrics", __name__)
+
+# Prometheus text exposition format content type
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Connection pool metrics exported from pool_stats()
+POOL_METRICS = (
+    ("db_pool_checked_out", "gauge", "checked_out"),
+    ("db_pool_overflow_in_use", "gauge", "overflow_in_use"),
+    ("db_pool_pool_size", "gauge", "pool_size"),
+    ("db_pool_timeouts_total", "counter", "timeouts"),
+)
+
+# Image derivative pipeline metrics exported from ThumbnailPipeline.stats()
+THUMBNAIL_METRICS = (
+    ("thumbnail_queue_depth", "gauge", "queued"),
+    ("thumbnail_jobs_completed_total", "counter", "completed"),
+    ("thumbnail_jobs_failed_total", "counter", "failed"),
+    ("thumbnail_job_retries_total", "counter", "retries"),
+)
+
+
+def _pool_lines() -> list:
+    """Render connection pool statistics per bind."""
+    stats = pool_stats()
+    lines = []
+    for name, metric_type, key in POOL_METRICS:
+        lines.append(f"# TYPE {name} {metric_type}")
+        for bind, values in stats.items():
+            if key in values:
+                lines.append(f'{name}{{bind="{bind}"}} {values[key]}')
+    return lines
+
+
+def _thumbnail_lines() -> list:
+    """Render image derivative pipeline statistics, if the pipeline is enabled."""
+    pipeline = get_thumbnail_pipeline()
+    if pipeline is None:
+        return []
+    stats = pipeline.stats()
+    lines = []
+    for name, metric_type, key in THUMBNAIL_METRICS:
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {stats[key]}")
+    return lines
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """
+    Report request, connection pool and image derivative metrics for this process.
+    
+    Latency histograms are labelled by endpoint, method and status code.
+    
+    Returns:
+        Response: Prometheus text exposition format
+            - 200: Metrics text
+    """
+    lines = _pool_lines() + _thumbnail_lines()
+    body = get_request_metrics().render_prometheus() + "\n".join(lines) + "\n"
+    return Response(body, mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
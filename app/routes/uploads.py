@@ -0,0 +1,159 @@
+"""
+Resumable Upload Routes Module
+
+This module exposes resumable image uploads following the core tus 1.0
+protocol (creation, offset query, chunk append and termination).
+
+Endpoints:
+    POST   /api/uploads/        - Start an upload (``Upload-Length`` header)
+    HEAD   /api/uploads/<id>    - Current ``Upload-Offset`` of an upload
+    PATCH  /api/uploads/<id>    - Append a chunk at ``Upload-Offset``
+    DELETE /api/uploads/<id>    - Abandon an upload
+
+Once ``Upload-Offset`` equals ``Upload-Length`` the upload is complete and
+its ID can be sent as the ``upload_id`` form field of
+``POST /api/users/`` or ``PUT /api/users/<id>`` instead of an inline image.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+from flask import Blueprint, Response, jsonify, request, url_for
+from werkzeug.exceptions import BadRequest, HTTPException, NotFound, UnsupportedMediaType
+from werkzeug.http import http_date
+from ..utils.resumable import get_resumable_uploads
+
+# Create Blueprint for resumable upload routes
+uploads_bp = Blueprint("uploads", __name__)
+
+# Protocol version implemented by these routes
+TUS_VERSION = "1.0.0"
+
+# Content type required for PATCH bodies
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def _int_header(name: str) -> int:
+    """Return a non-negative integer request header, or abort with 400."""
+    value = request.headers.get(name, "")
+    if not value.isdigit():
+        raise BadRequest(f"Missing or invalid {name} header")
+    return int(value)
+
+
+@uploads_bp.after_request
+def add_tus_headers(response):
+    """Advertise the protocol version and keep offsets out of caches."""
+    response.headers["Tus-Resumable"] = TUS_VERSION
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@uploads_bp.errorhandler(HTTPException)
+def upload_error(error):
+    """
+    Return protocol errors as JSON.
+
+    Returns:
+        tuple: JSON error response and the HTTP status code of ``error``
+    """
+    return jsonify({"error": error.description}), error.code
+
+
+@uploads_bp.route("/", methods=["POST"])
+def create_upload():
+    """
+    Start a resumable upload.
+
+    Headers:
+        - Upload-Length (int, required): Total size of the image in bytes
+
+    Returns:
+        Response: Empty response with ``Location`` and ``Upload-Offset: 0``
+            - 201: Upload created
+            - 400: Missing Upload-Length
+            - 413: Upload-Length exceeds MAX_IMAGE_UPLOAD_SIZE
+    """
+    uploads = get_resumable_uploads()
+    upload_id = uploads.create(_int_header("Upload-Length"))
+    state = uploads.status(upload_id)
+
+    response = Response(status=201)
+    response.headers["Location"] = url_for("uploads.get_upload_offset", upload_id=upload_id)
+    response.headers["Upload-Offset"] = "0"
+    response.headers["Upload-Expires"] = http_date(state["expires"])
+    response.headers["Tus-Max-Size"] = str(uploads.max_size)
+    return response
+
+
+@uploads_bp.route("/<upload_id>", methods=["HEAD"])
+def get_upload_offset(upload_id: str):
+    """
+    Report how many bytes of an upload the server has.
+
+    Args:
+        upload_id (str): Upload ID
+
+    Returns:
+        Response: Empty response with ``Upload-Offset`` and ``Upload-Length``
+            - 200: Upload found
+            - 404: Unknown or expired upload
+    """
+    state = get_resumable_uploads().status(upload_id)
+    response = Response(status=200)
+    response.headers["Upload-Offset"] = str(state["offset"])
+    response.headers["Upload-Length"] = str(state["length"])
+    response.headers["Upload-Expires"] = http_date(state["expires"])
+    return response
+
+
+@uploads_bp.route("/<upload_id>", methods=["PATCH"])
+def append_chunk(upload_id: str):
+    """
+    Append a chunk to an upload.
+
+    Headers:
+        - Content-Type: application/offset+octet-stream
+        - Upload-Offset (int, required): Offset the chunk starts at
+
+    Args:
+        upload_id (str): Upload ID
+
+    Returns:
+        Response: Empty response with the new ``Upload-Offset``
+            - 204: Chunk stored
+            - 400: Missing Upload-Offset
+            - 404: Unknown or expired upload
+            - 409: Upload-Offset does not match the server's offset
+            - 413: Chunk goes past Upload-Length
+            - 415: Wrong content type, or the data is not a PNG/JPEG image
+    """
+    if request.mimetype != CHUNK_CONTENT_TYPE:
+        raise UnsupportedMediaType(f"Content-Type must be {CHUNK_CONTENT_TYPE}")
+
+    uploads = get_resumable_uploads()
+    offset = uploads.append(
+        upload_id, _int_header("Upload-Offset"), request.stream, request.content_length
+    )
+
+    response = Response(status=204)
+    response.headers["Upload-Offset"] = str(offset)
+    return response
+
+
+@uploads_bp.route("/<upload_id>", methods=["DELETE"])
+def delete_upload(upload_id: str):
+    """
+    Abandon an upload and free its storage.
+
+    Args:
+        upload_id (str): Upload ID
+
+    Returns:
+        Response: Empty response
+            - 204: Upload removed
+            - 404: Unknown upload
+    """
+    if not get_resumable_uploads().delete(upload_id):
+        raise NotFound("Unknown upload")
+    return Response(status=204)
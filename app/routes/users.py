@@ -5,45 +5,159 @@ This module defines all RESTful API endpoints for user management operations.
 Implements CRUD (Create, Read, Update, Delete) operations for user accounts.
 
 Endpoints:
-    GET    /api/users/          - Retrieve all users
+    GET    /api/users/          - Retrieve users (cursor paginated, ?q=/?sort= search,
+                                  or ?ids=1,2,3)
+    POST   /api/users/lookup    - Retrieve many users by id (JSON list of ids)
     GET    /api/users/<id>      - Retrieve a specific user by ID
+    GET    /api/users/export    - Stream all users as NDJSON or CSV
+    GET    /api/users/changes   - Users changed or deleted since a cursor (poll, long poll or SSE)
     POST   /api/users/          - Create a new user
+    POST   /api/users/bulk      - Create many users from JSON or NDJSON
+    POST   /api/users/bulk-delete - Delete many users by id or filter
     PUT    /api/users/<id>      - Update an existing user
+    PATCH  /api/users/<id>      - Partially update a user (JSON, single UPDATE)
     DELETE /api/users/<id>      - Delete a user
 
+Read-only endpoints are decorated with ``read_only`` and may be served
+from a read replica when DATABASE_REPLICA_URLS is configured.
+
 Author: Backend API Team
 Version: 1.0.0
 """
 
 from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
 from ..models import User
 from .. import db
 from ..services.user_service import (
     create_user_service,
     update_user_service,
+    patch_user_service,
     delete_user_service,
     get_all_users_service,
+    get_users_by_ids_service,
     get_user_service
 )
+from ..services.export_service import export_users_service
+from ..services.change_service import get_user_changes_service
+from ..services.bulk_service import bulk_create_users_service, bulk_delete_users_service
+from ..utils.db_router import read_only
 
 # Create Blueprint for user management routes
 users_bp = Blueprint("users", __name__)
 
 
+@users_bp.errorhandler(RequestEntityTooLarge)
+@users_bp.errorhandler(UnsupportedMediaType)
+def upload_rejected(error):
+    """
+    Return upload validation failures as JSON.
+    
+    Raised while the request body is streamed, for bodies or images that
+    are too large (413) and files that are not PNG or JPEG images (415).
+    
+    Returns:
+        tuple: JSON error response and the HTTP status code of ``error``
+    """
+    return jsonify({"error": error.description}), error.code
+
+
 @users_bp.route("/", methods=["GET"])
+@read_only
 def get_all_users():
     """
-    Retrieve all users from the database.
+    Retrieve one page of users, optionally filtered and sorted, or specific users by ID.
+    
+    Query parameters:
+        - limit (int, optional): Page size (capped by USERS_PAGE_MAX_LIMIT)
+        - after (str, optional): Cursor from the previous page's X-Next-Cursor
+        - fields (str, optional): Comma-separated fields, e.g. "id,email"
+        - q (str, optional): Full-text prefix search on names and email
+        - email (str, optional): Case-insensitive exact email match
+        - last_name (str, optional): Exact last name match
+        - sort (str, optional): "id", "last_name" or "email", "-" prefix for descending
+        - ids (str, optional): Comma-separated ids; returns
+          {"users": [...], "missing": [...]} instead of a page
     
     Returns:
         tuple: JSON response containing list of users and HTTP status code
             - 200: Successfully retrieved users
+            - 304: Page unchanged (If-None-Match matched the ETag)
+            - 400: Invalid limit, cursor, fields, filter or sort
             - Response format: [{"id": 1, "first_name": "...", ...}, ...]
+            - Headers: X-Next-Cursor and Link (rel="next") when more pages exist
+    """
+    if "ids" in request.args:
+        return get_users_by_ids_service(request)
+    return get_all_users_service(request)
+
+
+@users_bp.route("/lookup", methods=["POST"])
+@read_only
+def lookup_users():
+    """
+    Retrieve many users by ID; the POST form of ``GET /?ids=`` for long lists.
+    
+    Request format (application/json):
+        - ids (list[int]): User ids, at most USERS_LOOKUP_MAX_IDS
+    
+    Query parameters:
+        - fields (str, optional): Comma-separated fields, e.g. "id,email"
+    
+    Returns:
+        tuple: JSON response and HTTP status code
+            - 200: {"users": [...], "missing": [...]}, users in request order
+            - 400: Invalid ids or fields
+    """
+    return get_users_by_ids_service(request)
+
+
+@users_bp.route("/export", methods=["GET"])
+@read_only
+def export_users():
+    """
+    Stream the full user directory.
+    
+    Rows are read in server-side cursor batches and written one line at a
+    time, so memory use is constant regardless of table size.
+    
+    Query parameters:
+        - format (str, optional): "ndjson" (default) or "csv"
+    
+    Returns:
+        Response: Streaming NDJSON or CSV body
+            - 200: Export started
+            - 400: Unsupported format
+    """
+    return export_users_service(request)
+
+
+@users_bp.route("/changes", methods=["GET"])
+@read_only
+def get_user_changes():
+    """
+    Return users created, updated or deleted since a cursor.
+    
+    Clients sync by storing the ``next`` cursor and passing it back as
+    ``since``, so each call only transfers what changed in between.
+    
+    Query parameters:
+        - since (str, optional): Cursor from the previous response (omit for a full sync)
+        - limit (int, optional): Maximum changes per response (capped by USERS_PAGE_MAX_LIMIT)
+        - wait (float, optional): Long poll up to this many seconds for the first change
+    
+    Returns:
+        tuple: JSON response and HTTP status code
+            - 200: {"changes": [...], "next": "<cursor>", "has_more": bool},
+              or Server-Sent Events with ``Accept: text/event-stream``
+            - 400: Invalid cursor, limit or wait
+            - 410: Cursor expired (tombstones pruned); resync without since
     """
-    return get_all_users_service()
+    return get_user_changes_service(request)
 
 
 @users_bp.route("/<int:user_id>", methods=["GET"])
+@read_only
 def get_user(user_id: int):
     """
     Retrieve a specific user by ID.
@@ -51,12 +165,17 @@ def get_user(user_id: int):
     Args:
         user_id (int): The unique identifier of the user to retrieve
     
+    Query parameters:
+        - fields (str, optional): Comma-separated fields, e.g. "id,email"
+    
     Returns:
         tuple: JSON response containing user data and HTTP status code
             - 200: User found and returned
+            - 304: User unchanged (If-None-Match matched the ETag)
+            - 400: Unknown field requested
             - 404: User not found
     """
-    return get_user_service(user_id)
+    return get_user_service(user_id, request)
 
 
 @users_bp.route("/", methods=["POST"])
@@ -70,15 +189,61 @@ def create_user():
         - email (str, required): User's email address
         - password (str, required): User's password
         - image (file, optional): Profile image (JPG, JPEG, PNG)
+        - upload_id (str, optional): ID of a finished resumable upload
+          (see /api/uploads), sent instead of image
     
     Returns:
         tuple: JSON response containing created user data and HTTP status code
             - 201: User successfully created
             - 400: Missing required fields
+            - 413: Body or image too large
+            - 415: Image is not a PNG or JPEG
     """
     return create_user_service(request)
 
 
+@users_bp.route("/bulk", methods=["POST"])
+def bulk_create_users():
+    """
+    Create many users in one request.
+    
+    Expected request format:
+        - application/json: array of user objects, or
+        - application/x-ndjson: one user object per line
+        Each object needs first_name, last_name, email and password.
+    
+    Records are inserted in batches of USERS_BULK_BATCH_SIZE, one
+    transaction per batch. Invalid or duplicate records are reported
+    individually and do not fail the rest of the request.
+    
+    Returns:
+        tuple: JSON report and HTTP status code
+            - 200: {"created": n, "failed": m, "results": [...]}
+            - 400: Body is not a JSON array or NDJSON
+    """
+    return bulk_create_users_service(request)
+
+
+@users_bp.route("/bulk-delete", methods=["POST"])
+def bulk_delete_users():
+    """
+    Delete many users in one request.
+    
+    Expected request format (application/json), one of:
+        - {"ids": [1, 2, 3]}
+        - {"filter": {"email_domain": "partner.com"}}
+    
+    Users are deleted in chunks of USERS_BULK_DELETE_CHUNK_SIZE, one short
+    transaction per chunk. Their images are removed in the background.
+    
+    Returns:
+        tuple: JSON report and HTTP status code
+            - 200: {"deleted": n, "images_released": k, "missing": [...]}
+            - 400: Invalid body
+    """
+    return bulk_delete_users_service(request)
+
+
 @users_bp.route("/<int:user_id>", methods=["PUT"])
 def update_user(user_id: int):
     """
@@ -93,6 +258,7 @@ def update_user(user_id: int):
         - email (str, optional): Updated email address
         - password (str, optional): Updated password
         - image (file, optional): New profile image
+        - upload_id (str, optional): ID of a finished resumable upload, instead of image
     
     Returns:
         tuple: JSON response containing updated user data and HTTP status code
@@ -102,6 +268,30 @@ def update_user(user_id: int):
     return update_user_service(user_id, request)
 
 
+@users_bp.route("/<int:user_id>", methods=["PATCH"])
+def patch_user(user_id: int):
+    """
+    Partially update a user from a JSON body.
+    
+    Only the supplied fields are written, with one UPDATE statement and no
+    preceding read.
+    
+    Args:
+        user_id (int): The unique identifier of the user to update
+    
+    Request format (application/json):
+        - first_name, last_name, email, password (str, optional)
+    
+    Returns:
+        tuple: JSON response containing updated user data and HTTP status code
+            - 200: User successfully updated
+            - 400: Invalid body or unknown fields
+            - 404: User not found
+            - 409: Email already exists
+    """
+    return patch_user_service(user_id, request)
+
+
 @users_bp.route("/<int:user_id>", methods=["DELETE"])
 def delete_user(user_id: int):
     """
@@ -0,0 +1,401 @@
+"""
+Bulk User Service Module
+
+This module implements bulk user creation for partner onboarding. Records
+arrive as a JSON array or an NDJSON stream and are processed in fixed-size
+batches: every record is validated, passwords are hashed in parallel on the
+password pool, and each batch is written with a single executemany
+``INSERT`` in its own transaction. Failures are reported per record, so one
+bad or duplicate record never fails the whole request.
+
+It also implements bulk deletion. Users are deleted by id list or filter in
+chunks, each with one ``DELETE ... WHERE id IN (...) RETURNING id, image``
+statement committed on its own, so locks are held for one chunk only. Each
+chunk records change feed tombstones for the deleted users. The
+released images are handed to the background deletion queue in a single
+batch at the end.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from flask import current_app, jsonify
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from ..models import User
+from .. import db
+from ..utils.cache import get_user_cache, user_cache_key
+from ..utils.changes import record_changed, record_deleted
+from ..utils.file_gc import release_images
+from ..utils.password_hasher import HashingUnavailableError, get_password_hasher
+from ..utils.query_log import extend_query_budget
+
+# MIME types treated as newline-delimited JSON
+NDJSON_MIMETYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+# Fields accepted for each record and their maximum lengths (see models.User)
+BULK_FIELDS = {
+    "first_name": 100,
+    "last_name": 100,
+    "email": 100,
+    "password": None,
+}
+
+
+def _iter_ndjson(stream) -> Iterator[Tuple[Optional[dict], Optional[str]]]:
+    """Yield ``(record, error)`` pairs from an NDJSON byte stream."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line), None
+        except ValueError:
+            yield None, "Invalid JSON"
+
+
+def _iter_records(request) -> Iterator[Tuple[Optional[dict], Optional[str]]]:
+    """
+    Return ``(record, error)`` pairs from a JSON array or NDJSON body.
+
+    NDJSON bodies are read line by line from the request stream, so records
+    are processed while the upload is still arriving. Lines that are not
+    valid JSON are reported as ``(None, message)``.
+
+    Args:
+        request: Flask request object
+
+    Returns:
+        Iterator: ``(record, error)`` pairs in body order
+
+    Raises:
+        ValueError: If a JSON body is not an array
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        return _iter_ndjson(request.stream)
+
+    records = request.get_json(silent=True)
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array or an NDJSON body")
+    return ((record, None) for record in records)
+
+
+def _validate_record(record) -> Optional[str]:
+    """
+    Validate a single bulk record.
+
+    Args:
+        record: Parsed JSON value for one user
+
+    Returns:
+        str | None: Error message, or None if the record is valid
+    """
+    if not isinstance(record, dict):
+        return "Record must be a JSON object"
+
+    missing = [field for field in BULK_FIELDS if not record.get(field)]
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+
+    for field, max_length in BULK_FIELDS.items():
+        value = record[field]
+        if not isinstance(value, str):
+            return f"{field} must be a string"
+        if max_length and len(value) > max_length:
+            return f"{field} must be at most {max_length} characters"
+    return None
+
+
+def _insert_rows(rows: List[dict]) -> Dict[str, int]:
+    """
+    Insert one batch of users.
+
+    The batch is sent as a single executemany ``INSERT``. If it hits a
+    unique constraint (a concurrent request created one of the emails), the
+    batch is retried row by row inside savepoints so only the conflicting
+    rows fail.
+
+    Args:
+        rows (list): Column dictionaries; rows that fail get an ``_error`` key
+
+    Returns:
+        dict: Generated ids by email of the inserted rows
+    """
+    try:
+        db.session.execute(insert(User), rows)
+        ids = _inserted_ids(rows)
+        db.session.commit()
+        return ids
+    except IntegrityError:
+        db.session.rollback()
+
+    for row in rows:
+        # SAVEPOINT, INSERT and RELEASE per row
+        extend_query_budget(3)
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(User), [row])
+        except IntegrityError:
+            row["_error"] = "Email already exists"
+    ids = _inserted_ids(rows)
+    db.session.commit()
+    return ids
+
+
+def _inserted_ids(rows: List[dict]) -> Dict[str, int]:
+    """
+    Look up the generated ids of a batch in a single query before it commits.
+
+    The ids are recorded for the change feed, which stamps the rows at commit.
+    """
+    inserted = [row["email"] for row in rows if "_error" not in row]
+    ids = dict(db.session.execute(
+        select(User.email, User.id).where(User.email.in_(inserted))
+    ).all()) if inserted else {}
+    record_changed(db.session, ids.values())
+    return ids
+
+
+def _flush_batch(batch: List[Tuple[int, dict]], results: List[dict]) -> None:
+    """
+    Hash, insert and report on one batch of validated records.
+
+    Args:
+        batch (list): ``(index, record)`` pairs that passed validation
+        results (list): Per-record report entries, appended in place
+    """
+    # Existing-email lookup, INSERT, id lookup, sequence allocation and stamp
+    extend_query_budget(5)
+    emails = [record["email"].lower() for _, record in batch]
+
+    # Reject emails that already exist with one set-based lookup, ignoring
+    # case like the in-request duplicate check (uses ix_users_email_lower)
+    email_key = func.lower(User.email)
+    existing = set(db.session.scalars(select(email_key).where(email_key.in_(emails))))
+    pending = []
+    for index, record in batch:
+        if record["email"].lower() in existing:
+            results.append({"index": index, "status": "error", "error": "Email already exists"})
+        else:
+            pending.append((index, record))
+    if not pending:
+        return
+
+    try:
+        hashes = get_password_hasher().hash_many(record["password"] for _, record in pending)
+    except HashingUnavailableError:
+        results.extend(
+            {"index": index, "status": "error", "error": "Server busy, please retry"}
+            for index, _ in pending
+        )
+        return
+
+    rows = [
+        {
+            "first_name": record["first_name"],
+            "last_name": record["last_name"],
+            "email": record["email"],
+            "password": password_hash,
+        }
+        for (_, record), password_hash in zip(pending, hashes)
+    ]
+    ids = _insert_rows(rows)
+
+    for (index, _), row in zip(pending, rows):
+        if "_error" in row:
+            results.append({"index": index, "status": "error", "error": row["_error"]})
+        else:
+            results.append({"index": index, "status": "created", "id": ids.get(row["email"])})
+
+
+def bulk_create_users_service(request):
+    """
+    Create many users from a JSON array or NDJSON stream.
+
+    Args:
+        request: Flask request object with an ``application/json`` array or
+            an ``application/x-ndjson`` body of user objects (first_name,
+            last_name, email, password)
+
+    Returns:
+        tuple: (JSON response, HTTP status code)
+            - 200: Report with ``created`` and ``failed`` counts and a
+              ``results`` entry per record, ordered by record index
+            - 400: Body is neither a JSON array nor NDJSON
+    """
+    batch_size = current_app.config["USERS_BULK_BATCH_SIZE"]
+    max_records = current_app.config["USERS_BULK_MAX_RECORDS"]
+
+    results: List[dict] = []
+    batch: List[Tuple[int, dict]] = []
+    seen_emails = set()
+
+    try:
+        records = _iter_records(request)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    for index, (record, error) in enumerate(records):
+        if index >= max_records:
+            results.append({
+                "index": index,
+                "status": "error",
+                "error": f"Record limit of {max_records} exceeded"
+            })
+            break
+
+        error = error or _validate_record(record)
+        if error is None:
+            # Emails are compared case-insensitively within one request
+            email_key = record["email"].lower()
+            if email_key in seen_emails:
+                error = "Duplicate email in request"
+            seen_emails.add(email_key)
+
+        if error:
+            results.append({"index": index, "status": "error", "error": error})
+            continue
+
+        batch.append((index, record))
+        if len(batch) >= batch_size:
+            _flush_batch(batch, results)
+            batch = []
+
+    if batch:
+        _flush_batch(batch, results)
+
+    results.sort(key=lambda entry: entry["index"])
+    created = sum(1 for entry in results if entry["status"] == "created")
+    return jsonify({
+        "created": created,
+        "failed": len(results) - created,
+        "results": results
+    }), 200
+
+
+def _delete_chunk(ids: List[int]) -> List[Tuple[int, Optional[str]]]:
+    """
+    Delete one chunk of users in its own short transaction.
+
+    Args:
+        ids (list): User ids, at most USERS_BULK_DELETE_CHUNK_SIZE
+
+    Returns:
+        list: ``(id, image)`` pairs of the users that were deleted
+    """
+    # Chunk selection, DELETE, sequence allocation and tombstones
+    extend_query_budget(4)
+    stmt = delete(User).where(User.id.in_(ids)).execution_options(synchronize_session=False)
+    if db.engine.dialect.delete_returning:
+        deleted = db.session.execute(stmt.returning(User.id, User.image)).all()
+    else:
+        # No RETURNING (MySQL): read the images in the same transaction first
+        deleted = db.session.execute(
+            select(User.id, User.image).where(User.id.in_(ids)).with_for_update()
+        ).all()
+        db.session.execute(stmt)
+
+    # Tombstones are written at commit, after the positions are allocated
+    record_deleted(db.session, [user_id for user_id, _ in deleted])
+    db.session.commit()
+    return [(user_id, image) for user_id, image in deleted]
+
+
+def _parse_bulk_delete(body) -> Tuple[Optional[List[int]], Optional[str]]:
+    """
+    Validate a bulk delete body.
+
+    Returns:
+        tuple: ``(ids, email_domain)``; exactly one of them is set
+
+    Raises:
+        ValueError: If the body is not ``{"ids": [...]}`` or
+            ``{"filter": {"email_domain": "..."}}``
+    """
+    if not isinstance(body, dict) or ("ids" in body) == ("filter" in body):
+        raise ValueError('Request body must be {"ids": [...]} or {"filter": {...}}')
+
+    if "ids" in body:
+        ids = body["ids"]
+        if not isinstance(ids, list) or not ids or not all(
+            isinstance(user_id, int) and not isinstance(user_id, bool) and user_id > 0
+            for user_id in ids
+        ):
+            raise ValueError("ids must be a non-empty list of positive integers")
+        max_ids = current_app.config["USERS_BULK_DELETE_MAX_IDS"]
+        if len(ids) > max_ids:
+            raise ValueError(f"At most {max_ids} ids can be deleted at once")
+        return list(dict.fromkeys(ids)), None
+
+    criteria = body["filter"]
+    if not isinstance(criteria, dict) or set(criteria) != {"email_domain"}:
+        raise ValueError("filter supports exactly one key: email_domain")
+    domain = criteria["email_domain"]
+    if not isinstance(domain, str) or not domain.strip("@ "):
+        raise ValueError("email_domain must be a non-empty string")
+    return None, domain.strip("@ ")
+
+
+def bulk_delete_users_service(request):
+    """
+    Delete many users by id or by filter.
+
+    Each chunk of USERS_BULK_DELETE_CHUNK_SIZE users is removed with a single
+    ``DELETE ... RETURNING`` in its own transaction. Filter deletes select
+    the next chunk of matching ids by primary key before each delete.
+    Images whose last reference was removed are deleted by the background
+    deletion queue, in one batch after all chunks are committed.
+
+    Args:
+        request: Flask request object with a JSON body, either
+            ``{"ids": [1, 2, ...]}`` or ``{"filter": {"email_domain": "partner.com"}}``
+
+    Returns:
+        tuple: (JSON response, HTTP status code)
+            - 200: {"deleted": n, "missing": [...], "images_released": k};
+              ``missing`` lists requested ids that did not exist (ids only)
+            - 400: Invalid body
+    """
+    try:
+        ids, domain = _parse_bulk_delete(request.get_json(silent=True))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    chunk_size = current_app.config["USERS_BULK_DELETE_CHUNK_SIZE"]
+    deleted_ids: List[int] = []
+    images = set()
+    try:
+        if ids is not None:
+            for start in range(0, len(ids), chunk_size):
+                for user_id, image in _delete_chunk(ids[start:start + chunk_size]):
+                    deleted_ids.append(user_id)
+                    images.add(image)
+        else:
+            matching = select(User.id).where(
+                User.email.endswith(f"@{domain}", autoescape=True)
+            ).order_by(User.id).limit(chunk_size)
+            while True:
+                chunk = list(db.session.scalars(matching))
+                if not chunk:
+                    break
+                for user_id, image in _delete_chunk(chunk):
+                    deleted_ids.append(user_id)
+                    images.add(image)
+    finally:
+        # Committed chunks are cleaned up even if a later chunk failed
+        cache = get_user_cache()
+        for user_id in deleted_ids:
+            cache.delete(user_cache_key(user_id))
+        images.discard(None)
+        if images:
+            release_images(images)
+
+    report = {"deleted": len(deleted_ids), "images_released": len(images)}
+    if ids is not None:
+        found = set(deleted_ids)
+        report["missing"] = [user_id for user_id in ids if user_id not in found]
+    return jsonify(report), 200
@@ -0,0 +1,226 @@
+"""
+Change Feed Service Module
+
+This module implements ``GET /api/users/changes``, the incremental sync
+feed for users. A request returns the users and tombstones whose change
+sequence position is after the client's cursor, in position order, read
+with range scans on the indexed ``change_seq`` columns. Its cost therefore
+follows the number of changes since the cursor, not the size of the table.
+
+Three delivery modes share the same query:
+
+    - plain: return what has changed (possibly nothing) immediately
+    - long poll (``?wait=<seconds>``): hold the request until something
+      changes or the wait expires
+    - stream (``Accept: text/event-stream``): Server-Sent Events, one event
+      per change, until CHANGES_STREAM_SECONDS have passed; clients
+      reconnect with ``Last-Event-ID`` to continue
+
+Waiting requests hold a worker, but not a database connection: the session
+is closed before every wait.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import json
+import time
+from typing import List, Optional, Tuple
+
+from flask import Response, current_app, jsonify, stream_with_context
+from sqlalchemy import select
+
+from ..models import ChangeSequence, User, UserTombstone
+from .. import db
+from ..utils.changes import SEQUENCE_ID, get_change_notifier
+from ..utils.pagination import (
+    InvalidCursorError,
+    build_link_header,
+    decode_cursor,
+    encode_cursor,
+    parse_limit
+)
+from ..utils.query_log import extend_query_budget
+
+# MIME type selecting the Server-Sent Events mode
+EVENT_STREAM = "text/event-stream"
+
+# Seconds between keep-alive comments on an idle event stream
+STREAM_HEARTBEAT = 15.0
+
+
+class CursorExpiredError(Exception):
+    """Raised when the tombstones a cursor depends on have been pruned."""
+
+
+def fetch_changes(since: Optional[int], limit: int) -> Tuple[List[dict], bool]:
+    """
+    Return the changes after position ``since``, oldest first.
+
+    Args:
+        since (int | None): Last position the client has seen, or None for
+            a full sync from the beginning
+        limit (int): Maximum number of changes to return
+
+    Returns:
+        tuple: (changes, has_more). Each change is
+            ``{"op": "upsert", "seq": ..., "id": ..., "user": {...}}`` or
+            ``{"op": "delete", "seq": ..., "id": ...}``
+
+    Raises:
+        CursorExpiredError: If tombstones after ``since`` have been pruned
+    """
+    if since is not None:
+        pruned_through = db.session.scalar(
+            select(ChangeSequence.pruned_through).where(ChangeSequence.id == SEQUENCE_ID)
+        )
+        if pruned_through and since < pruned_through:
+            raise CursorExpiredError()
+
+    # Two range scans of at most limit + 1 rows each, merged by position
+    users = select(*User.public_columns(), User.change_seq, User.updated_at)
+    tombstones = select(UserTombstone.change_seq, UserTombstone.user_id)
+    if since is not None:
+        users = users.where(User.change_seq > since)
+        tombstones = tombstones.where(UserTombstone.change_seq > since)
+    users = users.order_by(User.change_seq, User.id).limit(limit + 1)
+    tombstones = tombstones.order_by(UserTombstone.change_seq).limit(limit + 1)
+
+    changes = [
+        {
+            "op": "upsert",
+            "seq": row.change_seq,
+            "id": row.id,
+            "user": {
+                **{field: getattr(row, field) for field in User.PUBLIC_FIELDS},
+                "updated_at": row.updated_at.isoformat() + "Z",
+            },
+        }
+        for row in db.session.execute(users)
+    ]
+    changes += [
+        {"op": "delete", "seq": row.change_seq, "id": row.user_id}
+        for row in db.session.execute(tombstones)
+    ]
+    changes.sort(key=lambda change: change["seq"])
+    return changes[:limit], len(changes) > limit
+
+
+def _wait_for_changes(since: Optional[int], limit: int, wait: float) -> Tuple[List[dict], bool]:
+    """
+    Fetch changes, waiting up to ``wait`` seconds for the first one.
+
+    Woken early by commits in this process; re-checks the database every
+    CHANGES_POLL_INTERVAL seconds for commits made elsewhere.
+    """
+    notifier = get_change_notifier()
+    poll_interval = current_app.config["CHANGES_POLL_INTERVAL"]
+    deadline = time.monotonic() + wait
+
+    while True:
+        seen = notifier.latest
+        extend_query_budget(3)
+        changes, has_more = fetch_changes(since, limit)
+        remaining = deadline - time.monotonic()
+        if changes or remaining <= 0:
+            return changes, has_more
+
+        # Give the connection back to the pool while idle
+        db.session.close()
+        notifier.wait(seen, min(poll_interval, remaining))
+
+
+def _stream_changes(since: Optional[int], limit: int):
+    """Yield Server-Sent Events for every change after ``since``."""
+    stream_seconds = current_app.config["CHANGES_STREAM_SECONDS"]
+    deadline = time.monotonic() + stream_seconds
+
+    # Tell clients how long to wait before reconnecting
+    yield "retry: 1000\n\n"
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        try:
+            changes, _ = _wait_for_changes(since, limit, min(STREAM_HEARTBEAT, remaining))
+        except CursorExpiredError:
+            yield "event: expired\ndata: {}\n\n"
+            return
+
+        if not changes:
+            yield ": keep-alive\n\n"
+            continue
+        for change in changes:
+            since = change["seq"]
+            yield (
+                f"id: {encode_cursor(since)}\n"
+                f"event: {change['op']}\n"
+                f"data: {json.dumps(change, separators=(',', ':'))}\n\n"
+            )
+        db.session.close()
+
+
+def get_user_changes_service(request):
+    """
+    Return the users created, updated or deleted after a cursor.
+
+    Args:
+        request: Flask request object carrying the query string
+
+    Query parameters:
+        - since (str, optional): Cursor from the previous response; omit it
+          for a full sync. ``Last-Event-ID`` takes its place on reconnects
+        - limit (int, optional): Maximum changes per response, clamped to
+          USERS_PAGE_MAX_LIMIT
+        - wait (float, optional): Long poll up to this many seconds (capped
+          at CHANGES_MAX_WAIT) when there are no changes yet
+
+    Returns:
+        tuple: (JSON response, HTTP status code)
+            - 200: ``{"changes": [...], "next": cursor, "has_more": bool}``,
+              or an event stream when ``Accept: text/event-stream``
+            - 400: Invalid cursor, limit or wait
+            - 410: Cursor older than the retained tombstones; resync
+              without ``since``
+    """
+    config = current_app.config
+    try:
+        since = decode_cursor(request.args.get("since") or request.headers.get("Last-Event-ID"))
+        limit = parse_limit(
+            request.args.get("limit"),
+            config["USERS_PAGE_DEFAULT_LIMIT"],
+            config["USERS_PAGE_MAX_LIMIT"]
+        )
+        wait = float(request.args.get("wait", 0))
+        if not 0 <= wait < float("inf"):
+            raise ValueError("wait must be a non-negative number of seconds")
+    except InvalidCursorError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    if request.accept_mimetypes.best == EVENT_STREAM:
+        response = Response(
+            stream_with_context(_stream_changes(since, limit)), mimetype=EVENT_STREAM
+        )
+        response.headers["Cache-Control"] = "no-store"
+        # Stop nginx from buffering the stream
+        response.headers["X-Accel-Buffering"] = "no"
+        return response, 200
+
+    try:
+        changes, has_more = _wait_for_changes(since, limit, min(wait, config["CHANGES_MAX_WAIT"]))
+    except CursorExpiredError:
+        return jsonify({"error": "Cursor has expired; resync without since"}), 410
+
+    # An empty response keeps the client's position
+    last = changes[-1]["seq"] if changes else (since or 0)
+    next_cursor = encode_cursor(last)
+    response = jsonify({"changes": changes, "next": next_cursor, "has_more": has_more})
+    response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["Cache-Control"] = "no-store"
+    if has_more:
+        response.headers["Link"] = build_link_header(
+            request.base_url, {"limit": limit, "since": next_cursor}
+        )
+    return response, 200
@@ -0,0 +1,116 @@
+"""
+User Export Service Module
+
+This module implements the streaming export of the full user directory.
+Rows are read from a server-side cursor in fixed-size batches and written to
+the response one at a time, so memory stays constant and the first byte is
+sent as soon as the first batch arrives, regardless of table size.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import csv
+import io
+import json
+from typing import Iterator
+
+from flask import Response, current_app, jsonify, stream_with_context
+from sqlalchemy import select
+
+from ..models import User
+from .. import db
+
+# Supported export formats mapped to their response MIME types
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _iter_user_rows(batch_size: int) -> Iterator[tuple]:
+    """
+    Yield public user columns as plain tuples from a server-side cursor.
+
+    A Core ``select()`` of individual columns is used so no ORM instances
+    are built, and ``yield_per`` makes the driver fetch ``batch_size`` rows
+    at a time instead of buffering the whole result.
+
+    Args:
+        batch_size (int): Number of rows fetched per round trip
+
+    Yields:
+        tuple: Column values in ``User.PUBLIC_FIELDS`` order
+    """
+    stmt = (
+        select(*User.public_columns())
+        .order_by(User.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = db.session.execute(stmt)
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+
+def _ndjson_lines(rows: Iterator[tuple]) -> Iterator[str]:
+    """Serialize rows as newline-delimited JSON objects."""
+    fields = User.PUBLIC_FIELDS
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), separators=(",", ":")) + "\n"
+
+
+def _csv_lines(rows: Iterator[tuple]) -> Iterator[str]:
+    """Serialize rows as CSV, starting with a header line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(User.PUBLIC_FIELDS)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        # Reuse the same buffer so only one line is held at a time
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    # Header-only export for an empty table
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_users_service(request):
+    """
+    Stream every user as NDJSON or CSV.
+
+    Args:
+        request: Flask request object carrying the query string
+
+    Query parameters:
+        - format (str, optional): ``ndjson`` (default) or ``csv``
+
+    Returns:
+        Response | tuple: Streaming response, or (JSON error, 400) for an
+        unsupported format
+    """
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            "error": f"Unsupported format: {export_format}. "
+                     f"Use one of: {', '.join(EXPORT_FORMATS)}"
+        }), 400
+
+    rows = _iter_user_rows(current_app.config["USERS_EXPORT_BATCH_SIZE"])
+    lines = _csv_lines(rows) if export_format == "csv" else _ndjson_lines(rows)
+
+    response = Response(
+        stream_with_context(lines),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename=users.{export_format}"
+    )
+    # Ask reverse proxies not to buffer the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -9,16 +9,50 @@ Author: Backend API Team
 Version: 1.0.0
 """
 
-from flask import jsonify
-from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import jsonify, current_app
+from werkzeug.security import check_password_hash
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import Conflict, NotFound
 from ..models import User
 from .. import db
-import os
+from ..utils.cache import NullCache, get_user_cache, user_cache_key
+from ..utils.changes import record_changed
+from ..utils.db_router import on_replica
+from ..utils.etag import compute_etag, not_modified, set_etag
+from ..utils.fields import parse_fields
+from ..utils.file_gc import release_after_commit
+from ..utils.file_handler import get_image_storage
+from ..utils.resumable import get_resumable_uploads
+from ..utils.request_metrics import timed
+from ..utils.thumbnails import queue_derivatives
+from ..utils.uploads import ValidatedUpload
+from ..utils.password_hasher import (
+    HashingUnavailableError,
+    get_password_hasher,
+    needs_rehash
+)
+from ..utils.pagination import (
+    InvalidCursorError,
+    build_link_header,
+    decode_cursor,
+    decode_keyset_cursor,
+    encode_cursor,
+    encode_keyset_cursor,
+    parse_limit
+)
+from ..utils.search import parse_sort, search_filters, user_list_statement
 
 # Allowed file extensions for user profile images
 ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png"}
 
+# Columns a JSON PATCH may change (images go through PUT or upload_id)
+PATCHABLE_FIELDS = {"first_name", "last_name", "email", "password"}
+
+# Filter and sort parameters carried over to the next-page link
+LIST_QUERY_PARAMS = ("q", "email", "last_name", "sort")
+
 
 def allowed_file(filename: str) -> bool:
     """
@@ -42,59 +76,386 @@ def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def get_all_users_service():
+def save_image(image_file) -> str:
+    """
+    Store an uploaded image in the content-addressed image storage.
+    
+    The stored extension follows the detected content type, not the
+    client-supplied filename.
+    
+    Args:
+        image_file: Werkzeug FileStorage with an allowed extension
+        
+    Returns:
+        str: Stored image name for ``User.image``
+    """
+    storage = get_image_storage()
+
+    # Uploads parsed by UploadRequest are already validated and on disk
+    if isinstance(image_file.stream, ValidatedUpload):
+        return storage.store_upload(image_file.stream)
+
+    extension = image_file.filename.rsplit(".", 1)[1].lower()
+    return storage.save(image_file.stream, extension)
+
+
+def store_request_image(request):
+    """
+    Store the profile image sent with a create or update request.
+    
+    The image is either a finished resumable upload referenced by the
+    ``upload_id`` form field or an inline ``image`` file.
+    
+    Args:
+        request: Flask request object containing form data and files
+        
+    Returns:
+        str | None: Stored image name, or None if no image was sent
+        
+    Raises:
+        NotFound: If ``upload_id`` is unknown or expired
+        Conflict: If the referenced upload is incomplete
+    """
+    upload_id = request.form.get("upload_id")
+    if upload_id:
+        return get_resumable_uploads().store(upload_id, get_image_storage())
+
+    image_file = request.files.get("image")
+    if image_file and allowed_file(image_file.filename):
+        # Stored under its content hash, so names never collide
+        return save_image(image_file)
+    return None
+
+
+def invalid_upload_response(error):
     """
-    Retrieve all users from the database.
+    Build the 400 response for an unusable ``upload_id``.
     
-    Fetches all user records and returns them as a JSON array.
+    Args:
+        error (HTTPException): NotFound or Conflict raised by the upload store
+        
+    Returns:
+        tuple: (JSON response, HTTP status code 400)
+    """
+    return jsonify({"error": f"Invalid upload_id: {error.description}"}), 400
+
+
+def hashing_unavailable_response():
+    """
+    Build the 503 response returned when the password hashing pool is full.
+    
+    Returns:
+        tuple: (JSON response, HTTP status code 503) with a Retry-After header
+    """
+    response = jsonify({"error": "Server busy, please retry shortly"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
+def concurrent_update_response():
+    """
+    Build the 409 response returned when a user changed while being written.
+    
+    The ORM checks ``User.version`` on every UPDATE and DELETE, so a write
+    based on a row that another request changed in the meantime matches no
+    row and is rolled back instead of overwriting that change.
+    
+    Returns:
+        tuple: (JSON response, HTTP status code 409)
+    """
+    return jsonify({"error": "User was modified concurrently, please retry"}), 409
+
+
+def get_all_users_service(request):
+    """
+    Retrieve one page of users using keyset (cursor) pagination.
+    
+    Rows are fetched with an indexed ``WHERE id > :after ORDER BY id`` range
+    scan, so latency and memory stay flat no matter how large the table is.
+    One extra row is read to find out whether another page exists.
+    Only the requested columns are selected and rows are mapped straight to
+    dictionaries, without building ORM instances.
+    Filters and sort orders are backed by indexes (see ``utils.search``);
+    non-default sort orders page on the full sort key instead of the id.
     Note: Passwords are not included in the response for security.
     
+    Args:
+        request: Flask request object carrying the query string
+    
+    Query parameters:
+        - limit (int, optional): Page size, clamped to USERS_PAGE_MAX_LIMIT
+        - after (str, optional): Opaque cursor returned by the previous page
+        - fields (str, optional): Comma-separated subset of public fields
+        - q (str, optional): Full-text prefix search on names and email
+        - email (str, optional): Case-insensitive exact email match
+        - last_name (str, optional): Exact last name match
+        - sort (str, optional): id, last_name or email; prefix ``-`` to
+          sort descending (default: id)
+    
     Returns:
         tuple: (JSON response, HTTP status code)
-            - JSON: List of user dictionaries
-            - Status: 200 (OK)
+            - 200: List of user dictionaries; when more rows exist the
+              ``X-Next-Cursor`` and ``Link: <...>; rel="next"`` headers are set
+            - 304: Page unchanged since the ETag sent in ``If-None-Match``
+            - 400: Invalid limit, cursor, fields, filter or sort
+    """
+    config = current_app.config
+    try:
+        fields = parse_fields(request.args.get("fields"), User.PUBLIC_FIELDS)
+        limit = parse_limit(
+            request.args.get("limit"),
+            config["USERS_PAGE_DEFAULT_LIMIT"],
+            config["USERS_PAGE_MAX_LIMIT"]
+        )
+        sort = parse_sort(request.args.get("sort"))
+        if sort.is_default:
+            last_id = decode_cursor(request.args.get("after"))
+            after = None if last_id is None else [last_id]
+        else:
+            after = decode_keyset_cursor(request.args.get("after"), len(sort.columns))
+        filters = search_filters(
+            request.args, db.engine.dialect.name, config["USERS_SEARCH_BACKEND"]
+        )
+    except InvalidCursorError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Sort key columns are selected under their own labels so the cursor can
+    # be built even when ?fields= leaves them out
+    sort_keys = [column.label(f"sort_{index}") for index, column in enumerate(sort.columns)]
+    stmt = user_list_statement(
+        [*User.public_columns(fields), User.version, *sort_keys],
+        filters, sort, after, limit + 1
+    )
+    rows = db.session.execute(stmt).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    headers = {}
+    if has_more:
+        last_key = [rows[-1]._mapping[key.name] for key in sort_keys]
+        if sort.is_default:
+            next_cursor = encode_cursor(last_key[0])
+        else:
+            next_cursor = encode_keyset_cursor(last_key)
+        params = {"limit": limit, "after": next_cursor}
+        if request.args.get("fields"):
+            params["fields"] = ",".join(fields)
+        for name in LIST_QUERY_PARAMS:
+            if request.args.get(name):
+                params[name] = request.args[name]
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = build_link_header(request.base_url, params)
+
+    # The page ETag is derived from the (id, version) pairs it contains, so
+    # an unchanged page is answered with 304 before any JSON is built
+    id_key = sort_keys[-1].name
+    etag = compute_etag(
+        "users", fields, has_more, [(row._mapping[id_key], row.version) for row in rows]
+    )
+    cached = not_modified(request, etag, headers)
+    if cached is not None:
+        return cached
+
+    with timed("serialize"):
+        response = jsonify([dict(zip(fields, row)) for row in rows])
+    response.headers.update(headers)
+    set_etag(response, etag)
+    return response, 200
+
+
+def fill_user_cache(users: dict) -> None:
     """
-    # Query all users from database
-    users = User.query.all()
-    users_list = []
+    Cache users just read from the primary, unless a write overtook the read.
     
-    # Build list of user dictionaries, excluding sensitive data
-    for user in users:
-        users_list.append({
-            'id': user.id,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'email': user.email,
-            'image': user.image  # Only send filename, not full path
-        })
+    A write that commits between the read and the fill deletes the cache key
+    before the stale row is put back. The versions are therefore read again
+    in a new transaction after filling, and entries whose version changed
+    or whose user was deleted meanwhile are dropped again.
     
-    return jsonify(users_list), 200
-
+    Args:
+        users (dict): Public rows including ``version``, by user id
+    """
+    cache = get_user_cache()
+    if isinstance(cache, NullCache) or not users:
+        return
+    cache.set_many({user_cache_key(user_id): user for user_id, user in users.items()})
 
-def get_user_service(user_id: int):
+    # End the read transaction so the re-check sees writes committed since
+    db.session.commit()
+    ids = list(users)
+    chunk_size = current_app.config["USERS_LOOKUP_CHUNK_SIZE"]
+    versions = {}
+    for start in range(0, len(ids), chunk_size):
+        versions.update(db.session.execute(
+            select(User.id, User.version).where(User.id.in_(ids[start:start + chunk_size]))
+        ).all())
+    for user_id, user in users.items():
+        if versions.get(user_id) != user["version"]:
+            cache.delete(user_cache_key(user_id))
+
+
+def get_user_service(user_id: int, request=None):
     """
     Retrieve a specific user by ID.
     
-    Fetches a single user record from the database and returns it as JSON.
+    Reads through the user cache; on a miss the row is fetched with a Core
+    ``select()``, from a replica when the request is routed to one, and
+    cached only if it was read from the primary, so replica lag is never
+    cached. Writes invalidate the cached entry explicitly, and fills that
+    raced a write are dropped (see ``fill_user_cache``).
     Returns 404 error if user is not found.
     
     Args:
         user_id (int): The unique identifier of the user to retrieve
+        request: Flask request object (optional) carrying ``?fields=``
         
     Returns:
         tuple: (JSON response, HTTP status code)
-            - 200: User found, returns user data
+            - 200: User found, returns user data with a strong ETag
+            - 304: User unchanged since the ETag sent in ``If-None-Match``
+            - 400: Unknown field requested
             - 404: User not found
     """
-    # Query for user by primary key
-    user = User.query.get(user_id)
-
-    # Handle not found case
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
-    # Return user data converted to dictionary
-    return jsonify(user.to_dict()), 200
+    try:
+        fields = parse_fields(
+            request.args.get("fields") if request is not None else None,
+            User.PUBLIC_FIELDS
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Read through the cache; the full public row is cached once and the
+    # requested fields are picked from it
+    cache = get_user_cache()
+    cache_key = user_cache_key(user_id)
+    user = cache.get(cache_key)
+
+    if user is None:
+        stmt = select(*User.public_columns(), User.version).where(User.id == user_id)
+        row = db.session.execute(stmt).mappings().first()
+
+        # Handle not found case
+        if row is None:
+            return jsonify({"error": "User not found"}), 404
+
+        # Only fill the cache from the primary so replica lag is never cached
+        user = dict(row)
+        if not on_replica():
+            fill_user_cache({user_id: user})
+
+    # Answer conditional requests from the row version alone
+    etag = compute_etag("user", user_id, user["version"], fields)
+    cached = not_modified(request, etag) if request is not None else None
+    if cached is not None:
+        return cached
+
+    response = jsonify({field: user[field] for field in fields})
+    return set_etag(response, etag), 200
+
+
+def parse_user_ids(values, max_ids: int) -> list:
+    """
+    Validate a list of user ids, dropping duplicates but keeping order.
+    
+    Args:
+        values (Iterable): Ids as integers or numeric strings
+        max_ids (int): Maximum number of distinct ids accepted
+        
+    Returns:
+        list: Distinct integer ids in request order
+        
+    Raises:
+        ValueError: If an id is not a positive integer, none is given or
+            there are more than ``max_ids``
+    """
+    ids = []
+    seen = set()
+    for value in values:
+        if isinstance(value, bool) or not str(value).strip().isdigit():
+            raise ValueError(f"Invalid user id: {value!r}")
+        user_id = int(value)
+        if user_id not in seen:
+            seen.add(user_id)
+            ids.append(user_id)
+
+    if not ids:
+        raise ValueError("No user ids given")
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids can be requested at once")
+    return ids
+
+
+def get_users_by_ids_service(request):
+    """
+    Fetch many users by id in as few queries as possible.
+    
+    Ids come from ``?ids=1,2,3`` (GET) or a JSON body ``{"ids": [...]}``
+    (POST, for long lists). Cached users are served from the user cache
+    with one multi-get; only the misses are loaded, with
+    ``WHERE id IN (...)`` queries of at most USERS_LOOKUP_CHUNK_SIZE ids so
+    each statement stays below the database's bind parameter limit.
+    
+    Args:
+        request: Flask request object
+    
+    Query parameters:
+        - ids (str): Comma-separated user ids (GET)
+        - fields (str, optional): Comma-separated subset of public fields
+    
+    Returns:
+        tuple: (JSON response, HTTP status code)
+            - 200: {"users": [...], "missing": [...]}, users in request order
+            - 400: Invalid ids or fields
+    """
+    config = current_app.config
+    try:
+        fields = parse_fields(request.args.get("fields"), User.PUBLIC_FIELDS)
+        if request.method == "POST":
+            body = request.get_json(silent=True)
+            raw_ids = body.get("ids") if isinstance(body, dict) else None
+            if not isinstance(raw_ids, list):
+                raise ValueError('Request body must be {"ids": [...]}')
+        else:
+            raw_ids = [value for value in request.args.get("ids", "").split(",") if value]
+        ids = parse_user_ids(raw_ids, config["USERS_LOOKUP_MAX_IDS"])
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Serve what the cache has with a single multi-get
+    cache = get_user_cache()
+    cached = cache.get_many([user_cache_key(user_id) for user_id in ids])
+    found = {
+        user_id: cached[user_cache_key(user_id)]
+        for user_id in ids if user_cache_key(user_id) in cached
+    }
+
+    # Load the misses in chunks; only rows read from the primary fill the
+    # cache, so replica lag is never cached
+    misses = [user_id for user_id in ids if user_id not in found]
+    chunk_size = config["USERS_LOOKUP_CHUNK_SIZE"]
+    loaded = {}
+    for start in range(0, len(misses), chunk_size):
+        stmt = select(*User.public_columns(), User.version).where(
+            User.id.in_(misses[start:start + chunk_size])
+        )
+        for row in db.session.execute(stmt).mappings():
+            loaded[row["id"]] = dict(row)
+    if not on_replica():
+        fill_user_cache(loaded)
+    found.update(loaded)
+
+    # Answer in request order and report ids that do not exist
+    with timed("serialize"):
+        users = [
+            {field: found[user_id][field] for field in fields}
+            for user_id in ids if user_id in found
+        ]
+        missing = [user_id for user_id in ids if user_id not in found]
+        response = jsonify({"users": users, "missing": missing})
+    return response, 200
 
 
 def create_user_service(request):
@@ -111,6 +472,7 @@ def create_user_service(request):
         tuple: (JSON response, HTTP status code)
             - 201: User successfully created
             - 400: Missing required fields
+            - 503: Password hashing pool is saturated
             
     Expected form data:
         - first_name (str): User's first name
@@ -118,6 +480,7 @@ def create_user_service(request):
         - email (str): User's email
         - password (str): User's password (should be hashed in production)
         - image (file, optional): Profile image file
+        - upload_id (str, optional): Finished resumable upload, instead of image
     """
     # Extract form data from request
     data = request.form
@@ -133,22 +496,24 @@ def create_user_service(request):
             "error": f"Missing fields: {', '.join(missing)}"
         }), 400
 
-    # Handle optional image upload
-    image_file = request.files.get("image")
+    # Hash the password on the worker pool before touching the file system
+    try:
+        password_hash = get_password_hasher().hash(data["password"])
+    except HashingUnavailableError:
+        return hashing_unavailable_response()
 
-    filename = None
-    if image_file and allowed_file(image_file.filename):
-        # Secure the filename to prevent directory traversal attacks
-        filename = secure_filename(image_file.filename)
-        upload_path = os.path.join("uploads/photos", filename)
-        image_file.save(upload_path)
+    # Handle optional image, sent inline or as a finished resumable upload
+    try:
+        filename = store_request_image(request)
+    except (NotFound, Conflict) as error:
+        return invalid_upload_response(error)
 
     # Create new user instance with provided data
     user = User(
         first_name=data["first_name"],
         last_name=data["last_name"],
         email=data["email"],
-        password=generate_password_hash(data["password"]),
+        password=password_hash,
         image=filename
     )
 
@@ -156,6 +521,9 @@ def create_user_service(request):
     db.session.add(user)
     db.session.commit()
 
+    # Generate resized derivatives of the new image in the background
+    queue_derivatives(filename)
+
     # Return created user data with 201 status (Created)
     return jsonify(user.to_dict()), 201
 
@@ -175,6 +543,8 @@ def update_user_service(user_id: int, request):
         tuple: (JSON response, HTTP status code)
             - 200: User successfully updated
             - 404: User not found
+            - 409: User was modified by another request meanwhile
+            - 503: Password hashing pool is saturated
             
     Optional fields:
         - first_name (str): Updated first name
@@ -182,9 +552,10 @@ def update_user_service(user_id: int, request):
         - email (str): Updated email
         - password (str): Updated password
         - image (file): New profile image
+        - upload_id (str): Finished resumable upload, instead of image
     """
     # Query for user by ID
-    user = User.query.get(user_id)
+    user = db.session.get(User, user_id)
 
     # Handle not found case
     if not user:
@@ -193,33 +564,143 @@ def update_user_service(user_id: int, request):
     # Extract form data from request
     data = request.form
 
+    # Hash a new password on the worker pool before changing anything
+    password_hash = None
+    if data.get("password"):
+        try:
+            password_hash = get_password_hasher().hash(data["password"])
+        except HashingUnavailableError:
+            return hashing_unavailable_response()
+
     # Update fields if provided, otherwise keep existing values
     user.first_name = data.get("first_name", user.first_name)
     user.last_name = data.get("last_name", user.last_name)
     user.email = data.get("email", user.email)
     # Only update password if provided; store as a hash
-    if data.get("password"):
-        user.password = generate_password_hash(data.get("password"))
-
-    # Handle optional image update
-    image_file = request.files.get("image")
-    if image_file and allowed_file(image_file.filename):
-        filename = secure_filename(image_file.filename)
-        upload_path = os.path.join("uploads/photos", filename)
-        image_file.save(upload_path)
-        user.image = filename
-
-    # Commit changes to database
-    db.session.commit()
+    if password_hash:
+        user.password = password_hash
+
+    # Handle optional image update, sent inline or as a resumable upload
+    previous_image = user.image
+    try:
+        image = store_request_image(request)
+    except (NotFound, Conflict) as error:
+        db.session.rollback()
+        return invalid_upload_response(error)
+    if image:
+        user.image = image
+
+    # The replaced image is deleted after the commit if nobody else uses it
+    if previous_image and previous_image != user.image:
+        release_after_commit(previous_image)
+
+    # Commit changes to database and drop the stale cache entry
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return concurrent_update_response()
+    get_user_cache().delete(user_cache_key(user_id))
+
+    # Generate derivatives of a new image in the background
+    if previous_image != user.image:
+        queue_derivatives(user.image)
 
     # Return updated user data
     return jsonify(user.to_dict()), 200
 
 
+def patch_user_service(user_id: int, request):
+    """
+    Partially update a user with a single ``UPDATE ... RETURNING`` statement.
+    
+    Only the columns present in the JSON body are written; the row is
+    neither read before the update nor reloaded after it. A missing user is
+    detected from the statement matching no row. Dialects without UPDATE
+    RETURNING (e.g. MySQL) issue one extra SELECT for the response body.
+    
+    Args:
+        user_id (int): The unique identifier of the user to update
+        request: Flask request object with a JSON object body
+        
+    Returns:
+        tuple: (JSON response, HTTP status code)
+            - 200: User updated, returns user data with a strong ETag
+            - 400: Body is not a JSON object, is empty or has unknown fields
+            - 404: User not found
+            - 409: Email already exists
+            - 503: Password hashing pool is saturated
+            
+    Accepted JSON fields:
+        - first_name, last_name, email, password (str)
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({"error": "Request body must be a non-empty JSON object"}), 400
+
+    unknown = sorted(set(data).difference(PATCHABLE_FIELDS))
+    if unknown:
+        return jsonify({"error": f"Fields cannot be updated: {', '.join(unknown)}"}), 400
+    if not all(isinstance(value, str) and value for value in data.values()):
+        return jsonify({"error": "Field values must be non-empty strings"}), 400
+
+    values = dict(data)
+
+    # Hash a new password on the worker pool before touching the database
+    if "password" in values:
+        try:
+            values["password"] = get_password_hasher().hash(values["password"])
+        except HashingUnavailableError:
+            return hashing_unavailable_response()
+
+    # Core UPDATEs bypass the ORM version counter, so bump it explicitly
+    stmt = (
+        update(User)
+        .where(User.id == user_id)
+        .values(**values, version=User.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    columns = (*User.public_columns(), User.version)
+
+    try:
+        if db.engine.dialect.update_returning:
+            row = db.session.execute(stmt.returning(*columns)).mappings().first()
+        else:
+            # No RETURNING: the rowcount tells whether the user exists
+            row = None
+            if db.session.execute(stmt).rowcount:
+                row = db.session.execute(
+                    select(*columns).where(User.id == user_id)
+                ).mappings().first()
+        # Publish on the change feed once the UPDATE has matched the user
+        # (password-only changes are not published)
+        if row is not None and set(values) - {"password"}:
+            record_changed(db.session, [user_id])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Email already exists"}), 409
+
+    # Handle not found case
+    if row is None:
+        return jsonify({"error": "User not found"}), 404
+
+    get_user_cache().delete(user_cache_key(user_id))
+
+    fields = tuple(User.PUBLIC_FIELDS)
+    response = jsonify({field: row[field] for field in fields})
+    return set_etag(response, compute_etag("user", user_id, row["version"], fields)), 200
+
+
 def verify_user_password(user: User, plain_password: str) -> bool:
     """
     Verify a plaintext password against the stored hash.
 
+    When the password matches a hash made with an older or cheaper method
+    than the configured one, the hash is upgraded transparently. The
+    upgrade is best effort: if the hashing pool is busy it is retried on a
+    later successful login.
+
     Args:
         user (User): User model instance with `password` hash
         plain_password (str): Plaintext password to verify
@@ -227,15 +708,31 @@ def verify_user_password(user: User, plain_password: str) -> bool:
     Returns:
         bool: True if password matches, False otherwise
     """
-    return check_password_hash(user.password, plain_password)
+    if not check_password_hash(user.password, plain_password):
+        return False
+
+    hasher = get_password_hasher()
+    if needs_rehash(user.password, hasher.method):
+        try:
+            user.password = hasher.hash(plain_password)
+            db.session.commit()
+        except HashingUnavailableError:
+            pass
+        except StaleDataError:
+            # Changed by another request meanwhile; upgraded on a later login
+            db.session.rollback()
+
+    return True
 
 
 def delete_user_service(user_id: int):
     """
     Delete a user account and associated files.
     
-    Removes the user record from the database and deletes any associated
-    profile image files from the file system.
+    Removes the user record from the database and leaves a tombstone on
+    the change feed (recorded by the flush hook in app/utils/changes.py).
+    The profile image is deleted from the file system after a successful
+    commit, on a background worker (see app/utils/file_gc.py).
     
     Args:
         user_id (int): The unique identifier of the user to delete
@@ -244,23 +741,26 @@ def delete_user_service(user_id: int):
         tuple: (JSON response, HTTP status code)
             - 200: User successfully deleted
             - 404: User not found
+            - 409: User was modified by another request meanwhile
     """
     # Query for user by ID
-    user = User.query.get(user_id)
+    user = db.session.get(User, user_id)
 
     # Handle not found case
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    # Delete associated image file if it exists
-    if user.image:
-        image_path = os.path.join("uploads/photos", user.image)
-        if os.path.exists(image_path):
-            os.remove(image_path)
-
-    # Remove user from database and commit changes
+    # Remove user from database, commit changes and drop the cache entry
+    # The image file is deleted in the background after the commit, once no
+    # other user shares it
+    release_after_commit(user.image)
     db.session.delete(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return concurrent_update_response()
+    get_user_cache().delete(user_cache_key(user_id))
 
     # Return success message
     return jsonify({"message": "User deleted successfully"}), 200
@@ -0,0 +1,249 @@
+"""
+Cache Backends Module
+
+This module provides the pluggable cache used in front of single-user reads.
+``MemoryCache`` is an in-process LRU cache with a per-entry TTL and is the
+default. A shared cache (Redis, Memcached, ...) can be plugged in by
+subclassing ``CacheBackend`` and pointing USER_CACHE_BACKEND at it with a
+``"package.module:ClassName"`` path.
+
+Cached values must be plain JSON-compatible data so that shared backends
+can serialize them.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from flask import Flask, current_app
+
+
+class CacheBackend:
+    """
+    Interface for user cache backends.
+
+    Subclasses must implement ``get``, ``set``, ``delete`` and ``clear``,
+    and should keep the counters returned by ``stats`` up to date.
+    """
+
+    def __init__(self, max_size: int = 0, ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "CacheBackend":
+        """
+        Build a backend from the application configuration.
+
+        Args:
+            config (dict): Flask ``app.config``
+
+        Returns:
+            CacheBackend: Configured backend instance
+        """
+        return cls(max_size=config["USER_CACHE_SIZE"], ttl=config["USER_CACHE_TTL"])
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key``, or None on a miss."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any) -> None:
+        """Store ``value`` under ``key``."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove ``key`` if present."""
+        raise NotImplementedError
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Return the cached values for several keys.
+
+        Backends with a multi-get command (e.g. Redis ``MGET``) should
+        override this to fetch all keys in one round trip.
+
+        Returns:
+            dict: Key to value for the keys that were hits
+        """
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def set_many(self, values: Dict[str, Any]) -> None:
+        """Store several key/value pairs."""
+        for key, value in values.items():
+            self.set(key, value)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        """
+        Return cache counters for sizing and monitoring.
+
+        Returns:
+            dict: backend name, hits, misses, evictions (capacity),
+            expirations (TTL), current size and configured limits
+        """
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+        }
+
+
+class NullCache(CacheBackend):
+    """Cache backend that stores nothing (caching disabled)."""
+
+    def get(self, key: str) -> Optional[Any]:
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """
+    Thread-safe in-process LRU cache with a time-to-live per entry.
+
+    When ``max_size`` entries are stored, the least recently used entry is
+    evicted. Entries older than ``ttl`` seconds are treated as misses.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300):
+        super().__init__(max_size=max_size, ttl=ttl)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.set_many({key: value})
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        # One lock acquisition for the whole batch
+        with self._lock:
+            now = time.monotonic()
+            values = {}
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                elif entry[0] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    values[key] = entry[1]
+            return values
+
+    def set_many(self, values: Dict[str, Any]) -> None:
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl
+            for key, value in values.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Built-in backends selectable by name in USER_CACHE_BACKEND
+CACHE_BACKENDS = {
+    "memory": MemoryCache,
+    "null": NullCache,
+}
+
+
+def init_user_cache(app: Flask) -> CacheBackend:
+    """
+    Create the user cache selected by USER_CACHE_BACKEND.
+
+    Args:
+        app (Flask): Application instance
+
+    Returns:
+        CacheBackend: Backend stored in ``app.extensions["user_cache"]``
+
+    Raises:
+        ImportError: If a custom backend path cannot be imported
+    """
+    backend = app.config["USER_CACHE_BACKEND"]
+    if backend in CACHE_BACKENDS:
+        backend_class = CACHE_BACKENDS[backend]
+    else:
+        module_name, _, class_name = backend.partition(":")
+        backend_class = getattr(importlib.import_module(module_name), class_name)
+
+    cache = backend_class.from_config(app.config)
+    app.extensions["user_cache"] = cache
+    return cache
+
+
+def get_user_cache() -> CacheBackend:
+    """Return the user cache for the current application."""
+    return current_app.extensions["user_cache"]
+
+
+def user_cache_key(user_id: int) -> str:
+    """Return the cache key for a single user."""
+    return f"user:{user_id}"
@@ -0,0 +1,286 @@
+"""
+Request Capture Module
+
+This module records API traffic as a JSON Lines trace that
+``benchmarks/replay_requests.py`` can replay against a local instance, so
+performance changes are tested with a realistic request mix.
+
+Capture is opt-in (REQUEST_CAPTURE_ENABLED). For each sampled request under
+``/api/`` one line is appended to REQUEST_CAPTURE_FILE with:
+
+    - ts, method, path, query, content type and length, Accept header
+    - form fields and JSON bodies up to REQUEST_CAPTURE_MAX_BODY bytes,
+      with REQUEST_CAPTURE_REDACT_FIELDS (passwords) replaced
+    - uploaded files as name, content type and size only (never contents)
+    - status, duration_ms, db_queries and response_bytes
+
+Lines are handed to a background thread through a bounded queue and
+written in batches with a single ``write()`` on an ``O_APPEND`` descriptor,
+so several worker processes can share one file and a slow disk never blocks
+requests: when the queue is full, records are dropped and counted.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Optional
+
+from flask import Flask, current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+# Only requests under this prefix are captured (not images or metrics)
+CAPTURED_PATH_PREFIX = "/api/"
+
+# Request bodies parsed as forms
+FORM_MIMETYPES = {"multipart/form-data", "application/x-www-form-urlencoded"}
+
+# Placeholder stored instead of redacted values
+REDACTED = "<redacted>"
+
+
+def redact(value, fields: frozenset):
+    """
+    Replace the values of sensitive keys in a JSON document.
+
+    Args:
+        value: Parsed JSON (dict, list or scalar)
+        fields (frozenset): Keys whose values are replaced
+
+    Returns:
+        Copy of ``value`` with the sensitive values redacted
+    """
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if key in fields else redact(item, fields)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item, fields) for item in value]
+    return value
+
+
+class RequestCapture:
+    """
+    Bounded background writer of captured request records.
+
+    Attributes:
+        path (str): Trace file records are appended to
+        sample_rate (float): Fraction of requests captured (0-1)
+        max_body (int): Largest form or JSON body stored, in bytes
+        redact_fields (frozenset): Field names whose values are redacted
+        captured (int): Records written
+        dropped (int): Records discarded because the queue was full
+        errors (int): Records that could not be built or written
+    """
+
+    def __init__(self, path: str, sample_rate: float, max_body: int,
+                 redact_fields, queue_size: int):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_body = max_body
+        self.redact_fields = frozenset(redact_fields)
+        self.captured = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def sampled(self) -> bool:
+        """Return True if the current request should be captured."""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def submit(self, record: dict) -> None:
+        """Queue a record for writing, dropping it if the queue is full."""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(json.dumps(record, separators=(",", ":"), default=str))
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self) -> None:
+        """Start the writer thread on first use."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="request-capture", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Write queued records in batches forever."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        while True:
+            lines = [self._queue.get()]
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+                while data:
+                    data = data[os.write(fd, data):]
+                self.captured += len(lines)
+            except OSError:
+                self.errors += len(lines)
+                logger.exception("Writing %d captured requests failed", len(lines))
+            finally:
+                for _ in lines:
+                    self._queue.task_done()
+
+    def join(self) -> None:
+        """Block until every queued record has been written."""
+        self._queue.join()
+
+    def stats(self) -> dict:
+        """
+        Return writer counters.
+
+        Returns:
+            dict: path, queued, captured, dropped and errors
+        """
+        return {
+            "path": self.path,
+            "queued": self._queue.qsize(),
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+    def build_record(self, response, duration: float) -> dict:
+        """
+        Describe the current request and its response.
+
+        Args:
+            response: Response being returned
+            duration (float): Seconds spent handling the request
+
+        Returns:
+            dict: Trace record (see module docstring)
+        """
+        record = {
+            "ts": round(time.time() - duration, 6),
+            "method": request.method,
+            "path": request.path,
+            "query": request.query_string.decode("latin-1"),
+            "content_type": request.mimetype or None,
+            "content_length": request.content_length,
+            "accept": request.headers.get("Accept"),
+        }
+
+        small = (request.content_length or 0) <= self.max_body
+        if request.mimetype in FORM_MIMETYPES:
+            if small:
+                record["form"] = {
+                    name: [REDACTED] * len(values) if name in self.redact_fields else values
+                    for name, values in request.form.to_dict(flat=False).items()
+                }
+            else:
+                record["body_omitted"] = True
+            record["files"] = {
+                name: [
+                    {
+                        "filename": upload.filename,
+                        "content_type": upload.mimetype,
+                        "size": _file_size(upload),
+                    }
+                    for upload in request.files.getlist(name)
+                ]
+                for name in request.files
+            }
+        elif request.is_json:
+            body = request.get_json(silent=True) if small else None
+            if body is None:
+                # Too large, invalid or streamed by the view: replay cannot rebuild it
+                record["body_omitted"] = True
+            else:
+                record["json"] = redact(body, self.redact_fields)
+        elif request.content_length:
+            record["body_omitted"] = True
+
+        record.update({
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "db_queries": g.get("db_queries"),
+            "response_bytes": None if response.is_streamed else response.content_length,
+        })
+        return record
+
+
+def _file_size(upload) -> Optional[int]:
+    """Return the size of an uploaded file without reading it."""
+    stream = upload.stream
+    size = getattr(stream, "size", None)
+    if size is not None:
+        return size
+    try:
+        position = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def init_request_capture(app: Flask, base_dir: str) -> Optional[RequestCapture]:
+    """
+    Register the capture hook when REQUEST_CAPTURE_ENABLED is set.
+
+    Args:
+        app (Flask): Application instance
+        base_dir (str): Project root; relative REQUEST_CAPTURE_FILE paths
+            are resolved against it
+
+    Returns:
+        RequestCapture | None: Writer stored in ``app.extensions["request_capture"]``,
+            or None when capture is disabled
+    """
+    config = app.config
+    if not config["REQUEST_CAPTURE_ENABLED"]:
+        return None
+
+    path = config["REQUEST_CAPTURE_FILE"]
+    if not os.path.isabs(path):
+        path = os.path.join(base_dir, path)
+    capture = RequestCapture(
+        path,
+        sample_rate=config["REQUEST_CAPTURE_SAMPLE_RATE"],
+        max_body=config["REQUEST_CAPTURE_MAX_BODY"],
+        redact_fields=config["REQUEST_CAPTURE_REDACT_FIELDS"],
+        queue_size=config["REQUEST_CAPTURE_QUEUE_SIZE"],
+    )
+    app.extensions["request_capture"] = capture
+
+    @app.after_request
+    def capture_request(response):
+        if not request.path.startswith(CAPTURED_PATH_PREFIX) or not capture.sampled():
+            return response
+        started = g.get("request_started")
+        duration = time.perf_counter() - started if started is not None else 0.0
+        try:
+            capture.submit(capture.build_record(response, duration))
+        except Exception:  # pylint: disable=broad-except
+            # Capture must never fail the request it describes
+            capture.errors += 1
+            logger.exception("Capturing %s %s failed", request.method, request.path)
+        return response
+
+    return capture
+
+
+def get_request_capture() -> Optional[RequestCapture]:
+    """Return the request capture writer of the current application, if enabled."""
+    return current_app.extensions.get("request_capture")
@@ -0,0 +1,282 @@
+"""
+Change Feed Module
+
+This module maintains the change sequence behind ``GET /api/users/changes``.
+
+Every change to a user's public fields stamps the row with a new
+``change_seq`` taken from the single-row ``change_sequence`` counter, and
+every delete leaves a ``UserTombstone`` with its own position. Clients keep
+the last position they have seen and ask only for later ones, so a sync
+costs as much as the number of changes, not the size of the table.
+
+Ordering: writers only record which users they changed or deleted
+(``record_changed``/``record_deleted``; ORM flushes are recorded
+automatically). Positions are handed out at commit time, in
+``before_commit``: one ``UPDATE change_sequence SET value = value + n``,
+then one executemany UPDATE stamping the changed rows and one INSERT of the
+tombstones. The counter's row lock is held from there until the commit
+completes. That keeps positions visible in increasing order, so a reader
+can never skip past an in-flight change. Writers still serialize on the
+counter, but only for these last statements and the commit, not for
+their whole transaction. The counter is always the last row a writer
+locks, so the lock order is the same everywhere. Transactions that change
+nothing on the feed never touch the counter. Gaps from rolled-back commits
+are harmless.
+
+Wake-ups: after a commit that allocated positions, the ``ChangeNotifier``
+wakes long-polling and streaming requests in the same process; requests
+also re-check the database every CHANGES_POLL_INTERVAL seconds to see
+writes made by other processes.
+
+Tombstones older than CHANGES_TOMBSTONE_RETENTION_DAYS are removed by
+``flask changes-prune``; cursors older than the pruned tombstones get
+410 Gone and must resync.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable
+
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, delete, event, func, insert, inspect, select, update
+
+from .. import db
+from ..models import ChangeSequence, User, UserTombstone
+from .db_router import RoutingSession
+
+# Primary key of the counter row in change_sequence
+SEQUENCE_ID = 1
+
+# Session.info key holding the highest position allocated in the transaction
+ALLOCATED_SEQ = "allocated_change_seq"
+
+# Session.info keys holding the user ids changed and deleted in the transaction
+PENDING_UPSERTS = "pending_change_upserts"
+PENDING_DELETES = "pending_change_deletes"
+
+# Changes to these fields are published on the feed (password is not)
+FEED_FIELDS = tuple(field for field in User.PUBLIC_FIELDS if field != "id")
+
+# Stamps one changed row; run as executemany with one parameter set per row
+_STAMP_ROW = (
+    update(User.__table__)
+    .where(User.__table__.c.id == bindparam("stamped_id"))
+    .values(change_seq=bindparam("stamped_seq"))
+)
+
+
+def allocate_change_seqs(session, count: int = 1) -> int:
+    """
+    Reserve ``count`` consecutive change feed positions.
+
+    Locks the counter row until the session's transaction ends. Only
+    ``before_commit`` calls it, once per transaction, after every other
+    write, so the lock is held for as short a time as possible.
+
+    Args:
+        session: Database session of the writing transaction
+        count (int): Number of positions to reserve
+
+    Returns:
+        int: First reserved position
+    """
+    stmt = (
+        update(ChangeSequence)
+        .where(ChangeSequence.id == SEQUENCE_ID)
+        .values(value=ChangeSequence.value + count)
+        .execution_options(synchronize_session=False)
+    )
+    if db.engine.dialect.update_returning:
+        last = session.execute(stmt.returning(ChangeSequence.value)).scalar_one()
+    else:
+        session.execute(stmt)
+        last = session.execute(
+            select(ChangeSequence.value).where(ChangeSequence.id == SEQUENCE_ID)
+        ).scalar_one()
+
+    session.info[ALLOCATED_SEQ] = max(session.info.get(ALLOCATED_SEQ, 0), last)
+    return last - count + 1
+
+
+def record_changed(session, user_ids: Iterable[int]) -> None:
+    """
+    Publish users created or updated with Core statements at the next commit.
+
+    ORM changes are recorded automatically; call this after Core INSERTs or
+    UPDATEs of feed fields, once the statement has matched the rows.
+
+    Args:
+        session: Database session of the writing transaction
+        user_ids (Iterable[int]): Ids of the changed users
+    """
+    session.info.setdefault(PENDING_UPSERTS, set()).update(user_ids)
+
+
+def record_deleted(session, user_ids: Iterable[int]) -> None:
+    """
+    Record tombstones for users deleted with Core statements at the next commit.
+
+    Args:
+        session: Database session of the writing transaction
+        user_ids (Iterable[int]): Ids of the deleted users
+    """
+    session.info.setdefault(PENDING_DELETES, set()).update(user_ids)
+
+
+def _feed_changed(user: User) -> bool:
+    """Return True if a flushed update touched a field published on the feed."""
+    attrs = inspect(user).attrs
+    return any(attrs[field].history.has_changes() for field in FEED_FIELDS)
+
+
+def _after_flush(session, flush_context) -> None:
+    """Record users inserted, updated or deleted by the ORM."""
+    record_changed(session, [
+        user.id for user in session.new if isinstance(user, User)
+    ] + [
+        user.id for user in session.dirty
+        if isinstance(user, User) and session.is_modified(user) and _feed_changed(user)
+    ])
+    record_deleted(session, [user.id for user in session.deleted if isinstance(user, User)])
+
+
+def _before_commit(session) -> None:
+    """Allocate positions for the recorded changes and write them."""
+    # Flush pending ORM changes first so they are recorded too
+    session.flush()
+    deleted = sorted(session.info.pop(PENDING_DELETES, ()))
+    changed = sorted(set(session.info.pop(PENDING_UPSERTS, ())).difference(deleted))
+    if not changed and not deleted:
+        return
+
+    position = allocate_change_seqs(session, len(changed) + len(deleted))
+    if changed:
+        session.execute(_STAMP_ROW, [
+            {"stamped_id": user_id, "stamped_seq": position + offset}
+            for offset, user_id in enumerate(changed)
+        ])
+        position += len(changed)
+    if deleted:
+        session.execute(insert(UserTombstone), [
+            {"change_seq": position + offset, "user_id": user_id}
+            for offset, user_id in enumerate(deleted)
+        ])
+
+
+class ChangeNotifier:
+    """
+    Wakes requests waiting for new changes in this process.
+
+    Attributes:
+        latest (int): Highest change feed position committed in this process
+    """
+
+    def __init__(self):
+        self.latest = 0
+        self._condition = threading.Condition()
+
+    def notify(self, position: int) -> None:
+        """Record a committed position and wake all waiters."""
+        with self._condition:
+            self.latest = max(self.latest, position)
+            self._condition.notify_all()
+
+    def wait(self, seen: int, timeout: float) -> bool:
+        """
+        Block until a position after ``seen`` is committed or ``timeout`` passes.
+
+        Args:
+            seen (int): Value of ``latest`` when the caller last queried
+            timeout (float): Maximum seconds to wait
+
+        Returns:
+            bool: True if woken by a new commit
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self.latest > seen, timeout)
+
+
+def _after_commit(session) -> None:
+    position = session.info.pop(ALLOCATED_SEQ, None)
+    if position is not None:
+        current_app.extensions["change_notifier"].notify(position)
+
+
+def _after_rollback(session) -> None:
+    for key in (ALLOCATED_SEQ, PENDING_UPSERTS, PENDING_DELETES):
+        session.info.pop(key, None)
+
+
+def prune_tombstones(older_than: timedelta) -> int:
+    """
+    Delete tombstones older than ``older_than`` and advance ``pruned_through``.
+
+    Args:
+        older_than (timedelta): Minimum tombstone age
+
+    Returns:
+        int: Number of tombstones removed
+    """
+    cutoff = datetime.utcnow() - older_than
+    newest = db.session.scalar(
+        select(func.max(UserTombstone.change_seq)).where(UserTombstone.deleted_at < cutoff)
+    )
+    if newest is None:
+        return 0
+
+    removed = db.session.execute(
+        delete(UserTombstone).where(UserTombstone.change_seq <= newest)
+    ).rowcount
+    db.session.execute(
+        update(ChangeSequence)
+        .where(ChangeSequence.id == SEQUENCE_ID, ChangeSequence.pruned_through < newest)
+        .values(pruned_through=newest)
+    )
+    db.session.commit()
+    return removed
+
+
+@click.command("changes-prune")
+@click.option("--days", type=float, default=None,
+              help="Remove tombstones older than this many days "
+                   "(default: CHANGES_TOMBSTONE_RETENTION_DAYS).")
+@with_appcontext
+def changes_prune_command(days: float) -> None:
+    """Remove old delete tombstones from the user change feed."""
+    if days is None:
+        days = current_app.config["CHANGES_TOMBSTONE_RETENTION_DAYS"]
+    removed = prune_tombstones(timedelta(days=days))
+    click.echo(f"Removed {removed} tombstones older than {days:g} days.")
+
+
+def init_change_feed(app: Flask) -> ChangeNotifier:
+    """
+    Hook change sequencing into session flushes and commits.
+
+    Args:
+        app (Flask): Application instance
+
+    Returns:
+        ChangeNotifier: Notifier stored in ``app.extensions["change_notifier"]``
+    """
+    notifier = ChangeNotifier()
+    app.extensions["change_notifier"] = notifier
+
+    if not event.contains(RoutingSession, "after_flush", _after_flush):
+        event.listen(RoutingSession, "after_flush", _after_flush)
+        event.listen(RoutingSession, "before_commit", _before_commit)
+        event.listen(RoutingSession, "after_commit", _after_commit)
+        event.listen(RoutingSession, "after_rollback", _after_rollback)
+
+    app.cli.add_command(changes_prune_command)
+    return notifier
+
+
+def get_change_notifier() -> ChangeNotifier:
+    """Return the change notifier of the current application."""
+    return current_app.extensions["change_notifier"]
@@ -0,0 +1,254 @@
+"""
+Read-Replica Routing Module
+
+This module sends read-only requests to database replicas while all writes
+stay on the primary database.
+
+Replicas are configured as extra SQLAlchemy binds (``replica_0``,
+``replica_1``, ...) built from DATABASE_REPLICA_URLS. Views decorated with
+``read_only`` pick a healthy replica in round-robin order, and
+``RoutingSession.get_bind`` sends that request's queries to it. Flushes
+always use the primary.
+
+A replica that fails with an operational error is ejected for
+REPLICA_EJECT_SECONDS and the request is retried once on the primary.
+After a successful write, the client receives a short-lived cookie that pins
+its reads to the primary for REPLICA_STICKY_SECONDS, so it reads its own
+writes despite replication lag.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import List, Optional
+
+from flask import Flask, current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+# Bind key prefix used for replica engines
+REPLICA_BIND_PREFIX = "replica_"
+
+# Cookie holding the time until which a client's reads stay on the primary
+STICKY_COOKIE = "db_primary_until"
+
+# HTTP methods treated as writes for read-after-write stickiness
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class RoutingSession(Session):
+    """Session that sends reads of replica-routed requests to the chosen replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context():
+            replica = g.get("db_replica")
+            if replica is not None:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Round-robin replica selection with health-based ejection.
+
+    Attributes:
+        bind_keys (list): Replica bind keys in configuration order
+        eject_seconds (float): How long a failed replica is skipped
+    """
+
+    def __init__(self, bind_keys: List[str], eject_seconds: float):
+        self.bind_keys = list(bind_keys)
+        self.eject_seconds = eject_seconds
+        self._ejected_until = {key: 0.0 for key in self.bind_keys}
+        self._cycle = itertools.cycle(self.bind_keys) if self.bind_keys else None
+        self._lock = threading.Lock()
+
+    def choose(self) -> Optional[str]:
+        """
+        Return the next healthy replica bind key.
+
+        Returns:
+            str | None: Bind key, or None if no replica is available
+        """
+        if self._cycle is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.bind_keys)):
+                key = next(self._cycle)
+                if self._ejected_until[key] <= now:
+                    return key
+        return None
+
+    def eject(self, bind_key: str) -> None:
+        """Skip ``bind_key`` for ``eject_seconds``."""
+        with self._lock:
+            self._ejected_until[bind_key] = time.monotonic() + self.eject_seconds
+
+    def status(self) -> dict:
+        """
+        Return the health of every replica.
+
+        Returns:
+            dict: ``{"replica_0": {"healthy": bool, "ejected_for": seconds}}``
+        """
+        now = time.monotonic()
+        return {
+            key: {
+                "healthy": until <= now,
+                "ejected_for": round(max(until - now, 0.0), 3),
+            }
+            for key, until in self._ejected_until.items()
+        }
+
+
+def replica_binds(replica_uris: List[str], engine_options: dict, instrument) -> dict:
+    """
+    Build SQLALCHEMY_BINDS entries for the configured replicas.
+
+    Each replica gets the same pool settings as the primary.
+
+    Args:
+        replica_uris (list): Replica database URIs
+        engine_options (dict): Engine options of the primary
+        instrument (callable): Function adding pool instrumentation to options
+
+    Returns:
+        dict: Bind key to engine options (including ``url``)
+    """
+    binds = {}
+    for index, uri in enumerate(replica_uris):
+        options = instrument(uri, {
+            key: value for key, value in engine_options.items() if key != "poolclass"
+        })
+        options["url"] = uri
+        binds[f"{REPLICA_BIND_PREFIX}{index}"] = options
+    return binds
+
+
+def _client_is_sticky() -> bool:
+    """Return True if the client wrote recently and must read from the primary."""
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def on_replica() -> bool:
+    """Return True if the current request's reads are routed to a replica."""
+    return has_app_context() and g.get("db_replica") is not None
+
+
+@contextmanager
+def use_primary():
+    """
+    Send queries in the ``with`` block to the primary database.
+
+    Used for reads that must not see replication lag.
+    """
+    replica = g.pop("db_replica", None)
+    try:
+        yield
+    finally:
+        if replica is not None:
+            g.db_replica = replica
+
+
+def read_only(view):
+    """
+    Mark a view as read-only so its queries may run on a replica.
+
+    Requests from clients inside their read-after-write window, and all
+    requests when no replica is healthy, use the primary. If the replica
+    fails with an operational (connection-level) error it is ejected and
+    the view is run again on the primary.
+
+    Args:
+        view (callable): Flask view function
+
+    Returns:
+        callable: Wrapped view
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Read-only views never mark the client as a recent writer, even for POST
+        g.db_read_only = True
+        router: Optional[ReplicaRouter] = current_app.extensions.get("replica_router")
+        replica = None
+        if router is not None and not _client_is_sticky():
+            replica = router.choose()
+        if replica is None:
+            return view(*args, **kwargs)
+
+        g.db_replica = replica
+        try:
+            return view(*args, **kwargs)
+        except OperationalError:
+            # Connection failures surface as OperationalError; retrying a
+            # read-only view on the primary is always safe
+            router.eject(replica)
+            current_app.extensions["sqlalchemy"].session.rollback()
+            g.pop("db_replica", None)
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def init_replica_routing(app: Flask, engines: dict) -> Optional[ReplicaRouter]:
+    """
+    Set up replica routing when replica binds are configured.
+
+    Registers a ``handle_error`` listener that ejects replicas on
+    disconnects, a ``before_request`` hook that resets the replica choice
+    and an ``after_request`` hook that sets the read-after-write cookie on
+    successful writes.
+
+    Args:
+        app (Flask): Application instance
+        engines (dict): Engines by bind key
+
+    Returns:
+        ReplicaRouter | None: Router stored in ``app.extensions["replica_router"]``
+    """
+    bind_keys = sorted(
+        key for key in engines if key and key.startswith(REPLICA_BIND_PREFIX)
+    )
+    if not bind_keys:
+        return None
+
+    router = ReplicaRouter(bind_keys, app.config["REPLICA_EJECT_SECONDS"])
+    app.extensions["replica_router"] = router
+
+    for key in bind_keys:
+        def on_error(context, bind_key=key):
+            if context.is_disconnect:
+                router.eject(bind_key)
+        event.listen(engines[key], "handle_error", on_error)
+
+    sticky_seconds = app.config["REPLICA_STICKY_SECONDS"]
+
+    @app.before_request
+    def reset_replica_choice():
+        # Every request starts on the primary until a read_only view opts in
+        g.pop("db_replica", None)
+        g.pop("db_read_only", None)
+
+    @app.after_request
+    def mark_recent_writer(response):
+        if (request.method in WRITE_METHODS and response.status_code < 400
+                and not g.get("db_read_only")):
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + sticky_seconds),
+                max_age=int(sticky_seconds) + 1,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    return router
@@ -0,0 +1,71 @@
+"""
+Conditional Request Utilities Module
+
+This module builds strong ETags from row versions and answers conditional
+GET requests (``If-None-Match``) with ``304 Not Modified`` before the
+response body is serialized.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import hashlib
+from typing import Optional
+
+from flask import Response
+
+
+def compute_etag(*parts) -> str:
+    """
+    Build an opaque strong ETag from version components.
+
+    Args:
+        *parts: Values that identify the representation, e.g. the row id,
+            its version and the selected fields
+
+    Returns:
+        str: Hex digest used as the (unquoted) ETag value
+    """
+    digest = hashlib.blake2s(digest_size=12)
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def not_modified(request, etag: str, headers: Optional[dict] = None) -> Optional[Response]:
+    """
+    Return a 304 response when the client already holds ``etag``.
+
+    Args:
+        request: Flask request object
+        etag (str): Current ETag of the resource
+        headers (dict, optional): Extra headers to repeat on the 304
+
+    Returns:
+        Response | None: Empty 304 response, or None if the body must be sent
+    """
+    if etag not in request.if_none_match:
+        return None
+
+    response = Response(status=304)
+    set_etag(response, etag)
+    for name, value in (headers or {}).items():
+        response.headers[name] = value
+    return response
+
+
+def set_etag(response: Response, etag: str) -> Response:
+    """
+    Attach a strong ETag and require clients to revalidate before reuse.
+
+    Args:
+        response (Response): Outgoing response
+        etag (str): ETag value
+
+    Returns:
+        Response: The same response, for chaining
+    """
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
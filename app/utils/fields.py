@@ -0,0 +1,46 @@
+"""
+Field Selection Utilities Module
+
+This module parses sparse fieldset parameters (``?fields=id,email``) used by
+the read endpoints to select only the requested columns.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+from typing import Iterable, Optional, Tuple
+
+
+def parse_fields(raw_fields: Optional[str], allowed: Iterable[str]) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated ``fields`` parameter into an ordered tuple.
+
+    The primary key ``id`` is always included so clients can correlate rows
+    and list pagination can compute the next cursor. Fields are returned in
+    the order of ``allowed`` so responses have a stable shape.
+
+    Args:
+        raw_fields (str | None): Raw value of the ``fields`` query parameter
+        allowed (Iterable[str]): Field names that may be selected
+
+    Returns:
+        tuple: Selected field names; all allowed fields when none are given
+
+    Raises:
+        ValueError: If an unknown field is requested
+
+    Example:
+        >>> parse_fields("email,id", ("id", "first_name", "email"))
+        ('id', 'email')
+    """
+    allowed = tuple(allowed)
+    if not raw_fields:
+        return allowed
+
+    requested = {name.strip() for name in raw_fields.split(",") if name.strip()}
+    unknown = sorted(requested.difference(allowed))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    requested.add("id")
+    return tuple(name for name in allowed if name in requested)
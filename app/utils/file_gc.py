@@ -0,0 +1,346 @@
+"""
+Upload Garbage Collection Module
+
+This module removes stored images that no user references any more.
+
+Deferred deletion: services call ``release_after_commit`` for an image
+whose reference they are removing. The name is remembered on the database
+session and only handed to the ``ImageDeletionQueue`` once the transaction
+commits; a rollback forgets it, so a failed commit never loses a file that
+a row still points to. A background thread drains the queue in batches,
+checks the names against ``User.image`` with one set-based query per batch
+and deletes the blobs that are still unreferenced.
+
+Sweeping: ``flask uploads-gc`` reconciles the whole upload folder with the
+database in bulk. It removes unreferenced blobs (for example from commits
+that failed after the file was stored), derivatives whose original is gone,
+stale partial uploads in the temp directory and expired resumable upload
+sessions. Files younger than UPLOADS_GC_MIN_AGE are skipped so in-flight
+uploads are never touched.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, List, Set
+
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, select
+
+from .. import db
+from ..models import User
+from .db_router import RoutingSession
+from .file_handler import DERIVED_DIR, TEMP_DIR, ImageStorage
+from .resumable import UPLOADS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding image names to release after the next commit
+PENDING_RELEASES = "pending_image_releases"
+
+# Storage subdirectories that never contain originals
+INTERNAL_DIRS = (TEMP_DIR, DERIVED_DIR, UPLOADS_DIR)
+
+
+def referenced_images(names: Iterable[str], batch_size: int) -> Set[str]:
+    """
+    Return the subset of ``names`` still stored in ``User.image``.
+
+    Runs one ``SELECT DISTINCT image ... WHERE image IN (...)`` per batch on
+    the primary database, outside the request's session.
+
+    Args:
+        names (Iterable[str]): Stored image names
+        batch_size (int): Names per query (keeps IN lists below driver limits)
+
+    Returns:
+        set: Names referenced by at least one user
+    """
+    names = list(names)
+    referenced: Set[str] = set()
+    with db.engine.connect() as connection:
+        for start in range(0, len(names), batch_size):
+            chunk = names[start:start + batch_size]
+            referenced.update(connection.scalars(
+                select(User.image).where(User.image.in_(chunk)).distinct()
+            ))
+    return referenced
+
+
+class ImageDeletionQueue:
+    """
+    Background deletion of released images.
+
+    With ``asynchronous`` disabled, released images are checked and
+    deleted right after the commit, on the committing thread.
+
+    Attributes:
+        storage (ImageStorage): Storage the images are deleted from
+        batch_size (int): Maximum names checked per query
+        asynchronous (bool): Delete on a background thread
+        grace (float): Blobs written or reused this many seconds ago or
+            less are kept, since a request may be about to reference them
+    """
+
+    def __init__(self, app: Flask, storage: ImageStorage, batch_size: int,
+                 asynchronous: bool, grace: float = 0):
+        self.app = app
+        self.storage = storage
+        self.batch_size = batch_size
+        self.asynchronous = asynchronous
+        self.grace = grace
+        self.deleted = 0
+        self.kept = 0
+        self.errors = 0
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, names: Iterable[str]) -> None:
+        """
+        Queue released images for deletion.
+
+        Args:
+            names (Iterable[str]): Image names whose reference was removed
+        """
+        if not self.asynchronous:
+            self._process(sorted(set(names)))
+            return
+
+        self._ensure_worker()
+        for name in names:
+            self._queue.put(name)
+
+    def _ensure_worker(self) -> None:
+        """Start the worker thread on first use."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="image-deletion", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Drain the queue in batches forever."""
+        while True:
+            names = [self._queue.get()]
+            while len(names) < self.batch_size:
+                try:
+                    names.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._process(sorted(set(names)))
+            except Exception:  # pylint: disable=broad-except
+                # Files left behind are reclaimed by `flask uploads-gc`
+                self.errors += 1
+                logger.exception("Deleting %d released images failed", len(names))
+            finally:
+                for _ in names:
+                    self._queue.task_done()
+
+    def _process(self, names: List[str]) -> None:
+        """Delete the names that no user references any more."""
+        with self.app.app_context():
+            referenced = referenced_images(names, self.batch_size)
+        for name in names:
+            # A recent mtime means an uncommitted request reused the blob;
+            # if it stays unreferenced, `flask uploads-gc` removes it later
+            if name in referenced or self.storage.modified_within(name, self.grace):
+                self.kept += 1
+            elif self.storage.delete(name):
+                self.deleted += 1
+
+    def join(self) -> None:
+        """Block until every queued image has been processed."""
+        self._queue.join()
+
+    def stats(self) -> dict:
+        """
+        Return queue depth and counters.
+
+        Returns:
+            dict: queued, deleted, kept (still referenced) and errors
+        """
+        return {
+            "queued": self._queue.qsize(),
+            "deleted": self.deleted,
+            "kept": self.kept,
+            "errors": self.errors,
+        }
+
+
+def release_after_commit(name: str) -> None:
+    """
+    Delete ``name`` once the current transaction commits, if unreferenced.
+
+    Call before committing the change that removes the reference.
+
+    Args:
+        name (str): Stored image name
+    """
+    if name:
+        db.session.info.setdefault(PENDING_RELEASES, set()).add(name)
+
+
+def release_images(names: Iterable[str]) -> None:
+    """
+    Delete already-released images in one batch, if unreferenced.
+
+    For callers that removed the references in transactions that have
+    already committed, such as chunked bulk deletes.
+
+    Args:
+        names (Iterable[str]): Stored image names
+    """
+    current_app.extensions["image_deletion_queue"].submit(names)
+
+
+def _after_commit(session) -> None:
+    names = session.info.pop(PENDING_RELEASES, None)
+    if names:
+        current_app.extensions["image_deletion_queue"].submit(names)
+
+
+def _after_rollback(session) -> None:
+    session.info.pop(PENDING_RELEASES, None)
+
+
+def init_image_deletion(app: Flask, storage: ImageStorage) -> ImageDeletionQueue:
+    """
+    Create the deferred deletion queue and hook it to session commits.
+
+    Args:
+        app (Flask): Application instance
+        storage (ImageStorage): Image storage of the application
+
+    Returns:
+        ImageDeletionQueue: Queue stored in ``app.extensions["image_deletion_queue"]``
+    """
+    deletion_queue = ImageDeletionQueue(
+        app,
+        storage,
+        batch_size=app.config["IMAGE_DELETE_BATCH_SIZE"],
+        asynchronous=app.config["IMAGE_DELETE_ASYNC"],
+        grace=app.config["IMAGE_DELETE_GRACE_SECONDS"],
+    )
+    app.extensions["image_deletion_queue"] = deletion_queue
+
+    if not event.contains(RoutingSession, "after_commit", _after_commit):
+        event.listen(RoutingSession, "after_commit", _after_commit)
+        event.listen(RoutingSession, "after_rollback", _after_rollback)
+
+    app.cli.add_command(uploads_gc_command)
+    return deletion_queue
+
+
+def _stored_files(storage: ImageStorage, min_mtime: float) -> Iterator[str]:
+    """Yield names of originals last modified before ``min_mtime``."""
+    for directory, subdirectories, files in os.walk(storage.root):
+        if directory == storage.root:
+            subdirectories[:] = [d for d in subdirectories if d not in INTERNAL_DIRS]
+        for filename in files:
+            path = os.path.join(directory, filename)
+            if os.path.getmtime(path) < min_mtime:
+                yield os.path.relpath(path, storage.root).replace(os.sep, "/")
+
+
+def _remove(path: str, dry_run: bool) -> int:
+    """Remove a file unless ``dry_run``; return 1 if it counts as removed."""
+    if not dry_run:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+    return 1
+
+
+def sweep_uploads(storage: ImageStorage, batch_size: int, min_age: float,
+                  dry_run: bool = False) -> dict:
+    """
+    Reconcile the upload folder with ``User.image``.
+
+    Args:
+        storage (ImageStorage): Image storage to sweep
+        batch_size (int): Names checked per database query
+        min_age (float): Seconds a file must be untouched before removal
+        dry_run (bool): Count what would be removed without removing it
+
+    Returns:
+        dict: scanned originals, removed orphans, derivatives and temp files
+    """
+    min_mtime = time.time() - min_age
+    counts = {"scanned": 0, "orphans": 0, "derivatives": 0, "temp_files": 0}
+
+    # Unreferenced originals, checked against the database in batches
+    batch: List[str] = []
+
+    def flush() -> None:
+        referenced = referenced_images(batch, batch_size)
+        for name in batch:
+            # Check the mtime again: the blob may have been reused since it was listed
+            if name not in referenced and not storage.modified_within(name, min_age):
+                counts["orphans"] += _remove(storage.path_for(name), dry_run)
+                if not dry_run:
+                    storage.delete_derivatives(name)
+        batch.clear()
+
+    for name in _stored_files(storage, min_mtime):
+        counts["scanned"] += 1
+        batch.append(name)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    # Derivatives whose original no longer exists
+    derived_root = os.path.join(storage.root, DERIVED_DIR)
+    for directory, _, files in os.walk(derived_root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            if os.path.getmtime(path) >= min_mtime:
+                continue
+            # .derived/<size>/<stem>.<format> -> <stem>.*
+            stem = os.path.splitext(os.path.relpath(path, derived_root))[0].split(os.sep, 1)[-1]
+            original_dir, original_stem = os.path.split(os.path.join(storage.root, stem))
+            if not os.path.isdir(original_dir) or not any(
+                entry.startswith(f"{original_stem}.") for entry in os.listdir(original_dir)
+            ):
+                counts["derivatives"] += _remove(path, dry_run)
+
+    # Partial uploads left behind by crashed or aborted requests
+    for entry in os.scandir(storage.temp_dir):
+        if entry.is_file() and entry.stat().st_mtime < min_mtime:
+            counts["temp_files"] += _remove(entry.path, dry_run)
+
+    return counts
+
+
+@click.command("uploads-gc")
+@click.option("--dry-run", is_flag=True, help="Report what would be removed.")
+@click.option("--min-age", type=float, default=None,
+              help="Only remove files older than this many seconds (default: UPLOADS_GC_MIN_AGE).")
+@with_appcontext
+def uploads_gc_command(dry_run: bool, min_age: float) -> None:
+    """Remove uploaded images that no user references."""
+    config = current_app.config
+    counts = sweep_uploads(
+        current_app.extensions["image_storage"],
+        batch_size=config["IMAGE_DELETE_BATCH_SIZE"],
+        min_age=config["UPLOADS_GC_MIN_AGE"] if min_age is None else min_age,
+        dry_run=dry_run,
+    )
+    expired = current_app.extensions["resumable_uploads"].expire(dry_run=dry_run)
+    prefix = "Would remove" if dry_run else "Removed"
+    click.echo(
+        f"Scanned {counts['scanned']} images. {prefix} {counts['orphans']} orphaned images, "
+        f"{counts['derivatives']} orphaned derivatives, {counts['temp_files']} temp files "
+        f"and {expired} expired upload sessions."
+    )
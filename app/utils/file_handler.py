@@ -0,0 +1,336 @@
+"""
+File Handler Module
+
+This module stores user-uploaded images in content-addressed, sharded form.
+
+Each upload is streamed to a temporary file in fixed-size chunks while its
+SHA-256 digest is computed, then atomically renamed to
+``<root>/ab/cd/<sha256>.<ext>``. Two-level sharding keeps every directory
+small, content addressing means two users uploading ``photo.jpg`` can never
+overwrite each other, and identical images are stored once.
+
+A stored blob may be referenced by several users. References are counted
+from ``User.image`` by the service layer, which calls ``delete`` once the
+last reference is gone. Reusing an existing blob refreshes its mtime, and
+deleters skip recently modified blobs, so a blob re-referenced by a request
+that has not committed yet is not removed.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import glob
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from flask import Flask, current_app
+
+from .request_metrics import timed
+
+# Bytes read from the upload stream per iteration
+CHUNK_SIZE = 64 * 1024
+
+# Directory (inside the storage root) holding in-progress writes
+TEMP_DIR = ".tmp"
+
+# Directory (inside the storage root) holding resized derivatives per size
+DERIVED_DIR = ".derived"
+
+# Tail of a content-addressed name: ab/cd/abcd<60 more hex digits>.<ext>
+CONTENT_ADDRESSED_NAME = re.compile(
+    r"(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.[a-z0-9]+$"
+)
+
+
+class ImageStorage:
+    """
+    Content-addressed image store rooted at a directory.
+
+    Attributes:
+        root (str): Absolute path of the storage directory
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.temp_dir = os.path.join(self.root, TEMP_DIR)
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    @staticmethod
+    def blob_name(digest: str, extension: str) -> str:
+        """
+        Return the sharded relative name for a digest.
+
+        Args:
+            digest (str): Hex SHA-256 of the content
+            extension (str): File extension without the dot
+
+        Returns:
+            str: Relative name such as ``ab/cd/abcd...ef.png``
+
+        Example:
+            >>> ImageStorage.blob_name("abcdef", "png")
+            'ab/cd/abcdef.png'
+        """
+        return f"{digest[:2]}/{digest[2:4]}/{digest}.{extension.lower()}"
+
+    @staticmethod
+    def is_content_addressed(name: str) -> bool:
+        """
+        Return True if ``name`` is a content-addressed blob or derivative.
+
+        The content behind such a name never changes, so it can be cached
+        forever. Legacy flat filenames (``photo.jpg``) return False.
+        """
+        return CONTENT_ADDRESSED_NAME.search(name) is not None
+
+    def path_for(self, name: str) -> str:
+        """
+        Return the absolute path of a stored image.
+
+        Legacy flat filenames (``photo.jpg``) resolve inside the root as well.
+
+        Args:
+            name (str): Name stored in ``User.image``
+
+        Returns:
+            str: Absolute file path
+
+        Raises:
+            ValueError: If the name escapes the storage root
+        """
+        path = os.path.abspath(os.path.join(self.root, name))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Invalid image name: {name}")
+        return path
+
+    def derivative_name(self, name: str, size: int, image_format: str) -> str:
+        """
+        Return the relative name of a resized derivative of ``name``.
+
+        Args:
+            name (str): Name stored in ``User.image``
+            size (int): Longest edge of the derivative in pixels
+            image_format (str): Derivative file extension, e.g. ``webp``
+
+        Returns:
+            str: Relative name such as ``.derived/64/ab/cd/abcd...ef.webp``
+        """
+        stem = os.path.splitext(name)[0]
+        return f"{DERIVED_DIR}/{size}/{stem}.{image_format}"
+
+    def exists(self, name: str) -> bool:
+        """Return True if the image is present on disk."""
+        return os.path.isfile(self.path_for(name))
+
+    def modified_within(self, name: str, seconds: float) -> bool:
+        """
+        Return True if the image was written or reused in the last ``seconds``.
+
+        Args:
+            name (str): Name stored in ``User.image``
+            seconds (float): Grace window; 0 always returns False
+
+        Returns:
+            bool: True if the blob exists and its mtime is inside the window
+        """
+        if seconds <= 0:
+            return False
+        try:
+            return os.path.getmtime(self.path_for(name)) > time.time() - seconds
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _reuse(final_path: str) -> bool:
+        """
+        Mark an existing blob as just used and return True, or False if absent.
+
+        Refreshing the mtime keeps deferred deletes and ``flask uploads-gc``
+        away from a blob that a new row is about to reference.
+        """
+        try:
+            os.utime(final_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def save(self, stream, extension: str) -> str:
+        """
+        Store the content of ``stream`` and return its name.
+
+        The content is hashed while it is copied to a temporary file in the
+        storage root, then moved into place with an atomic ``os.replace``.
+        If a blob with the same content already exists, the temporary file
+        is discarded and the existing blob is reused.
+
+        Args:
+            stream: Binary file-like object positioned at the start of the content
+            extension (str): File extension without the dot
+
+        Returns:
+            str: Relative blob name to store in ``User.image``
+        """
+        digest = hashlib.sha256()
+        with timed("file"):
+            fd, temp_path = tempfile.mkstemp(dir=self.temp_dir)
+            try:
+                with os.fdopen(fd, "wb") as temp_file:
+                    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        temp_file.write(chunk)
+                    temp_file.flush()
+                    os.fsync(temp_file.fileno())
+
+                name = self.blob_name(digest.hexdigest(), extension)
+                final_path = self.path_for(name)
+                if self._reuse(final_path):
+                    # Identical content is already stored
+                    os.remove(temp_path)
+                else:
+                    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                    os.replace(temp_path, final_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        return name
+
+    def store_upload(self, upload) -> str:
+        """
+        Move a validated upload into place and return its name.
+
+        The upload was hashed and written to the temp directory while the
+        request was parsed, so storing it is a single atomic rename (or a
+        delete, when identical content is already stored).
+
+        Args:
+            upload (ValidatedUpload): Upload produced by ``UploadRequest``
+
+        Returns:
+            str: Relative blob name to store in ``User.image``
+
+        Raises:
+            UnsupportedMediaType: If the upload is not a recognised image
+        """
+        upload.finish()
+        with timed("file"):
+            upload.flush()
+            os.fsync(upload.fileno())
+            name = self.blob_name(upload.hexdigest(), upload.extension)
+            final_path = self.path_for(name)
+            if not self._reuse(final_path):
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(upload.temp_path, final_path)
+                upload.stored = True
+            upload.close()
+        return name
+
+    def store_file(self, path: str, extension: str) -> str:
+        """
+        Move a complete file from inside the storage root into place.
+
+        The file is read once to compute its digest and then renamed, so
+        it is never copied. Used for finished resumable uploads.
+
+        Args:
+            path (str): Absolute path of the file, on the storage's file system
+            extension (str): File extension without the dot
+
+        Returns:
+            str: Relative blob name to store in ``User.image``
+        """
+        digest = hashlib.sha256()
+        with timed("file"):
+            with open(path, "rb") as source:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+
+            name = self.blob_name(digest.hexdigest(), extension)
+            final_path = self.path_for(name)
+            if self._reuse(final_path):
+                # Identical content is already stored
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(path, final_path)
+        return name
+
+    def delete(self, name: str) -> bool:
+        """
+        Remove a stored image and its derivatives.
+
+        Args:
+            name (str): Name stored in ``User.image``
+
+        Returns:
+            bool: True if a file was removed
+        """
+        self.delete_derivatives(name)
+        try:
+            os.remove(self.path_for(name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete_derivatives(self, name: str) -> int:
+        """
+        Remove every resized derivative of ``name``.
+
+        Args:
+            name (str): Name stored in ``User.image``
+
+        Returns:
+            int: Number of files removed
+        """
+        self.path_for(name)  # Rejects names outside the storage root
+        stem = glob.escape(os.path.splitext(name)[0])
+        removed = 0
+        for path in glob.glob(os.path.join(self.root, DERIVED_DIR, "*", f"{stem}.*")):
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+def resolve_upload_folder(app: Flask, base_dir: str) -> str:
+    """
+    Return the absolute upload folder, relative paths being resolved
+    against the project root rather than the working directory.
+
+    Args:
+        app (Flask): Application instance
+        base_dir (str): Project root directory
+
+    Returns:
+        str: Absolute upload folder path
+    """
+    folder = app.config["UPLOAD_FOLDER"]
+    if not os.path.isabs(folder):
+        folder = os.path.join(base_dir, folder)
+    return folder
+
+
+def init_image_storage(app: Flask, root: str) -> ImageStorage:
+    """
+    Create the application's image storage.
+
+    Args:
+        app (Flask): Application instance
+        root (str): Absolute storage directory
+
+    Returns:
+        ImageStorage: Storage stored in ``app.extensions["image_storage"]``
+    """
+    storage = ImageStorage(root)
+    app.extensions["image_storage"] = storage
+    return storage
+
+
+def get_image_storage() -> ImageStorage:
+    """Return the image storage of the current application."""
+    return current_app.extensions["image_storage"]
@@ -0,0 +1,74 @@
+"""
+Metrics Primitives Module
+
+This module provides small, thread-safe metric types used by the runtime
+instrumentation (connection pool statistics and request metrics).
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import bisect
+import threading
+from typing import Sequence
+
+# Default latency buckets in seconds (upper bounds, +Inf is implicit)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket upper bounds.
+
+    Attributes:
+        buckets (tuple): Bucket upper bounds in ascending order
+        count (int): Number of observations
+        total (float): Sum of all observed values
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record a single observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def cumulative_counts(self) -> list:
+        """
+        Return ``(upper_bound, cumulative_count)`` pairs including ``+Inf``.
+
+        Returns:
+            list: Pairs in ascending bucket order, as used by Prometheus
+        """
+        with self._lock:
+            counts = list(self._counts)
+        pairs = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            pairs.append((bound, running))
+        return pairs
+
+    def snapshot(self) -> dict:
+        """
+        Return the histogram as a JSON-compatible dictionary.
+
+        Returns:
+            dict: count, sum and cumulative bucket counts keyed by upper bound
+        """
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in self.cumulative_counts()
+            },
+        }
@@ -0,0 +1,161 @@
+"""
+Pagination Utilities Module
+
+This module provides helpers for keyset (cursor) pagination on list endpoints.
+Cursors are opaque to clients: they are URL-safe base64 encoded JSON documents
+holding the last primary key seen, so the next page can be fetched with an
+indexed ``WHERE id > :after`` range scan instead of an OFFSET scan.
+
+Lists sorted by other columns use keyset cursors holding the full sort key
+of the last row (for example last name, first name and id).
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import base64
+import binascii
+import json
+from typing import List, Optional
+from urllib.parse import urlencode
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client supplies a malformed pagination cursor."""
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Encode the last seen primary key as an opaque cursor string.
+
+    Args:
+        last_id (int): Primary key of the last row on the current page
+
+    Returns:
+        str: URL-safe cursor without base64 padding
+
+    Example:
+        >>> decode_cursor(encode_cursor(42))
+        42
+    """
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor (str | None): Cursor string from the ``after`` query parameter
+
+    Returns:
+        int | None: Last seen primary key, or None when no cursor was given
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded
+    """
+    if not cursor:
+        return None
+
+    # Restore the padding stripped by encode_cursor
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        last_id = payload["id"]
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise InvalidCursorError("Invalid cursor")
+    return last_id
+
+
+def encode_keyset_cursor(values: list) -> str:
+    """
+    Encode the sort key of the last row as an opaque cursor string.
+
+    Args:
+        values (list): Sort column values of the last row, ending with its id
+
+    Returns:
+        str: URL-safe cursor without base64 padding
+
+    Example:
+        >>> decode_keyset_cursor(encode_keyset_cursor(["Doe", "Jane", 7]), 3)
+        ['Doe', 'Jane', 7]
+    """
+    raw = json.dumps({"k": values}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_keyset_cursor(cursor: Optional[str], length: int) -> Optional[List]:
+    """
+    Decode a cursor produced by ``encode_keyset_cursor``.
+
+    Args:
+        cursor (str | None): Cursor string from the ``after`` query parameter
+        length (int): Number of sort columns the cursor must hold
+
+    Returns:
+        list | None: Sort key of the last seen row, or None when no cursor was given
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded or does not
+            match the sort order
+    """
+    if not cursor:
+        return None
+
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["k"]
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+
+    if not isinstance(values, list) or len(values) != length or not all(
+        isinstance(value, (str, int)) and not isinstance(value, bool) for value in values
+    ):
+        raise InvalidCursorError("Invalid cursor")
+    return values
+
+
+def parse_limit(raw_limit: Optional[str], default: int, maximum: int) -> int:
+    """
+    Parse the ``limit`` query parameter and clamp it to the allowed range.
+
+    Args:
+        raw_limit (str | None): Raw value of the ``limit`` query parameter
+        default (int): Page size used when no limit is given
+        maximum (int): Hard maximum page size
+
+    Returns:
+        int: Page size between 1 and ``maximum``
+
+    Raises:
+        ValueError: If the limit is not a positive integer
+    """
+    if raw_limit in (None, ""):
+        return min(default, maximum)
+
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        raise ValueError("limit must be a positive integer") from None
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, maximum)
+
+
+def build_link_header(base_url: str, params: dict) -> str:
+    """
+    Build an RFC 8288 ``Link`` header pointing at the next page.
+
+    Args:
+        base_url (str): Absolute URL of the list endpoint (without query string)
+        params (dict): Query parameters for the next page
+
+    Returns:
+        str: Header value such as ``<https://host/api/users/?after=..>; rel="next"``
+    """
+    return f'<{base_url}?{urlencode(params)}>; rel="next"'
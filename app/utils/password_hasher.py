@@ -0,0 +1,258 @@
+"""
+Password Hashing Module
+
+This module moves password hashing off the request thread. Hashing is
+deliberately slow, so hashes are computed in a dedicated, size-limited
+process pool. The number of jobs waiting for that pool is bounded: when it
+is full, callers get ``HashingUnavailableError`` straight away (the routes
+turn it into a 503) instead of tying up another worker thread. Bulk jobs
+wait for slots instead, but may only hold PASSWORD_HASH_BULK_SHARE of them,
+so a large import never starves interactive signups and logins.
+
+The hash algorithm and cost come from ``Config`` (PASSWORD_HASH_ALGORITHM and
+PASSWORD_HASH_COST) and can be raised over time; ``needs_rehash`` tells
+whether a stored hash was made with older, cheaper settings.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Iterable, List, Optional
+
+from flask import Flask, current_app
+from werkzeug.security import generate_password_hash
+
+from .request_metrics import timed
+
+# Extra parameters appended to the scrypt cost (block size r, parallelism p)
+SCRYPT_PARAMS = "8:1"
+
+
+class HashingUnavailableError(RuntimeError):
+    """Raised when the hashing pool is saturated or a hash times out."""
+
+
+def build_hash_method(algorithm: str, cost: int) -> str:
+    """
+    Build a Werkzeug ``method`` string from an algorithm and cost.
+
+    Args:
+        algorithm (str): ``pbkdf2`` or ``scrypt``
+        cost (int): PBKDF2 iteration count or scrypt CPU/memory cost ``n``
+
+    Returns:
+        str: Method string accepted by ``generate_password_hash``
+
+    Raises:
+        ValueError: If the algorithm is not supported
+
+    Example:
+        >>> build_hash_method("pbkdf2", 600000)
+        'pbkdf2:sha256:600000'
+    """
+    if algorithm == "pbkdf2":
+        return f"pbkdf2:sha256:{cost}"
+    if algorithm == "scrypt":
+        return f"scrypt:{cost}:{SCRYPT_PARAMS}"
+    raise ValueError(f"Unsupported password hash algorithm: {algorithm}")
+
+
+def needs_rehash(password_hash: str, method: str) -> bool:
+    """
+    Check whether a stored hash is weaker than the configured method.
+
+    A hash needs upgrading when it uses a different algorithm or a lower
+    cost than ``method``. Hashes with a higher cost are left alone.
+
+    Args:
+        password_hash (str): Stored hash, e.g. ``pbkdf2:sha256:260000$salt$hex``
+        method (str): Configured method string from ``build_hash_method``
+
+    Returns:
+        bool: True if the password should be re-hashed
+    """
+    stored = password_hash.split("$", 1)[0].split(":")
+    wanted = method.split(":")
+
+    if stored[0] != wanted[0]:
+        return True
+
+    # pbkdf2:<digest>:<iterations> / scrypt:<n>:<r>:<p>
+    cost_index = 2 if wanted[0] == "pbkdf2" else 1
+    if wanted[0] == "pbkdf2" and stored[1:2] != wanted[1:2]:
+        return True
+    try:
+        return int(stored[cost_index]) < int(wanted[cost_index])
+    except (IndexError, ValueError):
+        return True
+
+
+class PasswordHasher:
+    """
+    Bounded process pool for password hashing.
+
+    At most ``workers`` hashes run at once and at most ``queue_size`` more
+    wait for a free worker. Any further submission is rejected immediately.
+    Blocking (bulk) submissions are limited to ``bulk_slots`` of these slots.
+    With ``workers`` set to 0, hashes are computed inline (useful for tests
+    and single-process development servers).
+
+    Attributes:
+        method (str): Werkzeug method string used for new hashes
+        workers (int): Number of hashing processes
+        queue_size (int): Number of jobs allowed to wait for a process
+        timeout (float): Seconds to wait for a single hash
+        bulk_slots (int): Slots blocking submissions may hold at once
+    """
+
+    def __init__(self, method: str, workers: int, queue_size: int, timeout: float,
+                 bulk_share: float = 0.5):
+        self.method = method
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        slots = max(workers, 1) + queue_size
+        self.bulk_slots = max(1, int(slots * bulk_share))
+        self._slots = threading.BoundedSemaphore(slots)
+        self._bulk_slots = threading.BoundedSemaphore(self.bulk_slots)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def submit(self, password: str, block: bool = False) -> Future:
+        """
+        Queue a password for hashing without waiting for the result.
+
+        Args:
+            password (str): Plaintext password
+            block (bool): Wait up to ``timeout`` seconds for a free queue slot
+                instead of failing immediately; for bulk jobs, which share
+                at most ``bulk_slots`` slots
+
+        Returns:
+            Future: Resolves to the password hash
+
+        Raises:
+            HashingUnavailableError: If the pool and its queue are full
+        """
+        if block:
+            # Take a bulk slot first, so bulk jobs never hold more than their share
+            acquired = self._bulk_slots.acquire(timeout=self.timeout)
+            if acquired and not self._slots.acquire(timeout=self.timeout):
+                self._bulk_slots.release()
+                acquired = False
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            raise HashingUnavailableError("Password hashing queue is full")
+
+        def release(_=None):
+            self._slots.release()
+            if block:
+                self._bulk_slots.release()
+
+        if self.workers == 0:
+            future: Future = Future()
+            try:
+                future.set_result(generate_password_hash(password, self.method))
+            finally:
+                release()
+            return future
+
+        try:
+            future = self._get_executor().submit(
+                generate_password_hash, password, self.method
+            )
+        except Exception:
+            release()
+            raise
+        future.add_done_callback(release)
+        return future
+
+    def result(self, future: Future) -> str:
+        """
+        Wait for a submitted hash.
+
+        Args:
+            future (Future): Future returned by ``submit``
+
+        Returns:
+            str: Password hash
+
+        Raises:
+            HashingUnavailableError: If the hash does not finish in time
+        """
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout as exc:
+            raise HashingUnavailableError("Password hashing timed out") from exc
+
+    def hash(self, password: str) -> str:
+        """Hash a single password on the pool and wait for the result."""
+        with timed("hash"):
+            return self.result(self.submit(password))
+
+    def hash_many(self, passwords: Iterable[str]) -> List[str]:
+        """
+        Hash several passwords in parallel.
+
+        Submissions wait for free queue slots rather than failing, so a
+        large batch is throttled to its share of the pool instead of
+        flooding it.
+
+        Args:
+            passwords (Iterable[str]): Plaintext passwords
+
+        Returns:
+            list: Hashes in the same order as ``passwords``
+
+        Raises:
+            HashingUnavailableError: If the pool is saturated or times out
+        """
+        with timed("hash"):
+            futures = [self.submit(password, block=True) for password in passwords]
+            return [self.result(future) for future in futures]
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+def init_password_hasher(app: Flask) -> PasswordHasher:
+    """
+    Create the application's ``PasswordHasher`` from its configuration.
+
+    Args:
+        app (Flask): Application instance
+
+    Returns:
+        PasswordHasher: Hasher stored in ``app.extensions["password_hasher"]``
+    """
+    hasher = PasswordHasher(
+        method=build_hash_method(
+            app.config["PASSWORD_HASH_ALGORITHM"],
+            app.config["PASSWORD_HASH_COST"]
+        ),
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        queue_size=app.config["PASSWORD_HASH_QUEUE_SIZE"],
+        timeout=app.config["PASSWORD_HASH_TIMEOUT"],
+        bulk_share=app.config["PASSWORD_HASH_BULK_SHARE"],
+    )
+    app.extensions["password_hasher"] = hasher
+    return hasher
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Return the hasher for the current application."""
+    return current_app.extensions["password_hasher"]
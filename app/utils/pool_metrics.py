@@ -0,0 +1,196 @@
+"""
+Connection Pool Metrics Module
+
+This module instruments the SQLAlchemy connection pool of every configured
+engine. Pool ``checkout``/``checkin`` events keep checked-out and overflow
+gauges up to date, and ``InstrumentedQueuePool`` times how long each
+request waits for a connection, including checkouts that time out.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import threading
+import time
+from typing import Optional
+
+from flask import Flask, current_app
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+
+from .metrics import Histogram
+
+# Engine options only ``QueuePool`` accepts; other pools reject them
+QUEUE_POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout")
+
+# Pool wait-time buckets in seconds
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """
+    Counters and gauges for one connection pool.
+
+    Attributes:
+        wait_time (Histogram): Seconds spent waiting in ``pool.connect()``
+        checkouts (int): Successful checkouts
+        timeouts (int): Checkouts that gave up after ``pool_timeout``
+        checked_out (int): Connections currently checked out
+        peak_checked_out (int): Highest number of concurrent checkouts
+        peak_overflow (int): Highest number of overflow connections in use
+    """
+
+    def __init__(self):
+        self.wait_time = Histogram(WAIT_BUCKETS)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self._lock = threading.Lock()
+
+    def on_checkout(self, pool: Pool) -> None:
+        """Update gauges after a connection was handed out."""
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+            if isinstance(pool, QueuePool):
+                self.peak_overflow = max(self.peak_overflow, max(pool.overflow(), 0))
+
+    def on_checkin(self) -> None:
+        """Update gauges after a connection was returned."""
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def on_timeout(self) -> None:
+        """Count a checkout that timed out waiting for a connection."""
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool) -> dict:
+        """
+        Return current pool statistics.
+
+        Args:
+            pool: The instrumented pool
+
+        Returns:
+            dict: Configuration, gauges, counters and the wait histogram
+        """
+        stats = {
+            "pool_class": type(pool).__name__,
+            "checked_out": self.checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds": self.wait_time.snapshot(),
+        }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,  # pylint: disable=protected-access
+                "idle": pool.checkedin(),
+                "overflow_in_use": max(pool.overflow(), 0),
+                "peak_overflow": self.peak_overflow,
+            })
+        return stats
+
+
+class InstrumentedQueuePool(QueuePool):
+    """``QueuePool`` that records how long each checkout waited."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.on_timeout()
+                self.metrics.wait_time.observe(time.perf_counter() - started)
+            raise
+        if self.metrics is not None:
+            self.metrics.wait_time.observe(time.perf_counter() - started)
+        return connection
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        # Keep the same metrics when the engine is disposed and rebuilt
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def engine_options_with_instrumentation(uri, options: dict) -> dict:
+    """
+    Return engine options that use ``InstrumentedQueuePool``.
+
+    In-memory SQLite and explicitly configured pool classes are left alone.
+    When the engine will not use a ``QueuePool`` (SQLAlchemy picks a
+    ``StaticPool`` for in-memory SQLite), the QueuePool-only sizing options
+    are dropped, as other pools reject them.
+
+    Args:
+        uri: Database URI of the engine
+        options (dict): Engine options from the configuration
+
+    Returns:
+        dict: A copy of ``options`` with ``poolclass`` set where applicable
+            and unsupported pool options removed
+    """
+    options = dict(options)
+    uri = str(uri or "")
+    in_memory_sqlite = uri.startswith("sqlite") and (
+        ":memory:" in uri or "mode=memory" in uri or uri.split("://", 1)[-1] in ("", "/")
+    )
+    if "poolclass" not in options and not in_memory_sqlite:
+        options["poolclass"] = InstrumentedQueuePool
+    poolclass = options.get("poolclass")
+    if poolclass is None or not issubclass(poolclass, QueuePool):
+        for name in QUEUE_POOL_OPTIONS:
+            options.pop(name, None)
+    return options
+
+
+def init_pool_metrics(app: Flask, engines: dict) -> dict:
+    """
+    Attach pool event listeners and metrics to every engine.
+
+    Args:
+        app (Flask): Application instance
+        engines (dict): Engines by bind key (``None`` is the default bind)
+
+    Returns:
+        dict: ``PoolMetrics`` by bind key, stored in ``app.extensions["pool_metrics"]``
+    """
+    all_metrics = {}
+    for bind_key, engine in engines.items():
+        metrics = PoolMetrics()
+        pool = engine.pool
+        if isinstance(pool, InstrumentedQueuePool):
+            pool.metrics = metrics
+
+        event.listen(
+            pool, "checkout",
+            lambda dbapi_conn, record, proxy, m=metrics, p=engine: m.on_checkout(p.pool)
+        )
+        event.listen(pool, "checkin", lambda dbapi_conn, record, m=metrics: m.on_checkin())
+        all_metrics[bind_key] = (engine, metrics)
+
+    app.extensions["pool_metrics"] = all_metrics
+    return all_metrics
+
+
+def pool_stats() -> dict:
+    """
+    Return statistics for every engine of the current application.
+
+    Returns:
+        dict: Snapshot per bind key (``"default"`` for the primary database)
+    """
+    return {
+        bind_key or "default": metrics.snapshot(engine.pool)
+        for bind_key, (engine, metrics) in current_app.extensions["pool_metrics"].items()
+    }
@@ -0,0 +1,347 @@
+"""
+Request Profiling Module
+
+This module profiles individual requests with ``cProfile`` so a slow route
+can be investigated in production without a redeploy.
+
+Profiling is opt-in (REQUEST_PROFILING_ENABLED). When enabled, a request is
+profiled when:
+
+    - it is picked by REQUEST_PROFILING_SAMPLE_RATE, or
+    - it carries an ``X-Profile-Token`` header equal to
+      REQUEST_PROFILING_TOKEN (ignored while the token is empty)
+
+Each profile is written in ``pstats`` format to REQUEST_PROFILING_DIR, named
+after its start time, method, endpoint and duration, e.g.
+``1760612400123-GET-users.get_user-42ms-1a2b3c4d.prof``, and the oldest
+files are removed beyond REQUEST_PROFILING_MAX_FILES. Requests profiled on
+demand get an ``X-Profile-Id`` response header with the file name. The
+profiles are listed and downloaded through ``/internal/profiles``, which
+also require the token and are refused while none is set.
+
+``cProfile`` only traces the thread handling the request, so concurrent
+requests on other threads run unaffected. Python 3.12+ allows only one
+profiler per process, so there requests arriving while another request is
+being profiled are skipped and counted. When profiling is disabled no hook
+is registered and requests pay nothing. For streaming responses only the
+time until the response headers are sent is profiled.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from flask import Flask, current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+# Header carrying the token that requests a profile of this request
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+
+# Response header naming the profile written for this request
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# <start ms>-<METHOD>-<endpoint>-<duration>ms-<random>.prof
+PROFILE_NAME = re.compile(r"^(\d+)-([A-Z]+)-([A-Za-z0-9_.]+)-(\d+)ms-([0-9a-f]{8})\.prof$")
+
+# Endpoints that read profiles; they carry the token but are never profiled,
+# so reading profiles does not rotate them away
+PROFILE_ENDPOINTS = {"internal.list_profiles", "internal.download_profile"}
+
+# Characters kept from an endpoint name in profile file names
+UNSAFE_ENDPOINT_CHARS = re.compile(r"[^A-Za-z0-9_.]")
+
+
+def parse_profile_name(name: str) -> Optional[dict]:
+    """
+    Describe a profile from its file name.
+
+    Args:
+        name (str): File name in REQUEST_PROFILING_DIR
+
+    Returns:
+        dict | None: name, created_at (epoch seconds), method, endpoint and
+            duration_ms, or None if ``name`` is not a profile
+    """
+    match = PROFILE_NAME.match(name)
+    if match is None:
+        return None
+    started, method, endpoint, duration, _ = match.groups()
+    return {
+        "name": name,
+        "created_at": int(started) / 1000,
+        "method": method,
+        "endpoint": endpoint,
+        "duration_ms": int(duration),
+    }
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and stores their profiles.
+
+    Attributes:
+        directory (str): Directory profiles are written to
+        sample_rate (float): Fraction of requests profiled (0-1)
+        token (str): Value of X-Profile-Token that requests a profile; empty disables it
+        max_files (int): Profiles kept before the oldest are removed
+        min_duration (float): Sampled requests faster than this (seconds) are discarded
+        written (int): Profiles written
+        discarded (int): Sampled profiles dropped for being faster than min_duration
+        busy (int): Requests not profiled because another profile was running
+        errors (int): Profiles that could not be written
+    """
+
+    def __init__(self, directory: str, sample_rate: float, token: str,
+                 max_files: int, min_duration_ms: float):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token
+        self.max_files = max_files
+        self.min_duration = min_duration_ms / 1000
+        self.written = 0
+        self.discarded = 0
+        self.busy = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def requested(self) -> bool:
+        """Return True if the current request asks for a profile with a valid token."""
+        supplied = request.headers.get(PROFILE_TOKEN_HEADER)
+        return bool(self.token and supplied) and hmac.compare_digest(
+            supplied.encode("utf-8"), self.token.encode("utf-8")
+        )
+
+    def sampled(self) -> bool:
+        """Return True if the current request is picked by the sample rate."""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def save(self, profile: cProfile.Profile, started: float, duration: float,
+             on_demand: bool) -> Optional[str]:
+        """
+        Write a finished profile of the current request and rotate old ones.
+
+        Args:
+            profile (cProfile.Profile): Disabled profiler of the request
+            started (float): Request start as epoch seconds
+            duration (float): Seconds the request took
+            on_demand (bool): True if requested by header (never discarded)
+
+        Returns:
+            str | None: File name of the profile, or None if it was not kept
+        """
+        if not on_demand and duration < self.min_duration:
+            self.discarded += 1
+            return None
+
+        endpoint = UNSAFE_ENDPOINT_CHARS.sub("_", request.endpoint or "unmatched")
+        name = (
+            f"{int(started * 1000)}-{request.method}-{endpoint}-"
+            f"{int(duration * 1000)}ms-{uuid.uuid4().hex[:8]}.prof"
+        )
+        path = os.path.join(self.directory, name)
+        try:
+            # Write under a temporary name so listings never see partial files
+            profile.dump_stats(path + ".tmp")
+            os.replace(path + ".tmp", path)
+        except OSError:
+            self.errors += 1
+            logger.exception("Writing profile %s failed", name)
+            return None
+
+        self.written += 1
+        self._rotate()
+        return name
+
+    def _rotate(self) -> None:
+        """Remove the oldest profiles beyond max_files."""
+        with self._lock:
+            names = self.list_names()
+            for name in names[self.max_files:]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    # Already removed by another worker process
+                    pass
+
+    def list_names(self) -> List[str]:
+        """Return the stored profile names, newest first."""
+        try:
+            names = [name for name in os.listdir(self.directory) if PROFILE_NAME.match(name)]
+        except FileNotFoundError:
+            return []
+        return sorted(names, key=lambda name: int(name.split("-", 1)[0]), reverse=True)
+
+    def list_profiles(self, endpoint: Optional[str] = None) -> List[dict]:
+        """
+        Describe the stored profiles, newest first.
+
+        Args:
+            endpoint (str | None): Only return profiles of this endpoint
+
+        Returns:
+            list: Dicts from ``parse_profile_name`` plus the file size
+        """
+        profiles = []
+        for name in self.list_names():
+            info = parse_profile_name(name)
+            if endpoint and info["endpoint"] != endpoint:
+                continue
+            try:
+                info["size"] = os.path.getsize(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                # Rotated away while listing
+                continue
+            profiles.append(info)
+        return profiles
+
+    def path_of(self, name: str) -> Optional[str]:
+        """
+        Return the path of a stored profile.
+
+        Args:
+            name (str): Profile file name
+
+        Returns:
+            str | None: Absolute path, or None for unknown or invalid names
+        """
+        if not PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    @staticmethod
+    def render_text(path: str, sort: str = "cumulative", limit: int = 50) -> str:
+        """
+        Render a stored profile as a ``pstats`` text report.
+
+        Args:
+            path (str): Profile file
+            sort (str): pstats sort key, e.g. ``cumulative`` or ``tottime``
+            limit (int): Functions listed
+
+        Returns:
+            str: Report text
+
+        Raises:
+            ValueError: If ``sort`` is not a pstats sort key
+        """
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            raise ValueError(f"Unknown sort key: {sort}")
+        output = io.StringIO()
+        stats = pstats.Stats(path, stream=output)
+        stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def stats(self) -> dict:
+        """
+        Return profiler settings and counters.
+
+        Returns:
+            dict: directory, sample_rate, token_enabled, max_files, stored,
+                written, discarded, busy and errors
+        """
+        return {
+            "directory": self.directory,
+            "sample_rate": self.sample_rate,
+            "token_enabled": bool(self.token),
+            "max_files": self.max_files,
+            "stored": len(self.list_names()),
+            "written": self.written,
+            "discarded": self.discarded,
+            "busy": self.busy,
+            "errors": self.errors,
+        }
+
+
+def init_request_profiling(app: Flask, base_dir: str) -> Optional[RequestProfiler]:
+    """
+    Register the profiling hooks when REQUEST_PROFILING_ENABLED is set.
+
+    Args:
+        app (Flask): Application instance
+        base_dir (str): Project root; a relative REQUEST_PROFILING_DIR is
+            resolved against it
+
+    Returns:
+        RequestProfiler | None: Profiler stored in ``app.extensions["request_profiler"]``,
+            or None when profiling is disabled
+    """
+    config = app.config
+    if not config["REQUEST_PROFILING_ENABLED"]:
+        return None
+
+    directory = config["REQUEST_PROFILING_DIR"]
+    if not os.path.isabs(directory):
+        directory = os.path.join(base_dir, directory)
+    profiler = RequestProfiler(
+        directory,
+        sample_rate=config["REQUEST_PROFILING_SAMPLE_RATE"],
+        token=config["REQUEST_PROFILING_TOKEN"],
+        max_files=config["REQUEST_PROFILING_MAX_FILES"],
+        min_duration_ms=config["REQUEST_PROFILING_MIN_DURATION_MS"],
+    )
+    app.extensions["request_profiler"] = profiler
+
+    @app.before_request
+    def start_profile():
+        if request.endpoint in PROFILE_ENDPOINTS:
+            return
+        on_demand = profiler.requested()
+        if not on_demand and not profiler.sampled():
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process
+            profiler.busy += 1
+            return
+        g.profile = profile
+        g.profile_on_demand = on_demand
+        g.profile_started = time.time()
+        g.profile_clock = time.perf_counter()
+
+    def finish_profile() -> Optional[str]:
+        profile = g.pop("profile", None)
+        if profile is None:
+            return None
+        profile.disable()
+        return profiler.save(
+            profile,
+            g.profile_started,
+            time.perf_counter() - g.profile_clock,
+            g.profile_on_demand,
+        )
+
+    @app.after_request
+    def stop_profile(response):
+        name = finish_profile()
+        if name is not None and g.profile_on_demand:
+            response.headers[PROFILE_ID_HEADER] = name
+        return response
+
+    @app.teardown_request
+    def stop_failed_profile(exc):  # pylint: disable=unused-argument
+        # after_request does not run when the view raised
+        finish_profile()
+
+    return profiler
+
+
+def get_request_profiler() -> Optional[RequestProfiler]:
+    """Return the request profiler of the current application, if enabled."""
+    return current_app.extensions.get("request_profiler")
@@ -0,0 +1,338 @@
+"""
+Query Log Module
+
+This module watches the SQL statements issued through SQLAlchemy to catch
+bad query patterns before they reach production:
+
+- a slow-query log: statements slower than SLOW_QUERY_MS are logged with
+  their normalized shape, the shape of their parameters (types only, never
+  values), the route that issued them and a summary of the app frames on
+  the call stack; the most recent ones are kept for ``/internal/slow-queries``
+- a per-request query budget: a request issuing more than
+  QUERY_MAX_PER_REQUEST statements, or repeating one statement shape more
+  than QUERY_MAX_REPEATS times (the signature of an N+1 lazy-load loop), is
+  logged with the stack of the first repeat over the limit
+
+Statements are timed and counted once, by the request metrics cursor
+listeners, which hand each one to the monitor.
+
+With QUERY_STRICT_MODE set (the test suite does), a request over its budget
+fails with ``QueryBudgetExceeded`` instead. Strict mode is meant for tests
+and development only: the budget is checked after the view returned, so
+anything the view committed stays committed although the request fails.
+Views that legitimately issue a data-dependent number of statements, such as
+chunked bulk operations and long polls, extend their budget per chunk or
+poll with ``extend_query_budget``; the configured limits remain as fixed
+headroom on top. Statements run while a streaming response is sent are not
+checked.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from functools import lru_cache
+from typing import List, Optional
+
+from flask import Flask, current_app, g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+# Frames from these files are shown in stack summaries
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.dirname(APP_DIR)
+
+# App frames kept in a stack summary, innermost last
+STACK_FRAMES = 6
+
+# Slow queries kept for /internal/slow-queries
+RECENT_SLOW_QUERIES = 100
+
+# Literals and placeholder lists collapsed when normalizing a statement
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\?|%s|:\w+|%\(\w+\)s)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_PLACEHOLDER_ROWS = re.compile(r"\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when a request issues too many statements."""
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """
+    Normalize a SQL statement so repeats with different values compare equal.
+
+    Literals become ``?`` and placeholder lists of any length (``IN (?, ?)``,
+    multi-row ``VALUES``) become ``(?...)``.
+
+    Args:
+        statement (str): SQL sent to the driver
+
+    Returns:
+        str: Single-line statement shape
+    """
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?...)", shape)
+    shape = _PLACEHOLDER_ROWS.sub("(?...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def _types(values) -> str:
+    """Describe a sequence of values by type, with runs collapsed (``int x500``)."""
+    runs = []
+    for value in values:
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return ", ".join(name if count == 1 else f"{name} x{count}" for name, count in runs)
+
+
+def parameters_shape(parameters, executemany: bool = False) -> str:
+    """
+    Describe statement parameters by type only, so no values are logged.
+
+    Args:
+        parameters: Parameters passed to the driver (sequence or mapping)
+        executemany (bool): True if ``parameters`` holds one entry per row
+
+    Returns:
+        str: e.g. ``(int, str)``, ``{email: str}`` or ``20 x (str, str)``
+    """
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameters[0] if parameters else ()
+        return f"{len(parameters)} x {parameters_shape(first)}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(
+            f"{key}: {type(value).__name__}" for key, value in parameters.items()
+        ) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return f"({_types(parameters)})"
+    return type(parameters).__name__
+
+
+def stack_summary() -> List[str]:
+    """
+    Return the application frames of the current call stack.
+
+    Returns:
+        list: ``path:line in function`` strings relative to the project root,
+            outermost first, at most STACK_FRAMES of them
+    """
+    frames = [
+        f"{os.path.relpath(frame.filename, PROJECT_DIR)}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(APP_DIR) and frame.filename != __file__
+    ]
+    return frames[-STACK_FRAMES:]
+
+
+def _route() -> Optional[str]:
+    """Return ``METHOD endpoint`` of the current request, if any."""
+    if not has_request_context():
+        return None
+    return f"{request.method} {request.endpoint or 'unmatched'}"
+
+
+def extend_query_budget(queries: int, repeats: int = 1) -> None:
+    """
+    Raise the current request's query budget for one more unit of work.
+
+    For views whose statement count grows with their input by design, such
+    as one round of statements per chunk or per poll: call it once per
+    round. The budget then scales with the number of rounds (not rows), so
+    a per-row N+1 inside a round is still caught. Does nothing outside a
+    checked request.
+
+    Args:
+        queries (int): Statements one round issues
+        repeats (int): Times one round may repeat each statement shape
+    """
+    if has_request_context() and "query_shapes" in g:
+        g.query_extra_queries += queries
+        g.query_extra_repeats += repeats
+
+
+class QueryMonitor:
+    """
+    Slow-query log and per-request query budget checks.
+
+    Attributes:
+        slow_threshold (float): Seconds above which a statement is logged (0 disables)
+        max_queries (int): Statements allowed per request before extensions (0: no limit)
+        max_repeats (int): Repeats allowed per statement shape before extensions (0: no limit)
+        strict (bool): Fail requests over their budget instead of logging them
+        slow_queries (int): Slow statements seen
+        budget_violations (int): Requests over their budget
+    """
+
+    def __init__(self, slow_ms: float, max_queries: int, max_repeats: int, strict: bool):
+        self.slow_threshold = slow_ms / 1000
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.strict = strict
+        self.slow_queries = 0
+        self.budget_violations = 0
+        self._recent = deque(maxlen=RECENT_SLOW_QUERIES)
+        self._lock = threading.Lock()
+
+    def observe(self, statement: str, parameters, executemany: bool, duration: float) -> None:
+        """
+        Count a finished statement against the request budget and log it if slow.
+
+        Registered as a statement observer of the request metrics listeners.
+
+        Args:
+            statement (str): SQL sent to the driver
+            parameters: Parameters sent with it
+            executemany (bool): True if ``parameters`` holds one entry per row
+            duration (float): Seconds the statement took
+        """
+        if has_request_context() and "query_shapes" in g:
+            shape = statement_shape(statement)
+            g.query_shapes[shape] += 1
+            # Remember where the first repeat over the limit came from
+            limit = self.max_repeats and self.max_repeats + g.query_extra_repeats
+            if limit and g.query_shapes[shape] == limit + 1:
+                g.query_repeat_stacks[shape] = stack_summary()
+
+        if self.slow_threshold and duration >= self.slow_threshold:
+            self._record_slow(statement, parameters, executemany, duration)
+
+    def _record_slow(self, statement: str, parameters, executemany: bool,
+                     duration: float) -> None:
+        """Log a slow statement and keep it for /internal/slow-queries."""
+        entry = {
+            "at": time.time(),
+            "duration_ms": round(duration * 1000, 3),
+            "statement": statement_shape(statement),
+            "parameters": parameters_shape(parameters, executemany),
+            "route": _route(),
+            "stack": stack_summary(),
+        }
+        with self._lock:
+            self.slow_queries += 1
+            self._recent.append(entry)
+        logger.warning(
+            "Slow query (%.1f ms) from %s: %s [%s]\n  %s",
+            entry["duration_ms"], entry["route"] or "outside a request",
+            entry["statement"], entry["parameters"], "\n  ".join(entry["stack"]),
+        )
+
+    def check_request(self) -> List[str]:
+        """
+        Check the statements of the current request against its budget.
+
+        Runs after the view returned, so in strict mode a failing request may
+        already have committed its writes.
+
+        Returns:
+            list: Violations, empty when within budget
+
+        Raises:
+            QueryBudgetExceeded: In strict mode, if the budget was exceeded
+        """
+        shapes: Counter = g.pop("query_shapes", None)
+        if shapes is None:
+            return []
+
+        violations = []
+        max_queries = self.max_queries and self.max_queries + g.query_extra_queries
+        total = g.db_queries
+        if max_queries and total > max_queries:
+            violations.append(f"{total} statements (limit {max_queries})")
+
+        max_repeats = self.max_repeats and self.max_repeats + g.query_extra_repeats
+        for shape, count in shapes.items():
+            if max_repeats and count > max_repeats:
+                stack = "\n    ".join(g.query_repeat_stacks.get(shape, []))
+                violations.append(
+                    f"{count} x {shape} (limit {max_repeats}, possible N+1)\n    {stack}"
+                )
+
+        if violations:
+            with self._lock:
+                self.budget_violations += 1
+            message = f"Query budget exceeded by {_route()}:\n  " + "\n  ".join(violations)
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return violations
+
+    def recent_slow_queries(self) -> List[dict]:
+        """Return the most recent slow queries, newest first."""
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def stats(self) -> dict:
+        """
+        Return settings and counters.
+
+        Returns:
+            dict: slow_query_ms, max_queries, max_repeats, strict, slow_queries
+                and budget_violations
+        """
+        return {
+            "slow_query_ms": self.slow_threshold * 1000,
+            "max_queries": self.max_queries,
+            "max_repeats": self.max_repeats,
+            "strict": self.strict,
+            "slow_queries": self.slow_queries,
+            "budget_violations": self.budget_violations,
+        }
+
+
+def init_query_monitor(app: Flask) -> QueryMonitor:
+    """
+    Register the slow-query log and the per-request query budget checks.
+
+    Must run after ``init_request_metrics``, whose cursor listeners feed
+    the monitor.
+
+    Args:
+        app (Flask): Application instance
+
+    Returns:
+        QueryMonitor: Monitor stored in ``app.extensions["query_monitor"]``
+    """
+    config = app.config
+    monitor = QueryMonitor(
+        slow_ms=config["SLOW_QUERY_MS"],
+        max_queries=config["QUERY_MAX_PER_REQUEST"],
+        max_repeats=config["QUERY_MAX_REPEATS"],
+        strict=config["QUERY_STRICT_MODE"],
+    )
+    app.extensions["query_monitor"] = monitor
+
+    app.extensions["request_metrics"].statement_observers.append(monitor.observe)
+
+    @app.before_request
+    def start_query_budget():
+        g.query_shapes = Counter()
+        g.query_repeat_stacks = {}
+        g.query_extra_queries = 0
+        g.query_extra_repeats = 0
+
+    @app.after_request
+    def check_query_budget(response):
+        monitor.check_request()
+        return response
+
+    return monitor
+
+
+def get_query_monitor() -> QueryMonitor:
+    """Return the query monitor of the current application."""
+    return current_app.extensions["query_monitor"]
@@ -0,0 +1,214 @@
+"""
+Request Metrics Module
+
+This module records per-request performance data:
+
+- wall time per request,
+- number of SQL statements and time spent in them, captured with the
+  ``before_cursor_execute``/``after_cursor_execute`` engine events, which
+  also pass every statement to the registered statement observers (the
+  slow-query log and query budget),
+- named phases such as password hashing or file I/O, recorded with
+  ``timed()``/``record_timing()``.
+
+Each response gets a ``Server-Timing`` header, and latency histograms per
+endpoint, method and status code are kept for the Prometheus ``/metrics``
+endpoint. For streaming responses the recorded time is the time until the
+response headers are sent.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from .metrics import Histogram
+
+
+def _escape_label(value) -> str:
+    """Escape a Prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[str, str, str]) -> str:
+    """Format an (endpoint, method, status) tuple as Prometheus labels."""
+    endpoint, method, status = (_escape_label(value) for value in labels)
+    return f'endpoint="{endpoint}",method="{method}",status="{status}"'
+
+
+def _format_bound(bound: float) -> str:
+    """Format a histogram bucket bound for Prometheus."""
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class RequestMetrics:
+    """
+    Process-wide request statistics keyed by endpoint, method and status.
+
+    Attributes:
+        latency (dict): Histogram of request seconds per label set
+        db_time (dict): Histogram of SQL seconds per request per label set
+        db_queries (dict): Total SQL statements per label set
+        statement_observers (list): Callables given ``(statement, parameters,
+            executemany, seconds)`` for every statement, in or outside a request
+    """
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.db_time: Dict[Tuple[str, str, str], Histogram] = {}
+        self.db_queries: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.statement_observers: List[Callable] = []
+        self._lock = threading.Lock()
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # pylint: disable=unused-argument,protected-access
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # pylint: disable=unused-argument,protected-access
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        if has_request_context() and "timings" in g:
+            g.timings["db"] += seconds
+            g.db_queries += 1
+        for observer in self.statement_observers:
+            observer(statement, parameters, executemany, seconds)
+
+    def observe(self, labels: Tuple[str, str, str], seconds: float,
+                db_seconds: float, db_queries: int) -> None:
+        """Record one finished request."""
+        with self._lock:
+            if labels not in self.latency:
+                self.latency[labels] = Histogram()
+                self.db_time[labels] = Histogram()
+            self.db_queries[labels] += db_queries
+        self.latency[labels].observe(seconds)
+        self.db_time[labels].observe(db_seconds)
+
+    def render_prometheus(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text ending with a newline
+        """
+        lines = []
+        with self._lock:
+            label_sets = sorted(self.latency)
+
+        for name, source, help_text in (
+            ("http_request_duration_seconds", self.latency, "Request wall time"),
+            ("http_request_db_duration_seconds", self.db_time, "SQL time per request"),
+        ):
+            lines.append(f"# HELP {name} {help_text}.")
+            lines.append(f"# TYPE {name} histogram")
+            for labels in label_sets:
+                base = _format_labels(labels)
+                histogram = source[labels]
+                for bound, count in histogram.cumulative_counts():
+                    lines.append(f'{name}_bucket{{{base},le="{_format_bound(bound)}"}} {count}')
+                lines.append(f"{name}_sum{{{base}}} {histogram.total}")
+                lines.append(f"{name}_count{{{base}}} {histogram.count}")
+
+        lines.append("# HELP http_request_db_queries_total SQL statements executed.")
+        lines.append("# TYPE http_request_db_queries_total counter")
+        for labels in label_sets:
+            lines.append(
+                f"http_request_db_queries_total{{{_format_labels(labels)}}} "
+                f"{self.db_queries[labels]}"
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """
+    Add ``seconds`` to the named phase of the current request.
+
+    Does nothing outside a request, so library code can call it freely.
+
+    Args:
+        name (str): Phase name shown in Server-Timing, e.g. ``hash``
+        seconds (float): Time spent in the phase
+    """
+    if has_request_context() and "timings" in g:
+        g.timings[name] += seconds
+
+
+@contextmanager
+def timed(name: str):
+    """Record the time spent in the ``with`` block as the named phase."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - started)
+
+
+def _server_timing(timings: dict, total: float, db_queries: int) -> str:
+    """Build the Server-Timing header value (durations in milliseconds)."""
+    parts = []
+    for name, seconds in timings.items():
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if name == "db":
+            entry += f';desc="{db_queries} queries"'
+        parts.append(entry)
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def init_request_metrics(app: Flask, engines: dict) -> RequestMetrics:
+    """
+    Register request timing hooks and SQL cursor listeners.
+
+    Args:
+        app (Flask): Application instance
+        engines (dict): Engines by bind key; every engine is instrumented
+
+    Returns:
+        RequestMetrics: Registry stored in ``app.extensions["request_metrics"]``
+    """
+    metrics = RequestMetrics()
+    app.extensions["request_metrics"] = metrics
+
+    for engine in engines.values():
+        event.listen(engine, "before_cursor_execute", metrics.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", metrics.after_cursor_execute)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.timings = defaultdict(float)
+        g.timings["db"] = 0.0
+        g.db_queries = 0
+
+    @app.after_request
+    def record_request_metrics(response):
+        if "request_started" not in g:
+            return response
+
+        total = time.perf_counter() - g.request_started
+        if current_app.config["SERVER_TIMING_ENABLED"]:
+            response.headers["Server-Timing"] = _server_timing(g.timings, total, g.db_queries)
+
+        if request.endpoint not in app.config["METRICS_EXCLUDED_ENDPOINTS"]:
+            labels = (request.endpoint or "unmatched", request.method, str(response.status_code))
+            metrics.observe(labels, total, g.timings["db"], g.db_queries)
+        return response
+
+    return metrics
+
+
+def get_request_metrics() -> RequestMetrics:
+    """Return the request metrics registry of the current application."""
+    return current_app.extensions["request_metrics"]
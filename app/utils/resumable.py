@@ -0,0 +1,283 @@
+"""
+Resumable Uploads Module
+
+This module implements resumable image uploads in the style of the tus
+protocol (https://tus.io), so clients on poor connections can continue an
+interrupted upload instead of sending the whole image again.
+
+A session is a ``<id>.part`` file plus a small ``<id>.json`` metadata file
+in ``<root>/.uploads`` (on the same file system as the image storage, so a
+finished upload is moved into place with a rename). The current offset is
+the size of the part file. Each chunk is appended at the end of the file;
+earlier data is never read or rewritten, and an exclusive lock on the part
+file keeps concurrent appends out. Sessions that see no activity for
+UPLOAD_SESSION_TTL seconds expire and are removed by ``flask uploads-gc``.
+
+Errors are raised as Werkzeug HTTP exceptions (404 unknown or expired
+session, 409 offset mismatch or incomplete upload, 413 too large, 415 not
+an image).
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import json
+import os
+import re
+import secrets
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not locked across requests
+    fcntl = None
+
+from flask import Flask, current_app
+from werkzeug.exceptions import Conflict, NotFound, RequestEntityTooLarge, UnsupportedMediaType
+
+from .file_handler import CHUNK_SIZE, ImageStorage
+from .uploads import SIGNATURE_LENGTH, detect_image_type
+
+# Directory (inside the storage root) holding resumable upload sessions
+UPLOADS_DIR = ".uploads"
+
+# Upload IDs are random hex tokens; anything else is rejected before touching the disk
+UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ResumableUploads:
+    """
+    File-backed store of resumable upload sessions.
+
+    Attributes:
+        directory (str): Directory holding the session files
+        max_size (int): Maximum declared upload length in bytes
+        ttl (float): Seconds of inactivity before a session expires
+    """
+
+    def __init__(self, directory: str, max_size: int, ttl: float):
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, upload_id: str):
+        """Return the (data, metadata) paths of a session."""
+        if not UPLOAD_ID.match(upload_id or ""):
+            raise NotFound("Unknown upload")
+        base = os.path.join(self.directory, upload_id)
+        return f"{base}.part", f"{base}.json"
+
+    def create(self, length: int) -> str:
+        """
+        Start a new upload session.
+
+        Args:
+            length (int): Total size of the upload in bytes
+
+        Returns:
+            str: Upload ID
+
+        Raises:
+            RequestEntityTooLarge: If ``length`` exceeds ``max_size``
+        """
+        if length > self.max_size:
+            raise RequestEntityTooLarge(
+                f"Image exceeds the maximum size of {self.max_size} bytes"
+            )
+        upload_id = secrets.token_hex(16)
+        data_path, meta_path = self._paths(upload_id)
+        with open(meta_path, "w", encoding="utf-8") as meta_file:
+            json.dump({"length": length, "created": time.time()}, meta_file)
+        open(data_path, "wb").close()
+        return upload_id
+
+    def status(self, upload_id: str) -> dict:
+        """
+        Return the state of a session.
+
+        Returns:
+            dict: ``offset``, ``length`` and ``expires`` (Unix time)
+
+        Raises:
+            NotFound: If the session does not exist or has expired
+        """
+        data_path, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path, encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+            stat = os.stat(data_path)
+        except (FileNotFoundError, ValueError) as exc:
+            raise NotFound("Unknown upload") from exc
+
+        expires = stat.st_mtime + self.ttl
+        if expires < time.time():
+            self.delete(upload_id)
+            raise NotFound("Upload has expired")
+        return {"offset": stat.st_size, "length": meta["length"], "expires": expires}
+
+    def append(self, upload_id: str, offset: int, stream,
+               content_length: Optional[int] = None) -> int:
+        """
+        Append a chunk at ``offset``.
+
+        Args:
+            upload_id (str): Upload ID
+            offset (int): Client's view of the current offset
+            stream: Binary stream with the chunk (the request body)
+            content_length (int | None): Declared chunk size, if known
+
+        Returns:
+            int: New offset
+
+        Raises:
+            NotFound: If the session does not exist or has expired
+            Conflict: If ``offset`` does not match the stored offset
+            RequestEntityTooLarge: If the chunk goes past the declared length
+            UnsupportedMediaType: If the first bytes are not an allowed image
+        """
+        state = self.status(upload_id)
+        if offset != state["offset"]:
+            raise Conflict(f"Upload offset is {state['offset']}, not {offset}")
+
+        remaining = state["length"] - offset
+        if content_length is not None and content_length > remaining:
+            raise RequestEntityTooLarge(f"Chunk exceeds the remaining {remaining} bytes")
+
+        data_path, _ = self._paths(upload_id)
+        with open(data_path, "ab") as data_file:
+            # Only one request may append at a time; a concurrent PATCH at the
+            # same offset gets 409 instead of appending the chunk twice
+            if fcntl is not None:
+                try:
+                    fcntl.flock(data_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError as exc:
+                    raise Conflict("Another request is appending to this upload") from exc
+            size = os.fstat(data_file.fileno()).st_size
+            if size != offset:
+                raise Conflict(f"Upload offset is {size}, not {offset}")
+
+            head = b""
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                if len(chunk) > remaining:
+                    raise RequestEntityTooLarge(
+                        f"Chunk exceeds the remaining {state['length'] - offset} bytes"
+                    )
+                # Reject non-images on the first chunk rather than at the end
+                if offset == 0 and len(head) < SIGNATURE_LENGTH:
+                    head += chunk[:SIGNATURE_LENGTH]
+                    if len(head) >= SIGNATURE_LENGTH and detect_image_type(head) is None:
+                        data_file.truncate(0)
+                        raise UnsupportedMediaType("Only PNG and JPEG images are accepted")
+                data_file.write(chunk)
+                remaining -= len(chunk)
+            return data_file.tell()
+
+    def complete_path(self, upload_id: str) -> str:
+        """
+        Return the data file of a finished upload.
+
+        Raises:
+            NotFound: If the session does not exist or has expired
+            Conflict: If the upload is not complete yet
+        """
+        state = self.status(upload_id)
+        if state["offset"] != state["length"]:
+            raise Conflict(f"Upload is incomplete ({state['offset']} of {state['length']} bytes)")
+        return self._paths(upload_id)[0]
+
+    def store(self, upload_id: str, storage: ImageStorage) -> str:
+        """
+        Move a finished upload into the image storage and end the session.
+
+        Args:
+            upload_id (str): Upload ID
+            storage (ImageStorage): Destination storage
+
+        Returns:
+            str: Stored image name for ``User.image``
+
+        Raises:
+            NotFound: If the session does not exist or has expired
+            Conflict: If the upload is not complete yet
+            UnsupportedMediaType: If the upload is not a PNG or JPEG image
+        """
+        data_path = self.complete_path(upload_id)
+        with open(data_path, "rb") as data_file:
+            extension = detect_image_type(data_file.read(SIGNATURE_LENGTH))
+        if extension is None:
+            self.delete(upload_id)
+            raise UnsupportedMediaType("Only PNG and JPEG images are accepted")
+
+        name = storage.store_file(data_path, extension)
+        self.delete(upload_id)
+        return name
+
+    def delete(self, upload_id: str) -> bool:
+        """
+        Remove a session and its data.
+
+        Returns:
+            bool: True if the session existed
+        """
+        removed = False
+        for path in self._paths(upload_id):
+            try:
+                os.remove(path)
+                removed = True
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def expire(self, dry_run: bool = False) -> int:
+        """
+        Remove sessions without activity for ``ttl`` seconds.
+
+        Args:
+            dry_run (bool): Count expired sessions without removing them
+
+        Returns:
+            int: Number of expired sessions
+        """
+        cutoff = time.time() - self.ttl
+        expired = 0
+        for entry in os.scandir(self.directory):
+            upload_id, extension = os.path.splitext(entry.name)
+            if extension != ".json" or not UPLOAD_ID.match(upload_id):
+                continue
+            data_path, _ = self._paths(upload_id)
+            try:
+                last_activity = os.path.getmtime(data_path)
+            except FileNotFoundError:
+                last_activity = entry.stat().st_mtime
+            if last_activity < cutoff:
+                expired += 1
+                if not dry_run:
+                    self.delete(upload_id)
+        return expired
+
+
+def init_resumable_uploads(app: Flask, storage: ImageStorage) -> ResumableUploads:
+    """
+    Create the resumable upload store inside the image storage root.
+
+    Args:
+        app (Flask): Application instance
+        storage (ImageStorage): Image storage of the application
+
+    Returns:
+        ResumableUploads: Store saved in ``app.extensions["resumable_uploads"]``
+    """
+    uploads = ResumableUploads(
+        os.path.join(storage.root, UPLOADS_DIR),
+        max_size=app.config["MAX_IMAGE_UPLOAD_SIZE"],
+        ttl=app.config["UPLOAD_SESSION_TTL"],
+    )
+    app.extensions["resumable_uploads"] = uploads
+    return uploads
+
+
+def get_resumable_uploads() -> ResumableUploads:
+    """Return the resumable upload store of the current application."""
+    return current_app.extensions["resumable_uploads"]
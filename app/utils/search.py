@@ -0,0 +1,228 @@
+"""
+User Search Module
+
+This module turns the filter and sort parameters of ``GET /api/users/`` into
+index-friendly SQL.
+
+Filters:
+    - ``email``: case-insensitive exact match, served by the
+      ``lower(email)`` expression index (the unique email index on SQL Server)
+    - ``last_name``: exact match, served by the (last_name, first_name) index
+    - ``q``: full-text prefix search over first name, last name and email,
+      using the dialect's full-text engine (SQLite FTS5, SQL Server
+      ``CONTAINS``, MySQL ``MATCH ... AGAINST``) and ``LIKE`` elsewhere
+
+Sort orders (``sort``, prefix with ``-`` for descending):
+    - ``id`` (default), ``last_name`` (then first name and id), ``email``
+
+Every sort order ends with the primary key, so keyset pagination works the
+same way for all of them: the cursor holds the full sort key of the last
+row and the next page starts strictly after it.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Integer, and_, func, or_, select, text
+from sqlalchemy.dialects.mysql import match
+
+from ..models import User
+
+# Maximum number of words used from a ?q= search
+MAX_SEARCH_TERMS = 8
+
+# Words of a ?q= search (letters, digits and underscores)
+SEARCH_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+class SortOrder(NamedTuple):
+    """A ``?sort=`` option: ordered key columns, ending with ``User.id``."""
+
+    name: str
+    columns: Tuple
+    descending: bool
+
+    @property
+    def is_default(self) -> bool:
+        """True for ascending id order, which uses the plain id cursor."""
+        return self.name == "id" and not self.descending
+
+    def order_by(self) -> list:
+        """Return ORDER BY clauses for the sort columns."""
+        return [column.desc() if self.descending else column.asc() for column in self.columns]
+
+
+# Sortable fields and their key columns
+SORT_COLUMNS = {
+    "id": (User.id,),
+    "last_name": (User.last_name, User.first_name, User.id),
+    "email": (User.email, User.id),
+}
+
+
+def parse_sort(raw_sort: Optional[str]) -> SortOrder:
+    """
+    Parse the ``sort`` query parameter.
+
+    Args:
+        raw_sort (str | None): ``id``, ``last_name`` or ``email``, optionally
+            prefixed with ``-`` for descending order
+
+    Returns:
+        SortOrder: Parsed sort order (ascending id by default)
+
+    Raises:
+        ValueError: If the field cannot be sorted on
+
+    Example:
+        >>> parse_sort("-last_name").descending
+        True
+    """
+    raw_sort = (raw_sort or "id").strip()
+    descending = raw_sort.startswith("-")
+    name = raw_sort.lstrip("-")
+    if name not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort by: {name}. Allowed: {', '.join(SORT_COLUMNS)}")
+    return SortOrder(name, SORT_COLUMNS[name], descending)
+
+
+def keyset_predicate(sort: SortOrder, values: list):
+    """
+    Build the condition selecting rows strictly after ``values`` in ``sort`` order.
+
+    Expanded to ``a > x OR (a = x AND b > y) OR ...`` rather than a row-value
+    comparison, which SQL Server does not support.
+
+    Args:
+        sort (SortOrder): Sort order of the list
+        values (list): Sort key of the last row of the previous page
+
+    Returns:
+        ColumnElement: WHERE condition
+    """
+    clauses = []
+    for index, column in enumerate(sort.columns):
+        equal = [previous == value for previous, value in zip(sort.columns[:index], values)]
+        after = column < values[index] if sort.descending else column > values[index]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
+
+
+def search_terms(query: str) -> List[str]:
+    """
+    Split a ``?q=`` search into lower-case words.
+
+    Raises:
+        ValueError: If the search contains no words
+    """
+    terms = SEARCH_TERM.findall(query.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        raise ValueError("q must contain at least one letter or digit")
+    return terms
+
+
+def fulltext_predicate(query: str, dialect: str, backend: str = "auto"):
+    """
+    Build a full-text prefix search over first name, last name and email.
+
+    Every word must match the start of a word in one of the columns.
+
+    Args:
+        query (str): Raw ``?q=`` value
+        dialect (str): SQLAlchemy dialect name of the database
+        backend (str): ``auto`` to use the dialect's full-text engine, or
+            ``like`` to force ``LIKE`` matching (no full-text index needed)
+
+    Returns:
+        ColumnElement: WHERE condition
+
+    Raises:
+        ValueError: If the search contains no words
+    """
+    terms = search_terms(query)
+
+    if backend == "auto" and dialect == "sqlite":
+        fts_query = " ".join(f'"{term}"*' for term in terms)
+        matches = text(
+            "SELECT rowid FROM users_fts WHERE users_fts MATCH :fts_query"
+        ).bindparams(fts_query=fts_query).columns(rowid=Integer)
+        return User.id.in_(matches)
+
+    if backend == "auto" and dialect == "mssql":
+        fts_query = " AND ".join(f'"{term}*"' for term in terms)
+        return text(
+            "CONTAINS((users.first_name, users.last_name, users.email), :fts_query)"
+        ).bindparams(fts_query=fts_query)
+
+    if backend == "auto" and dialect == "mysql":
+        fts_query = " ".join(f"+{term}*" for term in terms)
+        return match(
+            User.first_name, User.last_name, User.email, against=fts_query
+        ).in_boolean_mode()
+
+    # No full-text engine: substring match (a full scan, fine for small tables)
+    columns = (User.first_name, User.last_name, User.email)
+    return and_(*(
+        or_(*(func.lower(column).contains(term, autoescape=True) for column in columns))
+        for term in terms
+    ))
+
+
+def search_filters(args, dialect: str, backend: str = "auto") -> list:
+    """
+    Build WHERE conditions from the filter query parameters.
+
+    Args:
+        args (MultiDict): Request query parameters
+        dialect (str): SQLAlchemy dialect name of the database
+        backend (str): Full-text backend, see ``fulltext_predicate``
+
+    Returns:
+        list: Conditions to AND together (empty when no filter is given)
+
+    Raises:
+        ValueError: If a filter value is invalid
+    """
+    filters = []
+
+    email = args.get("email")
+    if email:
+        if dialect == "mssql":
+            # Case-insensitive collation; keeps the unique email index usable
+            filters.append(User.email == email)
+        else:
+            filters.append(func.lower(User.email) == email.lower())
+
+    last_name = args.get("last_name")
+    if last_name:
+        filters.append(User.last_name == last_name)
+
+    query = args.get("q")
+    if query:
+        filters.append(fulltext_predicate(query, dialect, backend))
+
+    return filters
+
+
+def user_list_statement(columns: list, filters: list, sort: SortOrder,
+                        after: Optional[list], limit: int):
+    """
+    Build the query for one page of the user list.
+
+    Args:
+        columns (list): Columns to select
+        filters (list): Conditions from ``search_filters``
+        sort (SortOrder): Sort order from ``parse_sort``
+        after (list | None): Sort key of the last row of the previous page
+        limit (int): Number of rows to fetch
+
+    Returns:
+        Select: Statement ready to execute
+    """
+    stmt = select(*columns).where(*filters).order_by(*sort.order_by())
+    if after is not None:
+        stmt = stmt.where(keyset_predicate(sort, after))
+    return stmt.limit(limit)
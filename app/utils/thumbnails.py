@@ -0,0 +1,279 @@
+"""
+Image Derivatives Module
+
+This module generates resized derivatives (thumbnails) of stored profile
+images in the background, so clients can download a 64px avatar instead
+of the full-size original.
+
+After a user image is saved, ``queue_derivatives`` hands the blob to a
+``ThumbnailPipeline``. The pipeline renders every configured size
+(THUMBNAIL_SIZES) in THUMBNAIL_FORMAT on a dedicated process pool and
+writes the results next to the blobs in ``<root>/.derived/<size>/``.
+Failed jobs are retried with exponential backoff up to
+THUMBNAIL_MAX_RETRIES times. Queue depth and job counters are exposed
+through ``stats`` (``/internal/thumbnails`` and ``/metrics``).
+
+Derivatives are keyed by the content hash of the original, so identical
+uploads share them. Resizing uses Pillow; when it is not installed the
+pipeline is disabled and the originals are served instead.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import importlib.util
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from flask import Flask, current_app
+
+from .file_handler import ImageStorage
+
+logger = logging.getLogger(__name__)
+
+
+def render_derivatives(source: str, targets: Dict[int, str], image_format: str) -> List[int]:
+    """
+    Resize ``source`` to every target size.
+
+    Runs in a worker process. Each derivative keeps the aspect ratio, fits
+    inside a ``size`` x ``size`` box (images are never upscaled) and is
+    written to a temporary file before being renamed into place.
+
+    Args:
+        source (str): Absolute path of the original image
+        targets (dict): Longest edge in pixels to absolute output path
+        image_format (str): Output format understood by Pillow, e.g. ``webp``
+
+    Returns:
+        list: Sizes that were written
+    """
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+
+    with Image.open(source) as original:
+        original.load()
+        image = original if original.mode in ("RGB", "RGBA") else original.convert("RGBA")
+        for size, target in sorted(targets.items()):
+            derivative = image.copy()
+            derivative.thumbnail((size, size))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temp_path = f"{target}.{os.getpid()}.part"
+            try:
+                derivative.save(temp_path, format=image_format.upper())
+                os.replace(temp_path, target)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+    return sorted(targets)
+
+
+class ThumbnailPipeline:
+    """
+    Background derivative generation with retries.
+
+    A blob is queued at most once at a time; queuing it again while its
+    job is pending, or after it has failed permanently, is a no-op. With
+    ``workers`` set to 0, jobs run inline and retries happen immediately
+    (useful for tests and single-process development servers).
+
+    Attributes:
+        storage (ImageStorage): Storage holding originals and derivatives
+        sizes (tuple): Derivative sizes (longest edge in pixels)
+        image_format (str): Derivative file format and extension
+        workers (int): Number of resizing processes
+        max_retries (int): Retries per job before it is marked failed
+        retry_delay (float): Delay before the first retry, doubled each time
+    """
+
+    def __init__(self, storage: ImageStorage, sizes: Sequence[int], image_format: str,
+                 workers: int, max_retries: int, retry_delay: float,
+                 render: Callable = render_derivatives):
+        self.storage = storage
+        self.sizes = tuple(sorted(sizes))
+        self.image_format = image_format.lower()
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self._render = render
+        self._pending: Dict[str, int] = {}
+        self._failed: Set[str] = set()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def derivative_path(self, name: str, size: int) -> str:
+        """Return the absolute path of the ``size`` derivative of ``name``."""
+        return self.storage.path_for(
+            self.storage.derivative_name(name, size, self.image_format)
+        )
+
+    def missing(self, name: str) -> Dict[int, str]:
+        """
+        Return the derivatives of ``name`` that do not exist yet.
+
+        Returns:
+            dict: Size to absolute output path
+        """
+        targets = {size: self.derivative_path(name, size) for size in self.sizes}
+        return {size: path for size, path in targets.items() if not os.path.exists(path)}
+
+    def enqueue(self, name: str) -> bool:
+        """
+        Queue derivative generation for a stored image.
+
+        Args:
+            name (str): Name stored in ``User.image``
+
+        Returns:
+            bool: True if a job was queued, False if the derivatives exist,
+            a job for ``name`` is pending or it failed permanently
+        """
+        targets = self.missing(name)
+        if not targets:
+            return False
+        with self._lock:
+            if name in self._pending or name in self._failed:
+                return False
+            self._pending[name] = 0
+        self._submit(name, targets)
+        return True
+
+    def _submit(self, name: str, targets: Dict[int, str]) -> None:
+        """Run or schedule one attempt of a job."""
+        source = self.storage.path_for(name)
+        if self.workers == 0:
+            future: Future = Future()
+            try:
+                future.set_result(self._render(source, targets, self.image_format))
+            except Exception as exc:  # pylint: disable=broad-except
+                future.set_exception(exc)
+            self._finished(name, targets, future)
+            return
+
+        try:
+            future = self._get_executor().submit(
+                self._render, source, targets, self.image_format
+            )
+        except BrokenProcessPool as exc:
+            # A crashed worker breaks the whole pool; start a new one on retry
+            with self._lock:
+                self._executor = None
+            future = Future()
+            future.set_exception(exc)
+            self._finished(name, targets, future)
+            return
+        future.add_done_callback(lambda done: self._finished(name, targets, done))
+
+    def _finished(self, name: str, targets: Dict[int, str], future: Future) -> None:
+        """Record a finished attempt and retry failed jobs."""
+        error = future.exception()
+        with self._lock:
+            if error is None:
+                self._pending.pop(name, None)
+                self.completed += 1
+                return
+
+            attempt = self._pending.get(name, 0) + 1
+            if attempt > self.max_retries:
+                self._pending.pop(name, None)
+                self._failed.add(name)
+                self.failed += 1
+                logger.warning("Derivatives for %s failed after %d attempts: %s",
+                               name, attempt, error)
+                return
+            self._pending[name] = attempt
+            self.retries += 1
+
+        if self.workers == 0 or self.retry_delay <= 0:
+            self._submit(name, targets)
+            return
+        timer = threading.Timer(
+            self.retry_delay * 2 ** (attempt - 1), self._submit, (name, targets)
+        )
+        timer.daemon = True
+        timer.start()
+
+    def stats(self) -> dict:
+        """
+        Return queue depth and job counters.
+
+        Returns:
+            dict: queued (jobs pending or waiting for a retry), completed,
+            failed, retries and the configured sizes, format and workers
+        """
+        with self._lock:
+            queued = len(self._pending)
+        return {
+            "queued": queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "sizes": list(self.sizes),
+            "format": self.image_format,
+            "workers": self.workers,
+        }
+
+
+def init_thumbnail_pipeline(app: Flask, storage: ImageStorage) -> Optional[ThumbnailPipeline]:
+    """
+    Create the derivative pipeline configured by the THUMBNAIL_* settings.
+
+    Args:
+        app (Flask): Application instance
+        storage (ImageStorage): Image storage of the application
+
+    Returns:
+        ThumbnailPipeline | None: Pipeline stored in
+        ``app.extensions["thumbnail_pipeline"]``, or None when disabled or
+        Pillow is not installed
+    """
+    if not app.config["THUMBNAILS_ENABLED"]:
+        return None
+    if importlib.util.find_spec("PIL") is None:
+        logger.warning("Pillow is not installed; image derivatives are disabled")
+        return None
+
+    pipeline = ThumbnailPipeline(
+        storage,
+        sizes=app.config["THUMBNAIL_SIZES"],
+        image_format=app.config["THUMBNAIL_FORMAT"],
+        workers=app.config["THUMBNAIL_WORKERS"],
+        max_retries=app.config["THUMBNAIL_MAX_RETRIES"],
+        retry_delay=app.config["THUMBNAIL_RETRY_DELAY"],
+    )
+    app.extensions["thumbnail_pipeline"] = pipeline
+    return pipeline
+
+
+def get_thumbnail_pipeline() -> Optional[ThumbnailPipeline]:
+    """Return the derivative pipeline of the current application, if enabled."""
+    return current_app.extensions.get("thumbnail_pipeline")
+
+
+def queue_derivatives(name: Optional[str]) -> bool:
+    """
+    Queue derivative generation for a stored image, if the pipeline is enabled.
+
+    Args:
+        name (str | None): Name stored in ``User.image``
+
+    Returns:
+        bool: True if a job was queued
+    """
+    pipeline = get_thumbnail_pipeline()
+    if pipeline is None or not name:
+        return False
+    return pipeline.enqueue(name)
@@ -0,0 +1,193 @@
+"""
+Streaming Upload Validation Module
+
+This module validates multipart file uploads while the request body is
+being parsed, instead of after it has been buffered.
+
+``UploadRequest`` replaces Werkzeug's default stream factory (which spools
+each file into a ``SpooledTemporaryFile``) with ``ValidatedUpload``. It
+writes each file part straight into the image storage's temp directory in
+the chunks the parser produces, hashing as it goes. It also:
+
+- checks the image magic bytes in the first chunk and aborts with 415 when
+  the content is not an allowed image type,
+- aborts with 413 as soon as a file grows beyond MAX_IMAGE_UPLOAD_SIZE.
+
+Plain form fields are capped by MAX_FORM_MEMORY_SIZE, and the whole body by
+MAX_CONTENT_LENGTH, which Werkzeug checks against ``Content-Length`` before
+reading anything. A validated upload is moved into place by
+``ImageStorage.store_upload`` without being copied again.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import List, Optional
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+# Leading bytes of the accepted image formats and their canonical extensions
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpg",
+}
+
+# Bytes needed before the signature check can be made
+SIGNATURE_LENGTH = max(len(signature) for signature in IMAGE_SIGNATURES)
+
+
+def detect_image_type(head: bytes) -> Optional[str]:
+    """
+    Identify an image format from its first bytes.
+
+    Args:
+        head (bytes): Start of the file content
+
+    Returns:
+        str | None: Canonical extension (``png`` or ``jpg``), or None if the
+        content does not start with a known signature
+
+    Example:
+        >>> detect_image_type(b"\\x89PNG\\r\\n\\x1a\\n....")
+        'png'
+    """
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+class ValidatedUpload:
+    """
+    Writable upload target that validates and hashes data as it arrives.
+
+    Behaves like a binary file for Werkzeug's ``FileStorage`` (read, seek,
+    tell, close); everything except ``write`` is delegated to the
+    underlying temporary file.
+
+    Attributes:
+        temp_path (str): Path of the temporary file holding the upload
+        size (int): Bytes received so far
+        extension (str | None): Detected image type
+        stored (bool): True once the file was moved into the image storage
+    """
+
+    def __init__(self, temp_dir: str, max_size: int):
+        fd, self.temp_path = tempfile.mkstemp(dir=temp_dir, suffix=".part")
+        self._file = os.fdopen(fd, "w+b")
+        self._digest = hashlib.sha256()
+        self._head = b""
+        self.max_size = max_size
+        self.size = 0
+        self.extension: Optional[str] = None
+        self.stored = False
+
+    def write(self, data: bytes) -> int:
+        """
+        Validate and append a chunk of the upload.
+
+        Raises:
+            RequestEntityTooLarge: If the upload exceeds ``max_size``
+            UnsupportedMediaType: If the first bytes are not an allowed image
+        """
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(
+                f"Image exceeds the maximum size of {self.max_size} bytes"
+            )
+
+        if self.extension is None:
+            self._head += data[:SIGNATURE_LENGTH]
+            if len(self._head) >= SIGNATURE_LENGTH:
+                self.extension = detect_image_type(self._head)
+                if self.extension is None:
+                    self.discard()
+                    raise UnsupportedMediaType("Only PNG and JPEG images are accepted")
+
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def finish(self) -> None:
+        """
+        Check the upload after its last byte arrived.
+
+        Raises:
+            UnsupportedMediaType: If the upload is too short to be an image
+        """
+        if self.extension is None:
+            self.extension = detect_image_type(self._head)
+            if self.extension is None:
+                self.discard()
+                raise UnsupportedMediaType("Only PNG and JPEG images are accepted")
+
+    def hexdigest(self) -> str:
+        """Return the SHA-256 of the bytes received."""
+        return self._digest.hexdigest()
+
+    def discard(self) -> None:
+        """Close and delete the temporary file."""
+        self._file.close()
+        if not self.stored and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def close(self) -> None:
+        """Close the upload; unstored data is deleted."""
+        self.discard()
+
+    @property
+    def closed(self) -> bool:
+        """Return True once the underlying file is closed."""
+        return self._file.closed
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """
+    Request class that streams file parts into ``ValidatedUpload`` targets.
+
+    Uploads that are never stored are deleted when the request is closed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._uploads: List[ValidatedUpload] = []
+
+    @property
+    def max_content_length(self) -> Optional[int]:
+        """
+        Maximum request body size (MAX_CONTENT_LENGTH).
+
+        Endpoints listed in ENDPOINT_MAX_CONTENT_LENGTH, such as bulk
+        imports, get their own limit.
+        """
+        config = current_app.config
+        return config["ENDPOINT_MAX_CONTENT_LENGTH"].get(
+            self.endpoint, config["MAX_CONTENT_LENGTH"]
+        )
+
+    @property
+    def max_form_memory_size(self) -> Optional[int]:
+        """Maximum size of all non-file form fields (MAX_FORM_MEMORY_SIZE)."""
+        return current_app.config.get("MAX_FORM_MEMORY_SIZE")
+
+    def _get_file_stream(self, total_content_length, content_type,
+                         filename=None, content_length=None):
+        # pylint: disable=unused-argument
+        storage = current_app.extensions["image_storage"]
+        upload = ValidatedUpload(
+            storage.temp_dir, current_app.config["MAX_IMAGE_UPLOAD_SIZE"]
+        )
+        self._uploads.append(upload)
+        return upload
+
+    def close(self) -> None:
+        super().close()
+        for upload in self._uploads:
+            upload.close()
@@ -0,0 +1,107 @@
+"""
+User Read Path Benchmark
+
+Compares the original ORM read path (hydrate ``User`` instances, then call
+``to_dict``) with the Core projection path used by the read endpoints
+(``select()`` of individual columns mapped straight to dictionaries), both
+for the full public field set and for a sparse ``id,email`` fieldset.
+
+Usage:
+    python benchmarks/bench_user_reads.py --rows 100000 --repeat 5
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import insert, select
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from app import create_app, db
+from app.config import Config
+from app.models import User
+
+
+def seed_users(rows: int, batch_size: int = 10000) -> None:
+    """Insert ``rows`` synthetic users using batched Core inserts."""
+    for start in range(0, rows, batch_size):
+        db.session.execute(insert(User), [
+            {
+                "first_name": f"First{i}",
+                "last_name": f"Last{i}",
+                "email": f"user{i}@example.com",
+                "password": "x" * 100,
+            }
+            for i in range(start, min(start + batch_size, rows))
+        ])
+    db.session.commit()
+
+
+def orm_read() -> bytes:
+    """Original path: build ORM instances, then dictionaries."""
+    users = User.query.order_by(User.id).all()
+    payload = json.dumps([user.to_dict() for user in users]).encode()
+    db.session.expunge_all()
+    return payload
+
+
+def projection_read(fields=None) -> bytes:
+    """Projection path: select columns and map rows to dictionaries."""
+    stmt = select(*User.public_columns(fields)).order_by(User.id)
+    rows = db.session.execute(stmt).mappings()
+    return json.dumps([dict(row) for row in rows]).encode()
+
+
+def measure(func, repeat: int) -> dict:
+    """Return the best wall time and payload size for ``func``."""
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(func())
+        timings.append(time.perf_counter() - started)
+    return {"best_s": round(min(timings), 4), "bytes": size}
+
+
+def main() -> None:
+    """Seed a temporary SQLite database and print benchmark results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            seed_users(args.rows)
+
+            results = {
+                "orm_full": measure(orm_read, args.repeat),
+                "projection_full": measure(projection_read, args.repeat),
+                "projection_id_email": measure(
+                    lambda: projection_read(("id", "email")), args.repeat
+                ),
+            }
+            db.session.remove()
+
+    baseline = results["orm_full"]["best_s"]
+    for name, result in results.items():
+        speedup = baseline / result["best_s"] if result["best_s"] else float("inf")
+        print(f"{name:<22} {result['best_s']:>8.4f}s {result['bytes']:>12} bytes "
+              f"{speedup:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+"""
+Users API Load Benchmark
+
+Measures throughput and latency (p50, p90, p99, max) for every route of the
+users blueprint against the real application stack: the app is built
+through ``create_app`` on a file-backed SQLite database seeded with 10k,
+100k and 1M users, and requests are sent through the WSGI test client from
+``--concurrency`` threads. Each scenario also records the average number of
+SQL statements per request, read from the ``Server-Timing`` header, so
+query-count regressions show up even when timings are noisy.
+
+Results are written as JSON (``--output``). With ``--baseline`` the run is
+compared with a stored results file and the script exits with status 1 if
+any scenario is slower (p50/p99) or has lower throughput than the baseline
+by more than ``--threshold``, or issues more queries per request.
+
+Usage:
+    python benchmarks/bench_users_api.py --sizes 10000,100000 --requests 200
+    python benchmarks/bench_users_api.py --output benchmarks/baseline.json
+    python benchmarks/bench_users_api.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_users_api.py --compare results.json --baseline benchmarks/baseline.json
+
+Seeded databases are cached in ``--data-dir`` and copied for every run, so
+the 1M-user seed is only built once.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import sqlalchemy
+from sqlalchemy import insert
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from app import create_app, db
+from app.config import Config
+from app.models import User
+from app.utils.pagination import encode_cursor
+from app.utils.password_hasher import get_password_hasher
+
+# Default seed sizes
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+# Rows inserted per executemany while seeding
+SEED_BATCH_SIZE = 10_000
+
+# Statement count reported by the Server-Timing header
+QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+# Metrics where a higher value is a regression, and the one where lower is
+LATENCY_METRICS = ("p50_ms", "p99_ms")
+THROUGHPUT_METRIC = "throughput_rps"
+
+
+def png_image(seed: int, size: int = 16) -> bytes:
+    """Return a small valid RGB PNG whose pixels depend on ``seed``."""
+    rng = random.Random(seed)
+    row = bytes(rng.getrandbits(8) for _ in range(size * 3))
+    raw = b"".join(b"\x00" + row for _ in range(size))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+def seed_users(rows: int) -> None:
+    """Insert ``rows`` synthetic users using batched Core inserts."""
+    for start in range(0, rows, SEED_BATCH_SIZE):
+        db.session.execute(insert(User), [
+            {
+                "first_name": f"First{i}",
+                "last_name": f"Last{i % 5000}",
+                "email": f"user{i}@example.com",
+                "password": "x" * 100,
+                "change_seq": i + 1,
+            }
+            for i in range(start, min(start + SEED_BATCH_SIZE, rows))
+        ])
+    db.session.execute(sqlalchemy.text(
+        "UPDATE change_sequence SET value = :value WHERE id = 1"
+    ), {"value": rows})
+    db.session.commit()
+
+
+class Scenario(NamedTuple):
+    """
+    One benchmarked route.
+
+    Attributes:
+        name (str): Scenario name used in results
+        method (str): HTTP method
+        build (callable): ``build(index) -> (url, request kwargs)``
+        share (float): Fraction of ``--requests`` to send (for heavy routes)
+    """
+
+    name: str
+    method: str
+    build: Callable[[int], Tuple[str, dict]]
+    share: float = 1.0
+
+
+def build_scenarios(rows: int, requests: int, seed: int) -> List[Scenario]:
+    """
+    Return the scenarios for a database seeded with ``rows`` users.
+
+    Reads and updates use the lower part of the id range; single and bulk
+    deletes each take their own slice from the top, so no request targets
+    a user another scenario removed.
+    """
+    rng = random.Random(seed)
+    run_id = rng.getrandbits(32)
+    deletable = min(requests, rows // 4)
+    bulk_size = 100
+    single_delete_ids = range(rows - deletable + 1, rows + 1)
+    bulk_delete_start = rows - 2 * deletable + 1
+    live_ids = max(rows - 2 * deletable, 1)
+
+    def any_id() -> int:
+        return rng.randint(1, live_ids)
+
+    def form(index: int, prefix: str) -> dict:
+        return {
+            "first_name": f"Bench{index}",
+            "last_name": f"Run{run_id}",
+            "email": f"{prefix}-{run_id}-{index}@bench.example.com",
+            "password": "correct horse battery staple",
+        }
+
+    def create_image(index: int):
+        data = form(index, "image")
+        data["image"] = (io.BytesIO(png_image(run_id + index)), "photo.png")
+        return "/api/users/", {"data": data, "content_type": "multipart/form-data"}
+
+    def bulk_create(index: int):
+        return "/api/users/bulk", {"json": [
+            form(index * bulk_size + offset, "bulk") for offset in range(bulk_size)
+        ]}
+
+    def bulk_delete(index: int):
+        start = bulk_delete_start + index * bulk_size
+        stop = min(start + bulk_size, rows - deletable + 1)
+        return "/api/users/bulk-delete", {"json": {"ids": list(range(start, max(stop, start)))}}
+
+    middle = encode_cursor(rows // 2)
+    return [
+        Scenario("list", "GET", lambda i: ("/api/users/?limit=50", {})),
+        Scenario("list_deep", "GET", lambda i: (f"/api/users/?limit=50&after={middle}", {})),
+        Scenario("list_fields", "GET", lambda i: ("/api/users/?limit=500&fields=id,email", {})),
+        Scenario("list_search", "GET",
+                 lambda i: (f"/api/users/?q=last{rng.randint(0, 4999)}&limit=50", {})),
+        Scenario("list_sorted", "GET",
+                 lambda i: ("/api/users/?sort=-last_name&limit=50", {})),
+        Scenario("get", "GET", lambda i: (f"/api/users/{any_id()}", {})),
+        Scenario("lookup", "GET", lambda i: (
+            "/api/users/?ids=" + ",".join(str(any_id()) for _ in range(100)), {}
+        )),
+        Scenario("lookup_post", "POST", lambda i: (
+            "/api/users/lookup", {"json": {"ids": [any_id() for _ in range(100)]}}
+        )),
+        Scenario("changes", "GET", lambda i: (
+            f"/api/users/changes?since={encode_cursor(max(rows - 50, 0))}", {}
+        )),
+        Scenario("export", "GET", lambda i: ("/api/users/export?format=ndjson", {}), share=0.02),
+        Scenario("create", "POST", lambda i: ("/api/users/", {"data": form(i, "create")})),
+        Scenario("create_image", "POST", create_image),
+        Scenario("update", "PUT", lambda i: (
+            f"/api/users/{any_id()}", {"data": {"last_name": f"Updated{i}"}}
+        )),
+        Scenario("patch", "PATCH", lambda i: (
+            f"/api/users/{any_id()}", {"json": {"first_name": f"Patched{i}"}}
+        )),
+        Scenario("bulk_create", "POST", bulk_create, share=0.05),
+        Scenario("delete", "DELETE", lambda i: (
+            f"/api/users/{single_delete_ids[i % len(single_delete_ids)]}", {}
+        )),
+        Scenario("bulk_delete", "POST", bulk_delete,
+                 share=max(deletable // bulk_size, 1) / max(requests, 1)),
+    ]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(values)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def run_scenario(app, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    """
+    Send ``requests`` requests for ``scenario`` and summarize them.
+
+    Returns:
+        dict: requests, errors, throughput_rps, mean/p50/p90/p99/max in
+            milliseconds and queries_per_request
+    """
+    local = threading.local()
+    builds = [scenario.build(index) for index in range(requests)]
+
+    def send(index: int) -> Tuple[float, int, Optional[int]]:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        url, kwargs = builds[index]
+        started = time.perf_counter()
+        response = client.open(url, method=scenario.method, **kwargs)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        match = QUERY_COUNT.search(response.headers.get("Server-Timing", ""))
+        return elapsed, response.status_code, int(match.group(1)) if match else None
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(send, range(requests)))
+    else:
+        samples = [send(index) for index in range(requests)]
+    wall = time.perf_counter() - started
+
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    return {
+        "requests": requests,
+        "errors": sum(1 for sample in samples if sample[1] >= 400),
+        "throughput_rps": round(requests / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p90_ms": round(percentile(latencies, 0.90), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "queries_per_request": round(statistics.fmean(queries), 2) if queries else None,
+    }
+
+
+def seeded_database(rows: int, data_dir: str, config_class) -> str:
+    """Return the path of a database seeded with ``rows`` users, building it once."""
+    path = os.path.join(data_dir, f"users_{rows}.db")
+    if os.path.exists(path):
+        return path
+
+    building = f"{path}.building"
+    if os.path.exists(building):
+        os.remove(building)
+
+    class SeedConfig(config_class):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{building}"
+
+    app = create_app(SeedConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        seed_users(rows)
+        db.session.remove()
+        db.engine.dispose()
+    app.extensions["password_hasher"].shutdown()
+    os.replace(building, path)
+    return path
+
+
+def run_size(rows: int, args, config_class) -> Dict[str, dict]:
+    """Benchmark every scenario against a fresh copy of the ``rows``-user database."""
+    source = seeded_database(rows, args.data_dir, config_class)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database = os.path.join(tmp_dir, "bench.db")
+        shutil.copyfile(source, database)
+
+        class RunConfig(config_class):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{database}"
+            UPLOAD_FOLDER = os.path.join(tmp_dir, "photos")
+
+        app = create_app(RunConfig)
+        results = {}
+        try:
+            # Open the pool connections and start the hashing processes up front
+            app.test_client().get("/api/users/?limit=1")
+            with app.app_context():
+                get_password_hasher().hash("warm-up")
+
+            for scenario in build_scenarios(rows, args.requests, args.seed):
+                if args.only and scenario.name not in args.only:
+                    continue
+                count = max(int(args.requests * scenario.share), 1)
+                results[scenario.name] = run_scenario(app, scenario, count, args.concurrency)
+                print(format_row(rows, scenario.name, results[scenario.name]), flush=True)
+        finally:
+            app.extensions["password_hasher"].shutdown()
+            with app.app_context():
+                db.session.remove()
+                for engine in db.engines.values():
+                    engine.dispose()
+    return results
+
+
+def format_row(rows: int, name: str, result: dict) -> str:
+    """Format one result line for the console."""
+    queries = result["queries_per_request"]
+    return (
+        f"{rows:>9} {name:<14} {result['throughput_rps']:>9.1f} req/s "
+        f"p50 {result['p50_ms']:>8.2f}ms p99 {result['p99_ms']:>8.2f}ms "
+        f"queries {queries if queries is not None else '-':>5} errors {result['errors']}"
+    )
+
+
+def compare_results(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    List regressions of ``current`` against ``baseline``.
+
+    A scenario regresses when its p50 or p99 latency grew, or its
+    throughput fell, by more than ``threshold`` (a fraction), or when it
+    issues more SQL statements per request or has errors the baseline did
+    not have. Scenarios missing from either file are ignored.
+
+    Args:
+        current (dict): Results document of this run
+        baseline (dict): Stored results document
+        threshold (float): Allowed relative change, e.g. 0.2 for 20%
+
+    Returns:
+        list: Human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    for size, scenarios in current["results"].items():
+        for name, result in scenarios.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if base is None:
+                continue
+            label = f"{size} users / {name}"
+            for metric in LATENCY_METRICS:
+                if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                    regressions.append(
+                        f"{label}: {metric} {base[metric]} -> {result[metric]} "
+                        f"(+{result[metric] / base[metric] - 1:.0%})"
+                    )
+            if result[THROUGHPUT_METRIC] < base[THROUGHPUT_METRIC] * (1 - threshold):
+                regressions.append(
+                    f"{label}: {THROUGHPUT_METRIC} {base[THROUGHPUT_METRIC]} -> "
+                    f"{result[THROUGHPUT_METRIC]} "
+                    f"({result[THROUGHPUT_METRIC] / base[THROUGHPUT_METRIC] - 1:.0%})"
+                )
+            if (result["queries_per_request"] or 0) > (base["queries_per_request"] or 0):
+                regressions.append(
+                    f"{label}: queries per request {base['queries_per_request']} -> "
+                    f"{result['queries_per_request']}"
+                )
+            if result["errors"] > base["errors"]:
+                regressions.append(f"{label}: errors {base['errors']} -> {result['errors']}")
+    return regressions
+
+
+def environment() -> dict:
+    """Describe the machine and library versions of this run."""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated numbers of seeded users.")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="Requests per scenario (heavy scenarios send a fraction).")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Client threads sending requests.")
+    parser.add_argument("--only", type=lambda value: set(value.split(",")), default=None,
+                        help="Comma-separated scenario names to run.")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for request data.")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "bench-users"),
+                        help="Directory caching the seeded databases.")
+    parser.add_argument("--hash-cost", type=int, default=None,
+                        help="Override PASSWORD_HASH_COST (default: the configured cost).")
+    parser.add_argument("--output", default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", "latest.json"),
+                        help="Where to write the JSON results.")
+    parser.add_argument("--baseline", help="Results file to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed relative slowdown before flagging (default: 0.25).")
+    parser.add_argument("--compare", metavar="RESULTS",
+                        help="Compare an existing results file with --baseline instead of running.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Run the benchmarks, write the results and compare them with the baseline."""
+    args = parse_args(argv)
+
+    if args.compare:
+        if not args.baseline:
+            print("--compare requires --baseline", file=sys.stderr)
+            return 2
+        with open(args.compare, encoding="utf-8") as results_file:
+            document = json.load(results_file)
+    else:
+        os.makedirs(args.data_dir, exist_ok=True)
+        overrides = {"PASSWORD_HASH_COST": args.hash_cost} if args.hash_cost else {}
+        config_class = type("BenchConfig", (Config,), overrides)
+
+        document = {
+            "environment": environment(),
+            "settings": {"requests": args.requests, "concurrency": args.concurrency,
+                         "hash_cost": args.hash_cost or Config.PASSWORD_HASH_COST},
+            "results": {},
+        }
+        for rows in (int(size) for size in args.sizes.split(",")):
+            document["results"][str(rows)] = run_size(rows, args, config_class)
+
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(document, output_file, indent=2)
+        print(f"Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        regressions = compare_results(document, json.load(baseline_file), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regressions against {args.baseline} "
+          f"(threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
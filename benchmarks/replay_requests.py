@@ -0,0 +1,455 @@
+"""
+Request Trace Replay
+
+Replays a request trace recorded by the capture hook (app/utils/capture.py,
+enabled with REQUEST_CAPTURE_ENABLED) and reports latency distributions and
+error rates per route, so performance changes can be tested against a
+realistic traffic mix instead of synthetic loops.
+
+Requests are sent open-loop on the trace's own schedule: ``--rate 1``
+keeps the recorded timing, ``--rate 5`` replays five times faster and
+``--rate 0`` sends as fast as ``--concurrency`` threads allow. The report
+includes how far sends lagged behind the schedule; a growing lag means the
+target (or the client) could not keep up with the requested rate.
+
+Targets:
+    - default: an in-process app built with ``create_app`` on a copy of a
+      file-backed SQLite database seeded with ``--seed-users`` users
+    - ``--url http://host:port``: a running server, over HTTP keep-alive
+
+Recorded passwords are redacted, so they are replaced with a fixed value,
+and emails in form and JSON bodies get a per-run prefix (unless
+``--keep-emails``) so replayed creates do not collide with earlier runs.
+Uploaded files are recorded by size and replaced with generated PNG images
+of the same size. Records whose body was not captured are skipped.
+
+Usage:
+    python benchmarks/replay_requests.py requests.jsonl --rate 2 --concurrency 16
+    python benchmarks/replay_requests.py requests.jsonl --url http://localhost:5000
+    python benchmarks/replay_requests.py requests.jsonl --rate 0 --output replay.json
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from werkzeug.datastructures import FileStorage, MultiDict
+from werkzeug.test import encode_multipart
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+# pylint: disable=wrong-import-position
+from app import create_app, db
+from app.config import Config
+from bench_users_api import percentile, png_image, seeded_database
+
+# Password sent in place of redacted values
+REPLAY_PASSWORD = "replayed password"
+
+# Placeholder the capture hook stores instead of redacted values
+REDACTED = "<redacted>"
+
+# Path segments collapsed when grouping routes in the report
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+UPLOAD_ID_SEGMENT = re.compile(r"/[0-9a-f]{32}(?=/|$)")
+
+
+class ReplayRequest(NamedTuple):
+    """
+    One request of the trace, ready to send.
+
+    Attributes:
+        offset (float): Seconds after the first request it was recorded at
+        method (str): HTTP method
+        target (str): Path and query string
+        headers (dict): Request headers
+        body (bytes): Encoded request body
+        route (str): Route used to group results, e.g. ``GET /api/users/{id}``
+        recorded_status (int | None): Status code in the trace
+        recorded_ms (float | None): Latency in the trace
+    """
+
+    offset: float
+    method: str
+    target: str
+    headers: dict
+    body: bytes
+    route: str
+    recorded_status: Optional[int]
+    recorded_ms: Optional[float]
+
+
+def route_of(method: str, path: str) -> str:
+    """Return the route label of a request, with ids collapsed."""
+    path = UPLOAD_ID_SEGMENT.sub("/{upload_id}", ID_SEGMENT.sub("/{id}", path))
+    return f"{method} {path}"
+
+
+def _rewrite(value, prefix: Optional[str], key: Optional[str] = None):
+    """Replace redacted passwords and prefix emails in a form or JSON value."""
+    if isinstance(value, dict):
+        return {name: _rewrite(item, prefix, name) for name, item in value.items()}
+    if isinstance(value, list):
+        return [_rewrite(item, prefix, key) for item in value]
+    if value == REDACTED:
+        return REPLAY_PASSWORD
+    if key == "email" and prefix and isinstance(value, str):
+        return prefix + value
+    return value
+
+
+def _image_of_size(seed: int, size: Optional[int]) -> bytes:
+    """Return a valid PNG padded to ``size`` bytes (unique per ``seed``)."""
+    image = png_image(seed)
+    if size and size > len(image):
+        image += b"\x00" * (size - len(image))
+    return image
+
+
+def build_request(record: dict, index: int, start: float, rate: float,
+                  email_prefix: Optional[str]) -> Optional[ReplayRequest]:
+    """
+    Turn a trace record into a request, or None if it cannot be rebuilt.
+
+    Args:
+        record (dict): Trace line
+        index (int): Position in the trace (keeps generated data unique)
+        start (float): Timestamp of the first record
+        rate (float): Speed-up factor; 0 sends everything at once
+        email_prefix (str | None): Prefix added to emails, None to keep them
+    """
+    if record.get("body_omitted"):
+        return None
+
+    prefix = f"{email_prefix}{index}-" if email_prefix else None
+    headers = {}
+    if record.get("accept"):
+        headers["Accept"] = record["accept"]
+
+    body = b""
+    if "form" in record or record.get("files"):
+        values = MultiDict()
+        for name, items in _rewrite(record.get("form", {}), prefix).items():
+            for item in items:
+                values.add(name, item)
+        for name, uploads in (record.get("files") or {}).items():
+            for number, upload in enumerate(uploads):
+                values.add(name, FileStorage(
+                    io.BytesIO(_image_of_size(index * 100 + number, upload.get("size"))),
+                    filename=upload.get("filename") or "upload.png",
+                    content_type=upload.get("content_type") or "image/png",
+                ))
+        boundary, body = encode_multipart(values)
+        headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+    elif "json" in record:
+        body = json.dumps(_rewrite(record["json"], prefix)).encode("utf-8")
+        headers["Content-Type"] = record.get("content_type") or "application/json"
+
+    target = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+    offset = (record["ts"] - start) / rate if rate > 0 else 0.0
+    return ReplayRequest(
+        offset, record["method"], target, headers, body,
+        route_of(record["method"], record["path"]),
+        record.get("status"), record.get("duration_ms"),
+    )
+
+
+def load_trace(path: str, rate: float, email_prefix: Optional[str],
+               limit: Optional[int] = None) -> Tuple[List[ReplayRequest], int]:
+    """
+    Read a trace file.
+
+    Lines that are not capture records (or whose body was not captured)
+    are skipped.
+
+    Returns:
+        tuple: (requests ordered by offset, number of skipped lines)
+    """
+    records, skipped = [], 0
+    with open(path, encoding="utf-8") as trace:
+        for line in trace:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            if not isinstance(record, dict) or not {"ts", "method", "path"} <= set(record):
+                skipped += 1
+                continue
+            records.append(record)
+            if limit and len(records) >= limit:
+                break
+
+    records.sort(key=lambda record: record["ts"])
+    start = records[0]["ts"] if records else 0.0
+    requests = []
+    for index, record in enumerate(records):
+        request = build_request(record, index, start, rate, email_prefix)
+        if request is None:
+            skipped += 1
+        else:
+            requests.append(request)
+    return requests, skipped
+
+
+class WsgiTransport:
+    """Sends requests to an in-process application through its test client."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, request: ReplayRequest) -> int:
+        """Send ``request`` and return the status code."""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(
+            request.target, method=request.method, headers=request.headers,
+            data=request.body,
+        )
+        response.get_data()
+        return response.status_code
+
+
+class HttpTransport:
+    """Sends requests to a running server over per-thread keep-alive connections."""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            factory = (http.client.HTTPSConnection if self.scheme == "https"
+                       else http.client.HTTPConnection)
+            connection = self._local.connection = factory(self.netloc, timeout=self.timeout)
+        return connection
+
+    def send(self, request: ReplayRequest) -> int:
+        """Send ``request`` and return the status code (retrying once on a stale connection)."""
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(request.method, self.prefix + request.target,
+                                   body=request.body or None, headers=request.headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        return 0
+
+
+def replay(requests: List[ReplayRequest], transport, concurrency: int) -> List[dict]:
+    """
+    Send ``requests`` on their schedule from ``concurrency`` threads.
+
+    Returns:
+        list: One sample per request with route, status (0 on transport
+            errors), latency_ms, lag_ms and the recorded status and latency
+    """
+    samples: List[Optional[dict]] = [None] * len(requests)
+    started = time.perf_counter()
+
+    def send(index: int) -> None:
+        request = requests[index]
+        sent = time.perf_counter()
+        try:
+            status = transport.send(request)
+        except Exception:  # pylint: disable=broad-except
+            status = 0
+        samples[index] = {
+            "route": request.route,
+            "status": status,
+            "latency_ms": (time.perf_counter() - sent) * 1000,
+            "lag_ms": max(sent - started - request.offset, 0.0) * 1000,
+            "recorded_status": request.recorded_status,
+            "recorded_ms": request.recorded_ms,
+        }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index, request in enumerate(requests):
+            delay = started + request.offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, index)
+    return [sample for sample in samples if sample is not None]
+
+
+def _distribution(values: List[float]) -> dict:
+    """Summarize latencies in milliseconds."""
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        "mean_ms": round(statistics.fmean(values), 3),
+        "p50_ms": round(percentile(values, 0.50), 3),
+        "p90_ms": round(percentile(values, 0.90), 3),
+        "p99_ms": round(percentile(values, 0.99), 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+
+def summarize(samples: List[dict], wall: float) -> dict:
+    """
+    Build the replay report.
+
+    Errors are transport failures and 5xx responses; 4xx responses are
+    reported separately, as are responses whose status class differs from
+    the recorded one (usually data that differs between environments).
+
+    Returns:
+        dict: ``overall`` and ``routes`` sections
+    """
+    def section(group: List[dict]) -> dict:
+        count = len(group)
+        errors = sum(1 for sample in group if sample["status"] == 0 or sample["status"] >= 500)
+        client_errors = sum(1 for sample in group if 400 <= sample["status"] < 500)
+        mismatched = sum(
+            1 for sample in group
+            if sample["recorded_status"] and sample["status"] // 100 != sample["recorded_status"] // 100
+        )
+        recorded = [sample["recorded_ms"] for sample in group if sample["recorded_ms"] is not None]
+        return {
+            "requests": count,
+            "errors": errors,
+            "error_rate": round(errors / count, 4) if count else 0.0,
+            "client_errors": client_errors,
+            "status_mismatches": mismatched,
+            "latency": _distribution([sample["latency_ms"] for sample in group]),
+            "recorded_latency": _distribution(recorded),
+        }
+
+    routes: Dict[str, List[dict]] = defaultdict(list)
+    for sample in samples:
+        routes[sample["route"]].append(sample)
+
+    overall = section(samples)
+    overall["wall_s"] = round(wall, 3)
+    overall["throughput_rps"] = round(len(samples) / wall, 2) if wall else 0.0
+    overall["lag"] = _distribution([sample["lag_ms"] for sample in samples])
+    return {
+        "overall": overall,
+        "routes": {route: section(group) for route, group in sorted(routes.items())},
+    }
+
+
+def print_report(report: dict) -> None:
+    """Print the replay report as a table."""
+    overall = report["overall"]
+    print(f"{'route':<40} {'reqs':>6} {'err%':>6} {'4xx':>5} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'rec p50':>9}")
+    for route, result in report["routes"].items():
+        print(f"{route[:40]:<40} {result['requests']:>6} {result['error_rate']:>6.1%} "
+              f"{result['client_errors']:>5} {result['latency']['p50_ms']:>9.2f} "
+              f"{result['latency']['p99_ms']:>9.2f} "
+              f"{result['recorded_latency'].get('p50_ms', float('nan')):>9.2f}")
+    print(f"{overall['requests']} requests in {overall['wall_s']}s "
+          f"({overall['throughput_rps']} req/s), error rate {overall['error_rate']:.2%}, "
+          f"p50 {overall['latency'].get('p50_ms', 0)}ms p99 {overall['latency'].get('p99_ms', 0)}ms, "
+          f"schedule lag p99 {overall['lag'].get('p99_ms', 0)}ms")
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("trace", nargs="?", default="requests.jsonl",
+                        help="Trace file written by the capture hook (default: requests.jsonl).")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Speed-up over the recorded timing; 0 sends as fast as possible.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Sending threads.")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N records.")
+    parser.add_argument("--url", help="Replay against a running server instead of in-process.")
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds.")
+    parser.add_argument("--seed-users", type=int, default=10_000,
+                        help="Users seeded into the in-process database (default: 10000).")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "bench-users"),
+                        help="Directory caching seeded databases.")
+    parser.add_argument("--hash-cost", type=int, default=None,
+                        help="Override PASSWORD_HASH_COST for the in-process app.")
+    parser.add_argument("--keep-emails", action="store_true",
+                        help="Send recorded emails unchanged.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Replay a trace and print (and optionally save) the report."""
+    args = parse_args(argv)
+    email_prefix = None if args.keep_emails else f"replay{random.getrandbits(24):06x}-"
+    requests, skipped = load_trace(args.trace, args.rate, email_prefix, args.limit)
+    if not requests:
+        print(f"No replayable requests in {args.trace} ({skipped} lines skipped)",
+              file=sys.stderr)
+        return 1
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = None
+        if args.url:
+            transport = HttpTransport(args.url, args.timeout)
+        else:
+            overrides = {"PASSWORD_HASH_COST": args.hash_cost} if args.hash_cost else {}
+            config_class = type("ReplayConfig", (Config,), overrides)
+            os.makedirs(args.data_dir, exist_ok=True)
+            database = os.path.join(tmp_dir, "replay.db")
+            shutil.copyfile(seeded_database(args.seed_users, args.data_dir, config_class), database)
+            config_class.SQLALCHEMY_DATABASE_URI = f"sqlite:///{database}"
+            config_class.UPLOAD_FOLDER = os.path.join(tmp_dir, "photos")
+            # Never capture the replay itself
+            config_class.REQUEST_CAPTURE_ENABLED = False
+            app = create_app(config_class)
+            transport = WsgiTransport(app)
+
+        try:
+            started = time.perf_counter()
+            samples = replay(requests, transport, args.concurrency)
+            report = summarize(samples, time.perf_counter() - started)
+        finally:
+            if app is not None:
+                app.extensions["password_hasher"].shutdown()
+                with app.app_context():
+                    db.session.remove()
+                    for engine in db.engines.values():
+                        engine.dispose()
+
+    report["settings"] = {"trace": args.trace, "rate": args.rate,
+                          "concurrency": args.concurrency, "skipped": skipped,
+                          "target": args.url or f"in-process ({args.seed_users} users)"}
+    print_report(report)
+    if skipped:
+        print(f"{skipped} trace lines skipped (not capture records or body not captured)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
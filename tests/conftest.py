@@ -0,0 +1,71 @@
+"""
+Shared pytest fixtures for the user API tests.
+
+Builds the application through ``create_app`` against a throw-away SQLite
+database so the endpoint tests run without MySQL or SQL Server.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from app import create_app, db
+from app.config import Config
+from app.models import User
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        UPLOAD_FOLDER = str(tmp_path / "photos")
+        # Hash inline with a cheap cost to keep the suite fast
+        PASSWORD_HASH_WORKERS = 0
+        PASSWORD_HASH_COST = 1000
+        # Resize images inline, retrying failures immediately
+        THUMBNAIL_WORKERS = 0
+        THUMBNAIL_RETRY_DELAY = 0
+        # Delete released images on the committing thread, however fresh
+        IMAGE_DELETE_ASYNC = False
+        IMAGE_DELETE_GRACE_SECONDS = 0
+        # Fail any request that issues too many statements or repeats one
+        # statement shape (an N+1 pattern) instead of only logging it
+        QUERY_STRICT_MODE = True
+        QUERY_MAX_PER_REQUEST = 20
+        QUERY_MAX_REPEATS = 3
+
+    application = create_app(TestConfig)
+    with application.app_context():
+        db.create_all(bind_key=None)
+        yield application
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_users(app):
+    def _make_users(count, prefix="user"):
+        users = [
+            User(
+                first_name=f"First{i}",
+                last_name=f"Last{i}",
+                email=f"{prefix}{i}@example.com",
+                password="hashed",
+            )
+            for i in range(count)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        return [user.id for user in users]
+
+    return _make_users
@@ -0,0 +1,1287 @@
+"""
+User Endpoint Tests
+
+Integration tests for the ``users_bp`` routes, run against a temporary
+SQLite database created by the fixtures in ``conftest.py``.
+
+Author: Backend API Team
+Version: 1.0.0
+"""
+
+import hashlib
+import io
+import json
+import os
+
+import pytest
+from sqlalchemy import insert, update
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app import create_app, db
+from app.config import Config
+from app.models import ChangeSequence, User
+from app.services.user_service import verify_user_password
+from app.utils.cache import MemoryCache, user_cache_key
+from app.utils.file_gc import release_after_commit
+from app.utils.password_hasher import HashingUnavailableError, PasswordHasher, needs_rehash
+from app.utils.query_log import QueryBudgetExceeded, get_query_monitor, statement_shape
+from app.utils.thumbnails import ThumbnailPipeline
+
+
+def test_list_users_is_cursor_paginated(client, make_users):
+    """The list endpoint returns pages linked by an opaque cursor."""
+    ids = make_users(5)
+
+    first = client.get("/api/users/?limit=2")
+    assert first.status_code == 200
+    assert [u["id"] for u in first.get_json()] == ids[:2]
+    cursor = first.headers["X-Next-Cursor"]
+    assert 'rel="next"' in first.headers["Link"]
+
+    second = client.get(f"/api/users/?limit=2&after={cursor}")
+    assert [u["id"] for u in second.get_json()] == ids[2:4]
+
+    last = client.get(f"/api/users/?limit=2&after={second.headers['X-Next-Cursor']}")
+    assert [u["id"] for u in last.get_json()] == ids[4:]
+    assert "X-Next-Cursor" not in last.headers
+    assert "Link" not in last.headers
+
+
+def test_list_users_limit_is_capped(app, client, make_users):
+    """Page size never exceeds USERS_PAGE_MAX_LIMIT."""
+    app.config["USERS_PAGE_MAX_LIMIT"] = 3
+    make_users(5)
+
+    response = client.get("/api/users/?limit=1000")
+    assert len(response.get_json()) == 3
+
+
+def test_list_users_rejects_bad_cursor(client):
+    """Malformed cursors and limits are reported as 400."""
+    assert client.get("/api/users/?after=not-a-cursor").status_code == 400
+    assert client.get("/api/users/?limit=0").status_code == 400
+    response = client.get("/api/users/?limit=abc")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "limit must be a positive integer"}
+
+
+def _explain(app, **args):
+    """Return the SQLite query plan of the user list for the given query string."""
+    from werkzeug.datastructures import MultiDict
+
+    from app.utils.search import parse_sort, search_filters, user_list_statement
+
+    with app.app_context():
+        sort = parse_sort(args.pop("sort", None))
+        stmt = user_list_statement(
+            [User.id], search_filters(MultiDict(args), "sqlite"), sort, None, 10
+        )
+        compiled = stmt.compile(db.engine, compile_kwargs={"literal_binds": True})
+        with db.engine.connect() as connection:
+            plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return " | ".join(row[-1] for row in plan)
+
+
+def test_list_users_filters_and_sorts_on_indexes(app, client, make_users):
+    """Search, filter and sort run on indexes and page on the sort key."""
+    make_users(3)
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {"first_name": "Ada", "last_name": "Lovelace", "email": "Ada@Example.com",
+             "password": "x", "version": 1},
+            {"first_name": "Alan", "last_name": "Turing", "email": "alan@example.com",
+             "password": "x", "version": 1},
+            {"first_name": "Adele", "last_name": "Lovelace", "email": "adele@example.org",
+             "password": "x", "version": 1},
+        ])
+        db.session.commit()
+
+    assert "ix_users_email_lower" in _explain(app, email="ada@example.com")
+    assert "ix_users_last_first" in _explain(app, last_name="Lovelace")
+    assert "ix_users_last_first" in _explain(app, sort="-last_name")
+    assert "VIRTUAL TABLE INDEX" in _explain(app, q="ad")
+
+    found = client.get("/api/users/?email=ADA@example.COM").get_json()
+    assert [u["first_name"] for u in found] == ["Ada"]
+
+    found = client.get("/api/users/?q=ad lovel").get_json()
+    assert sorted(u["first_name"] for u in found) == ["Ada", "Adele"]
+
+    # Full-text index follows updates and deletes
+    adele = next(u for u in found if u["first_name"] == "Adele")
+    client.patch(f"/api/users/{adele['id']}", json={"last_name": "Smith"})
+    assert [u["first_name"] for u in client.get("/api/users/?q=lovelace").get_json()] == ["Ada"]
+
+    # Keyset pages over (last_name, first_name, id), keeping the filters
+    first = client.get("/api/users/?sort=last_name&limit=2&fields=email")
+    assert [u["email"] for u in first.get_json()] == ["user0@example.com", "user1@example.com"]
+    second = client.get(f"/api/users/?sort=last_name&limit=2&fields=email"
+                        f"&after={first.headers['X-Next-Cursor']}")
+    assert [u["email"] for u in second.get_json()] == ["user2@example.com", "Ada@Example.com"]
+    assert "sort=last_name" in second.headers["Link"]
+
+    descending = client.get("/api/users/?sort=-email&limit=1").get_json()
+    assert descending[0]["email"] == "user2@example.com"
+
+    assert client.get("/api/users/?sort=password").status_code == 400
+    assert client.get("/api/users/?q=%21%21").status_code == 400
+    assert client.get(f"/api/users/?sort=email&after={first.headers['X-Next-Cursor']}"
+                      ).status_code == 400
+
+
+def test_export_users_ndjson(app, client, make_users):
+    """NDJSON export streams one public user object per line."""
+    app.config["USERS_EXPORT_BATCH_SIZE"] = 2
+    ids = make_users(5)
+
+    response = client.get("/api/users/export?format=ndjson")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["id"] for line in lines] == ids
+    assert "password" not in lines[0]
+
+
+def test_export_users_csv(client, make_users):
+    """CSV export starts with a header row, even for an empty table."""
+    assert client.get("/api/users/export?format=csv").get_data(as_text=True) == (
+        "id,first_name,last_name,email,image\r\n"
+    )
+
+    make_users(2)
+    rows = client.get("/api/users/export?format=csv").get_data(as_text=True).splitlines()
+    assert len(rows) == 3
+    assert rows[1].endswith(",user0@example.com,")
+
+
+def test_export_users_rejects_unknown_format(client):
+    assert client.get("/api/users/export?format=xml").status_code == 400
+
+
+def test_sparse_fieldsets(client, make_users):
+    """?fields= limits the returned keys; id is always included."""
+    user_id = make_users(2)[0]
+
+    listing = client.get("/api/users/?fields=email").get_json()
+    assert listing[0] == {"id": user_id, "email": "user0@example.com"}
+
+    single = client.get(f"/api/users/{user_id}?fields=first_name,email").get_json()
+    assert single == {"id": user_id, "first_name": "First0", "email": "user0@example.com"}
+
+    assert client.get(f"/api/users/{user_id}").get_json()["last_name"] == "Last0"
+    assert client.get("/api/users/?fields=password").status_code == 400
+    assert client.get("/api/users/999").status_code == 404
+
+
+def test_create_user_hashes_password(app, client):
+    """Passwords are stored using the configured hash method."""
+    response = client.post("/api/users/", data={
+        "first_name": "John",
+        "last_name": "Doe",
+        "email": "john@example.com",
+        "password": "securepass123",
+    })
+    assert response.status_code == 201
+
+    user = db.session.get(User, response.get_json()["id"])
+    assert user.password.startswith("pbkdf2:sha256:1000$")
+    assert verify_user_password(user, "securepass123")
+    assert not verify_user_password(user, "wrong")
+
+
+def test_create_user_returns_503_when_hash_queue_full(app, client):
+    """A saturated hashing pool rejects new signups instead of queueing."""
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0, queue_size=0, timeout=1)
+    app.extensions["password_hasher"] = hasher
+    # Occupy the only slot as if a hash were in flight
+    assert hasher._slots.acquire(blocking=False)  # pylint: disable=protected-access
+
+    response = client.post("/api/users/", data={
+        "first_name": "John",
+        "last_name": "Doe",
+        "email": "john@example.com",
+        "password": "securepass123",
+    })
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert User.query.count() == 0
+
+
+def test_bulk_hashing_leaves_slots_for_signups():
+    """Bulk jobs hold at most their share of hashing slots; signups get the rest."""
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0, queue_size=3,
+                            timeout=0.01, bulk_share=0.5)
+    assert hasher.bulk_slots == 2
+    # Two bulk hashes in flight use up the bulk share
+    # pylint: disable=protected-access
+    for _ in range(2):
+        assert hasher._bulk_slots.acquire(blocking=False)
+        assert hasher._slots.acquire(blocking=False)
+
+    with pytest.raises(HashingUnavailableError):
+        hasher.submit("bulk-password", block=True)
+    assert check_password_hash(hasher.hash("signup-password"), "signup-password")
+    assert hasher._slots.acquire(blocking=False)
+    assert hasher._slots.acquire(blocking=False)
+
+
+def test_verify_upgrades_cheaper_hash(app, make_users):
+    """A successful login re-hashes passwords stored with a lower cost."""
+    user = db.session.get(User, make_users(1)[0])
+    user.password = generate_password_hash("securepass123", "pbkdf2:sha256:500")
+    db.session.commit()
+
+    assert verify_user_password(user, "securepass123")
+    assert user.password.startswith("pbkdf2:sha256:1000$")
+    assert not needs_rehash(user.password, "pbkdf2:sha256:1000")
+    assert needs_rehash(user.password, "scrypt:16384:8:1")
+
+
+def test_password_hasher_process_pool():
+    """Hashes computed in worker processes verify normally."""
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=1, queue_size=2, timeout=30)
+    try:
+        hashes = hasher.hash_many(["first-password", "second-password"])
+    finally:
+        hasher.shutdown()
+    assert check_password_hash(hashes[0], "first-password")
+    assert check_password_hash(hashes[1], "second-password")
+
+
+def test_bulk_create_users_json(app, client, make_users):
+    """Bulk create reports per-record results and skips duplicates."""
+    app.config["USERS_BULK_BATCH_SIZE"] = 2
+    make_users(1)
+    records = [
+        {"first_name": "A", "last_name": "One", "email": "a@example.com", "password": "pw-a"},
+        {"first_name": "B", "last_name": "Two", "email": "User0@Example.com", "password": "pw"},
+        {"first_name": "C", "last_name": "Three", "email": "A@example.com", "password": "pw"},
+        {"first_name": "D", "last_name": "Four", "email": "d@example.com"},
+        {"first_name": "E", "last_name": "Five", "email": "e@example.com", "password": "pw-e"},
+    ]
+
+    response = client.post("/api/users/bulk", json=records)
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["created"] == 2
+    assert report["failed"] == 3
+    assert [entry["status"] for entry in report["results"]] == [
+        "created", "error", "error", "error", "created"
+    ]
+    assert report["results"][1]["error"] == "Email already exists"
+    assert report["results"][2]["error"] == "Duplicate email in request"
+
+    created = db.session.get(User, report["results"][4]["id"])
+    assert created.email == "e@example.com"
+    assert check_password_hash(created.password, "pw-e")
+
+
+def test_bulk_create_users_ndjson(client):
+    """NDJSON bodies are parsed line by line; bad lines are reported."""
+    body = (
+        '{"first_name": "A", "last_name": "One", "email": "a@example.com", "password": "pw"}\n'
+        "not json\n"
+        '{"first_name": "B", "last_name": "Two", "email": "b@example.com", "password": "pw"}\n'
+    )
+    response = client.post(
+        "/api/users/bulk", data=body, content_type="application/x-ndjson"
+    )
+    report = response.get_json()
+    assert report["created"] == 2
+    assert report["results"][1] == {"index": 1, "status": "error", "error": "Invalid JSON"}
+    assert User.query.count() == 2
+
+    assert client.post("/api/users/bulk", json={"not": "a list"}).status_code == 400
+
+
+def test_get_user_reads_through_cache(app, client, make_users):
+    """Repeated lookups hit the cache; writes invalidate the entry."""
+    user_id = make_users(1)[0]
+
+    assert client.get(f"/api/users/{user_id}").status_code == 200
+    assert client.get(f"/api/users/{user_id}?fields=email").get_json() == {
+        "id": user_id, "email": "user0@example.com"
+    }
+    stats = client.get("/internal/cache").get_json()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    client.put(f"/api/users/{user_id}", data={"first_name": "Changed"})
+    assert client.get(f"/api/users/{user_id}").get_json()["first_name"] == "Changed"
+
+    client.delete(f"/api/users/{user_id}")
+    assert client.get(f"/api/users/{user_id}").status_code == 404
+
+
+def test_cache_fill_racing_a_write_is_dropped(app, client, make_users, monkeypatch):
+    """A row read before a concurrent write commits is not left in the cache."""
+    from app.services import user_service
+
+    user_id = make_users(1)[0]
+
+    def patch_before_fill():
+        # Another request's PATCH commits after the read, before the fill
+        with db.engine.begin() as conn:
+            conn.execute(update(User).where(User.id == user_id).values(
+                last_name="Patched", version=User.version + 1
+            ))
+        user_service.get_user_cache().delete(user_cache_key(user_id))
+        return False
+
+    monkeypatch.setattr(user_service, "on_replica", patch_before_fill)
+    assert client.get(f"/api/users/{user_id}").get_json()["last_name"] == "Last0"
+    monkeypatch.undo()
+
+    assert client.get(f"/api/users/{user_id}").get_json()["last_name"] == "Patched"
+
+
+def test_memory_cache_lru_and_ttl():
+    """The memory backend evicts least recently used and expired entries."""
+    cache = MemoryCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    expired = MemoryCache(max_size=2, ttl=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+    assert expired.stats()["expirations"] == 1
+
+
+def test_conditional_get_user(client, make_users):
+    """A matching If-None-Match returns 304 until the row changes."""
+    user_id = make_users(1)[0]
+
+    first = client.get(f"/api/users/{user_id}")
+    etag = first.headers["ETag"]
+    assert client.get(f"/api/users/{user_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    # A different fieldset is a different representation
+    other = client.get(f"/api/users/{user_id}?fields=email", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    client.put(f"/api/users/{user_id}", data={"first_name": "Changed"})
+    changed = client.get(f"/api/users/{user_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_conditional_get_user_list(client, make_users):
+    """The list ETag changes on inserts, updates and deletes."""
+    ids = make_users(3)
+
+    etag = client.get("/api/users/").headers["ETag"]
+    unchanged = client.get("/api/users/", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.data == b""
+
+    client.put(f"/api/users/{ids[1]}", data={"last_name": "Changed"})
+    updated = client.get("/api/users/", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+
+    client.delete(f"/api/users/{ids[2]}")
+    deleted = client.get("/api/users/", headers={"If-None-Match": updated.headers["ETag"]})
+    assert deleted.status_code == 200
+
+
+def test_pool_metrics_endpoint(app, client, make_users):
+    """Pool statistics reflect the configured pool and recorded checkouts."""
+    make_users(1)
+    client.get("/api/users/")
+
+    stats = client.get("/internal/pool").get_json()["default"]
+    assert stats["pool_class"] == "InstrumentedQueuePool"
+    assert stats["pool_size"] == app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"]
+    assert stats["checkouts"] >= 1
+    assert stats["wait_seconds"]["count"] >= 1
+    assert stats["timeouts"] == 0
+
+
+def test_in_memory_sqlite_app_builds(tmp_path):
+    """In-memory SQLite keeps SQLAlchemy's pool and drops QueuePool-only options."""
+    class MemoryConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+        UPLOAD_FOLDER = str(tmp_path / "photos")
+        PASSWORD_HASH_WORKERS = 0
+        PASSWORD_HASH_COST = 1000
+
+    application = create_app(MemoryConfig)
+    assert "pool_size" not in application.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    with application.app_context():
+        db.create_all(bind_key=None)
+        assert application.test_client().get("/api/users/").status_code == 200
+        stats = application.test_client().get("/internal/pool").get_json()["default"]
+        assert stats["pool_class"] != "InstrumentedQueuePool"
+        db.session.remove()
+
+
+def _replica_app(tmp_path, replica_uri, cache_backend="null"):
+    class ReplicaConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_REPLICA_URIS = [replica_uri]
+        UPLOAD_FOLDER = str(tmp_path / "photos")
+        PASSWORD_HASH_WORKERS = 0
+        PASSWORD_HASH_COST = 1000
+        USER_CACHE_BACKEND = cache_backend
+
+    return create_app(ReplicaConfig)
+
+
+def test_reads_are_routed_to_replica(tmp_path):
+    """GETs use the replica; a client's reads stick to the primary after it writes."""
+    application = _replica_app(tmp_path, f"sqlite:///{tmp_path / 'replica.db'}")
+    with application.app_context():
+        db.create_all(bind_key=None)
+        db.metadata.create_all(db.engines["replica_0"])
+        with db.engines["replica_0"].begin() as conn:
+            conn.execute(insert(User), [{
+                "first_name": "Replica", "last_name": "Row",
+                "email": "replica@example.com", "password": "x",
+            }])
+
+        client = application.test_client()
+        assert [u["email"] for u in client.get("/api/users/").get_json()] == [
+            "replica@example.com"
+        ]
+
+        client.post("/api/users/", data={
+            "first_name": "Primary", "last_name": "Row",
+            "email": "primary@example.com", "password": "securepass123",
+        })
+        assert [u["email"] for u in client.get("/api/users/").get_json()] == [
+            "primary@example.com"
+        ]
+        db.session.remove()
+
+
+def test_user_reads_use_replica_and_cache_only_primary_rows(tmp_path):
+    """Single and batch user reads go to the replica, which never fills the cache."""
+    application = _replica_app(tmp_path, f"sqlite:///{tmp_path / 'replica.db'}", "memory")
+    with application.app_context():
+        db.create_all(bind_key=None)
+        db.metadata.create_all(db.engines["replica_0"])
+        row = {"first_name": "Replica", "last_name": "Row", "password": "x"}
+        with db.engines["replica_0"].begin() as conn:
+            conn.execute(insert(User), [{**row, "email": "replica@example.com"}])
+        with db.engine.begin() as conn:
+            conn.execute(insert(User), [{**row, "email": "primary@example.com"}])
+
+        client = application.test_client()
+        assert client.get("/api/users/1").get_json()["email"] == "replica@example.com"
+        assert client.get("/api/users/?ids=1").get_json()["users"][0]["email"] == (
+            "replica@example.com"
+        )
+        assert client.get("/internal/cache").get_json()["size"] == 0
+
+        # Inside the read-your-writes window reads use the primary and are cached
+        client.post("/api/users/", data={
+            "first_name": "New", "last_name": "Row",
+            "email": "new@example.com", "password": "securepass123",
+        })
+        assert client.get("/api/users/1").get_json()["email"] == "primary@example.com"
+        assert client.get("/internal/cache").get_json()["size"] == 1
+        db.session.remove()
+
+
+def test_failed_replica_is_ejected(tmp_path):
+    """A replica that cannot be reached is ejected and the read retried on the primary."""
+    application = _replica_app(tmp_path, f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    with application.app_context():
+        db.create_all(bind_key=None)
+        client = application.test_client()
+
+        response = client.get("/api/users/")
+        assert response.status_code == 200
+        assert client.get("/internal/replicas").get_json()["replica_0"]["healthy"] is False
+        db.session.remove()
+
+
+def test_server_timing_and_prometheus_metrics(client, make_users):
+    """Responses carry Server-Timing and requests show up in /metrics."""
+    user_id = make_users(1)[0]
+
+    response = client.get(f"/api/users/{user_id}")
+    timing = response.headers["Server-Timing"]
+    # The row, then its version re-checked after filling the cache
+    assert 'db;dur=' in timing and 'desc="2 queries"' in timing
+    assert "total;dur=" in timing
+
+    client.get("/api/users/999")
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert (
+        'http_request_duration_seconds_count{endpoint="users.get_user",method="GET",status="200"} 1'
+        in metrics
+    )
+    assert 'endpoint="users.get_user",method="GET",status="404"' in metrics
+    assert 'http_request_db_queries_total{endpoint="users.get_user",method="GET",status="200"} 2' \
+        in metrics
+    assert "metrics.prometheus_metrics" not in metrics
+    assert 'db_pool_checked_out{bind="default"}' in metrics
+    assert "# TYPE db_pool_timeouts_total counter" in metrics
+
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+def _create_with_image(client, email, content=PNG_BYTES, filename="photo.png"):
+    return client.post("/api/users/", data={
+        "first_name": "John",
+        "last_name": "Doe",
+        "email": email,
+        "password": "securepass123",
+        "image": (io.BytesIO(content), filename),
+    }, content_type="multipart/form-data")
+
+
+def test_images_are_content_addressed_and_deduplicated(app, client):
+    """Identical uploads share one sharded blob that lives until its last reference."""
+    first = _create_with_image(client, "a@example.com").get_json()
+    second = _create_with_image(client, "b@example.com").get_json()
+
+    digest = hashlib.sha256(PNG_BYTES).hexdigest()
+    assert first["image"] == f"{digest[:2]}/{digest[2:4]}/{digest}.png"
+    assert second["image"] == first["image"]
+
+    path = os.path.join(app.config["UPLOAD_FOLDER"], first["image"])
+    assert os.path.isfile(path)
+    assert os.listdir(os.path.join(app.config["UPLOAD_FOLDER"], ".tmp")) == []
+
+    client.delete(f"/api/users/{first['id']}")
+    assert os.path.isfile(path)
+    client.delete(f"/api/users/{second['id']}")
+    assert not os.path.exists(path)
+
+
+def test_replaced_image_is_released(app, client):
+    """Uploading a new image removes the previous blob when unreferenced."""
+    user = _create_with_image(client, "a@example.com").get_json()
+    old_path = os.path.join(app.config["UPLOAD_FOLDER"], user["image"])
+
+    response = client.put(f"/api/users/{user['id']}", data={
+        "image": (io.BytesIO(PNG_BYTES + b"new"), "other.png"),
+    }, content_type="multipart/form-data")
+    new_image = response.get_json()["image"]
+
+    assert new_image != user["image"]
+    assert os.path.isfile(os.path.join(app.config["UPLOAD_FOLDER"], new_image))
+    assert not os.path.exists(old_path)
+
+
+def test_upload_with_wrong_magic_bytes_is_rejected(app, client):
+    """A file that is not a PNG/JPEG is refused with 415 and leaves nothing behind."""
+    response = _create_with_image(client, "fake@example.com", content=b"GIF89a" + b"\x00" * 64)
+
+    assert response.status_code == 415
+    assert "error" in response.get_json()
+    assert os.listdir(os.path.join(app.config["UPLOAD_FOLDER"], ".tmp")) == []
+    with app.app_context():
+        assert User.query.count() == 0
+
+
+def test_oversized_upload_is_rejected(app, client):
+    """Images over MAX_IMAGE_UPLOAD_SIZE and bodies over MAX_CONTENT_LENGTH get 413."""
+    app.config["MAX_IMAGE_UPLOAD_SIZE"] = 1024
+    response = _create_with_image(client, "big@example.com", content=PNG_BYTES + b"\x00" * 4096)
+    assert response.status_code == 413
+    assert os.listdir(os.path.join(app.config["UPLOAD_FOLDER"], ".tmp")) == []
+
+    app.config["MAX_CONTENT_LENGTH"] = 512
+    response = _create_with_image(client, "big@example.com", content=PNG_BYTES + b"\x00" * 600)
+    assert response.status_code == 413
+
+    # The stored extension follows the content, not the client filename
+    app.config["MAX_CONTENT_LENGTH"] = 1024 * 1024
+    jpeg = b"\xff\xd8\xff\xe0" + b"\x00" * 64
+    created = _create_with_image(client, "ok@example.com", content=jpeg, filename="photo.png")
+    assert created.status_code == 201
+    assert created.get_json()["image"].endswith(".jpg")
+
+
+def _flaky_render(failures):
+    """Build a render function that fails ``failures`` times, then copies the original."""
+    calls = []
+
+    def render(source, targets, image_format):
+        calls.append(source)
+        if len(calls) <= failures:
+            raise OSError("worker crashed")
+        for target in targets.values():
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(source, "rb") as original, open(target, "wb") as derivative:
+                derivative.write(original.read())
+        return sorted(targets)
+    return render
+
+
+def test_derivative_falls_back_to_original_until_ready(app, client):
+    """/uploads/<size>/<name> serves the original until the derivative exists."""
+    name = _create_with_image(client, "thumb@example.com").get_json()["image"]
+
+    response = client.get(f"/uploads/64/{name}")
+    assert response.status_code == 200
+    assert response.data == PNG_BYTES
+    assert "no-cache" in response.headers["Cache-Control"]
+    assert client.get(f"/uploads/65/{name}").status_code == 404
+    assert client.get("/uploads/64/../test.db").status_code == 404
+
+    storage = app.extensions["image_storage"]
+    pipeline = ThumbnailPipeline(storage, (64,), "webp", workers=0, max_retries=3,
+                                 retry_delay=0, render=_flaky_render(2))
+    app.extensions["thumbnail_pipeline"] = pipeline
+
+    assert pipeline.enqueue(name)
+    assert pipeline.stats()["queued"] == 0
+    assert pipeline.stats()["completed"] == 1
+    assert pipeline.stats()["retries"] == 2
+    assert not pipeline.enqueue(name)
+
+    response = client.get(f"/uploads/64/{name}")
+    assert response.headers["Content-Type"] == "image/webp"
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+    assert client.get("/internal/thumbnails").get_json()["completed"] == 1
+    assert "thumbnail_queue_depth 0" in client.get("/metrics").get_data(as_text=True)
+
+    # Derivatives go away with the last reference to the original
+    derivative = pipeline.derivative_path(name, 64)
+    client.delete("/api/users/1")
+    assert not os.path.exists(derivative)
+
+
+def test_thumbnail_job_fails_after_retries(app):
+    """A job that keeps failing is retried, then marked failed and not re-queued."""
+    storage = app.extensions["image_storage"]
+    name = storage.save(io.BytesIO(PNG_BYTES), "png")
+
+    def broken(source, targets, image_format):
+        raise OSError("cannot identify image file")
+
+    pipeline = ThumbnailPipeline(storage, (64, 256), "webp", workers=0, max_retries=2,
+                                 retry_delay=0, render=broken)
+    assert pipeline.enqueue(name)
+    assert pipeline.stats()["failed"] == 1
+    assert pipeline.stats()["retries"] == 2
+    assert not pipeline.enqueue(name)
+
+
+def test_render_derivatives_with_pillow(tmp_path):
+    """Derivatives fit the requested box and are written in the target format."""
+    image_module = pytest.importorskip("PIL.Image")
+    from app.utils.thumbnails import render_derivatives  # pylint: disable=import-outside-toplevel
+
+    source = tmp_path / "original.png"
+    image_module.new("RGB", (400, 200), "red").save(source)
+    targets = {64: str(tmp_path / "64" / "out.webp"), 1024: str(tmp_path / "1024" / "out.webp")}
+
+    assert render_derivatives(str(source), targets, "webp") == [64, 1024]
+    with image_module.open(targets[64]) as small:
+        assert small.format == "WEBP" and small.size == (64, 32)
+    with image_module.open(targets[1024]) as large:
+        assert large.size == (400, 200)
+
+
+def test_images_are_served_with_ranges_validators_and_offload(app, client):
+    """Originals get immutable caching, ETag/Range support and proxy offload headers."""
+    name = _create_with_image(client, "serve@example.com").get_json()["image"]
+    url = f"/uploads/photos/{name}"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == PNG_BYTES
+    assert response.headers["ETag"] == f'"{hashlib.sha256(PNG_BYTES).hexdigest()}"'
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+
+    assert client.get(url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+    partial = client.get(url, headers={"Range": "bytes=0-7"})
+    assert partial.status_code == 206
+    assert partial.data == PNG_BYTES[:8]
+    assert client.get("/uploads/photos/ab/cd/missing.png").status_code == 404
+
+    app.config["IMAGE_OFFLOAD"] = "x-accel-redirect"
+    offloaded = client.get(url)
+    assert offloaded.data == b""
+    assert offloaded.headers["X-Accel-Redirect"] == f"/protected-uploads/{name}"
+    assert offloaded.headers["Content-Type"] == "image/png"
+    assert "immutable" in offloaded.headers["Cache-Control"]
+
+    app.config["IMAGE_OFFLOAD"] = "x-sendfile"
+    sendfile = client.get(url)
+    assert sendfile.headers["X-Sendfile"] == os.path.join(app.config["UPLOAD_FOLDER"], name)
+
+
+def test_released_image_survives_rollback_and_is_deleted_in_background(app, client):
+    """Images are only deleted after a successful commit, by the deletion worker."""
+    created = _create_with_image(client, "gc@example.com").get_json()
+    path = os.path.join(app.config["UPLOAD_FOLDER"], created["image"])
+
+    user = db.session.get(User, created["id"])
+    release_after_commit(user.image)
+    db.session.delete(user)
+    db.session.rollback()
+    assert os.path.isfile(path)
+
+    deletion_queue = app.extensions["image_deletion_queue"]
+    deletion_queue.asynchronous = True
+    assert client.delete(f"/api/users/{created['id']}").status_code == 200
+    deletion_queue.join()
+    assert not os.path.exists(path)
+    assert client.get("/internal/deletions").get_json()["deleted"] == 1
+
+
+def test_reused_blob_is_not_deleted_before_its_reference_commits(app, client):
+    """A dedupe match refreshes the blob's mtime, and deleters skip fresh blobs."""
+    storage = app.extensions["image_storage"]
+    created = _create_with_image(client, "first@example.com").get_json()
+    path = storage.path_for(created["image"])
+    os.utime(path, (0, 0))
+
+    # Another request stores the same bytes but has not committed its row yet
+    assert storage.save(io.BytesIO(PNG_BYTES), "png") == created["image"]
+    assert os.path.getmtime(path) > 0
+
+    deletion_queue = app.extensions["image_deletion_queue"]
+    deletion_queue.grace = 60
+    assert client.delete(f"/api/users/{created['id']}").status_code == 200
+    assert os.path.isfile(path)
+    assert client.get("/internal/deletions").get_json()["kept"] == 1
+
+    result = app.test_cli_runner().invoke(args=["uploads-gc", "--min-age", "60"])
+    assert "Removed 0 orphaned images" in result.output
+    assert os.path.isfile(path)
+
+
+def test_uploads_gc_removes_orphans_in_bulk(app, client):
+    """`flask uploads-gc` removes unreferenced blobs, derivatives and stale temp files."""
+    storage = app.extensions["image_storage"]
+    kept = _create_with_image(client, "keep@example.com").get_json()["image"]
+    orphan = storage.save(io.BytesIO(PNG_BYTES + b"orphan"), "png")
+    orphan_derivative = storage.path_for(storage.derivative_name(orphan, 64, "webp"))
+    os.makedirs(os.path.dirname(orphan_derivative))
+    open(orphan_derivative, "wb").close()
+    open(os.path.join(storage.temp_dir, "abandoned.part"), "wb").close()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["uploads-gc", "--dry-run", "--min-age", "0"])
+    assert "Would remove 1 orphaned images" in result.output
+    assert storage.exists(orphan)
+
+    result = runner.invoke(args=["uploads-gc", "--min-age", "0"])
+    assert result.exit_code == 0
+    assert "Scanned 2 images. Removed 1 orphaned images" in result.output
+    assert storage.exists(kept)
+    assert not storage.exists(orphan)
+    assert not os.path.exists(orphan_derivative)
+    assert os.listdir(storage.temp_dir) == []
+
+    # Recent files are left alone by default
+    recent = storage.save(io.BytesIO(PNG_BYTES + b"recent"), "png")
+    runner.invoke(args=["uploads-gc"])
+    assert storage.exists(recent)
+
+
+def test_concurrent_resumable_appends_conflict(app, client):
+    """An append while another request holds the part file is rejected with 409."""
+    fcntl = pytest.importorskip("fcntl")
+    location = client.post("/api/uploads/", headers={"Upload-Length": str(len(PNG_BYTES))})
+    location = location.headers["Location"]
+    upload_id = location.rstrip("/").rsplit("/", 1)[-1]
+    headers = {"Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"}
+
+    part = os.path.join(app.extensions["image_storage"].root, ".uploads", f"{upload_id}.part")
+    with open(part, "ab") as held:
+        fcntl.flock(held.fileno(), fcntl.LOCK_EX)
+        assert client.patch(location, data=PNG_BYTES[:20], headers=headers).status_code == 409
+    assert client.head(location).headers["Upload-Offset"] == "0"
+    assert client.patch(location, data=PNG_BYTES[:20], headers=headers).status_code == 204
+
+
+def test_internal_upload_files_are_not_served(app, client):
+    """Upload sessions, temp files and derivatives cannot be fetched as photos."""
+    location = client.post("/api/uploads/", headers={"Upload-Length": "64"}).headers["Location"]
+    upload_id = location.rstrip("/").rsplit("/", 1)[-1]
+    storage = app.extensions["image_storage"]
+    assert os.path.isfile(os.path.join(storage.root, ".uploads", f"{upload_id}.json"))
+
+    assert client.get(f"/uploads/photos/.uploads/{upload_id}.json").status_code == 404
+    assert client.get(f"/uploads/photos/.uploads/{upload_id}.part").status_code == 404
+    assert client.get(f"/uploads/photos/ab/../.uploads/{upload_id}.json").status_code == 404
+    assert client.get(f"/uploads/64/.uploads/{upload_id}.json").status_code == 404
+
+
+def test_resumable_upload_is_appended_in_chunks_and_attached(app, client):
+    """A tus-style upload resumes from the server offset and is used by create/update."""
+    created = client.post("/api/uploads/", headers={"Upload-Length": str(len(PNG_BYTES))})
+    assert created.status_code == 201
+    assert created.headers["Tus-Resumable"] == "1.0.0"
+    location = created.headers["Location"]
+
+    def patch(offset, data):
+        return client.patch(location, data=data, headers={
+            "Upload-Offset": str(offset),
+            "Content-Type": "application/offset+octet-stream",
+        })
+
+    assert patch(0, PNG_BYTES[:20]).headers["Upload-Offset"] == "20"
+    # A client that lost the response asks for the offset and resumes there
+    assert client.head(location).headers["Upload-Offset"] == "20"
+    assert patch(0, PNG_BYTES[:20]).status_code == 409
+    assert patch(20, PNG_BYTES[20:] + b"extra").status_code == 413
+
+    upload_id = location.rsplit("/", 1)[1]
+    incomplete = client.post("/api/users/", data={
+        "first_name": "Res", "last_name": "Ume", "email": "res@example.com",
+        "password": "securepass123", "upload_id": upload_id,
+    })
+    assert incomplete.status_code == 400
+
+    assert patch(20, PNG_BYTES[20:]).headers["Upload-Offset"] == str(len(PNG_BYTES))
+    user = client.post("/api/users/", data={
+        "first_name": "Res", "last_name": "Ume", "email": "res@example.com",
+        "password": "securepass123", "upload_id": upload_id,
+    }).get_json()
+    digest = hashlib.sha256(PNG_BYTES).hexdigest()
+    assert user["image"] == f"{digest[:2]}/{digest[2:4]}/{digest}.png"
+    assert client.head(location).status_code == 404
+
+    # Sessions that are not images are refused on the first chunk
+    other = client.post("/api/uploads/", headers={"Upload-Length": "64"}).headers["Location"]
+    rejected = client.patch(other, data=b"GIF89a" + b"\x00" * 58, headers={
+        "Upload-Offset": "0", "Content-Type": "application/offset+octet-stream",
+    })
+    assert rejected.status_code == 415
+    assert client.head(other).headers["Upload-Offset"] == "0"
+    assert client.delete(other).status_code == 204
+
+
+def test_abandoned_upload_sessions_expire(app, client):
+    """Idle sessions expire after UPLOAD_SESSION_TTL and are swept by uploads-gc."""
+    uploads = app.extensions["resumable_uploads"]
+    location = client.post("/api/uploads/", headers={"Upload-Length": "100"}).headers["Location"]
+    assert client.post("/api/uploads/", headers={"Upload-Length": "999999999"}).status_code == 413
+
+    uploads.ttl = -1
+    result = app.test_cli_runner().invoke(args=["uploads-gc"])
+    assert "and 1 expired upload sessions" in result.output
+    assert os.listdir(uploads.directory) == []
+    assert client.head(location).status_code == 404
+
+
+def test_patch_user_issues_a_single_update(app, client, make_users):
+    """PATCH writes only the supplied columns with one UPDATE and bumps the version."""
+    user_id, other_id = make_users(2)
+    etag = client.get(f"/api/users/{user_id}").headers["ETag"]
+
+    response = client.patch(f"/api/users/{user_id}", json={"last_name": "Patched"})
+    assert response.status_code == 200
+    assert response.get_json()["last_name"] == "Patched"
+    assert response.get_json()["first_name"] == "First0"
+    assert 'db;dur=' in response.headers["Server-Timing"]
+    # One UPDATE of users, then at commit the change feed counter and the stamp
+    assert '"3 queries"' in response.headers["Server-Timing"]
+    assert response.headers["ETag"] != etag
+    assert client.get(f"/api/users/{user_id}").headers["ETag"] == response.headers["ETag"]
+
+    # An unknown id is a single UPDATE and never takes a feed position
+    counter = db.session.get(ChangeSequence, 1).value
+    missing = client.patch("/api/users/999", json={"last_name": "X"})
+    assert missing.status_code == 404 and '"1 queries"' in missing.headers["Server-Timing"]
+    db.session.expire_all()
+    assert db.session.get(ChangeSequence, 1).value == counter
+    assert client.patch(f"/api/users/{user_id}", json={"image": "x.png"}).status_code == 400
+    assert client.patch(f"/api/users/{user_id}", json={}).status_code == 400
+    duplicate = client.patch(f"/api/users/{other_id}", json={"email": "user0@example.com"})
+    assert duplicate.status_code == 409
+
+    # Dialects without UPDATE ... RETURNING read the row and the counter back
+    dialect = db.engine.dialect
+    dialect.update_returning = False
+    try:
+        response = client.patch(f"/api/users/{user_id}", json={"first_name": "Again"})
+        assert response.get_json()["first_name"] == "Again"
+        assert '"5 queries"' in response.headers["Server-Timing"]
+        assert client.patch("/api/users/999", json={"last_name": "X"}).status_code == 404
+    finally:
+        dialect.update_returning = True
+
+
+def test_put_and_delete_racing_a_patch_conflict(app, client, make_users, monkeypatch):
+    """A PUT or DELETE of a row a PATCH changed meanwhile fails with 409, not 500."""
+    from app.services import user_service
+
+    user_id = make_users(1)[0]
+
+    def patch_meanwhile():
+        # Another request's PATCH commits between the load and the write
+        with db.engine.begin() as conn:
+            conn.execute(update(User).where(User.id == user_id).values(
+                last_name="Patched", version=User.version + 1
+            ))
+
+    store_request_image = user_service.store_request_image
+    monkeypatch.setattr(
+        user_service, "store_request_image",
+        lambda request: patch_meanwhile() or store_request_image(request)
+    )
+    response = client.put(f"/api/users/{user_id}", data={"first_name": "Put"})
+    assert response.status_code == 409
+
+    release = user_service.release_after_commit
+    monkeypatch.setattr(
+        user_service, "release_after_commit", lambda name: patch_meanwhile() or release(name)
+    )
+    assert client.delete(f"/api/users/{user_id}").status_code == 409
+    user = client.get(f"/api/users/{user_id}").get_json()
+    assert user["last_name"] == "Patched" and user["first_name"] == "First0"
+
+    monkeypatch.undo()
+    assert client.delete(f"/api/users/{user_id}").status_code == 200
+
+
+def test_batch_lookup_uses_cache_and_chunked_queries(app, client, make_users):
+    """?ids= and POST /lookup return users in request order, loading only cache misses."""
+    ids = make_users(5)
+    app.config["USERS_LOOKUP_CHUNK_SIZE"] = 2
+    client.get(f"/api/users/{ids[0]}")  # warm the cache for one id
+
+    response = client.get(f"/api/users/?ids={ids[3]},{ids[0]},999,{ids[1]},{ids[3]}")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [user["id"] for user in body["users"]] == [ids[3], ids[0], ids[1]]
+    assert body["missing"] == [999]
+    # Three misses in chunks of two ids -> two IN queries, then one more
+    # re-checking the versions of the two users found
+    assert '"3 queries"' in response.headers["Server-Timing"]
+
+    response = client.post("/api/users/lookup?fields=email", json={"ids": ids[::-1]})
+    assert response.get_json()["users"][0] == {"id": ids[4], "email": "user4@example.com"}
+    assert '"2 queries"' in response.headers["Server-Timing"]
+
+    response = client.post("/api/users/lookup", json={"ids": ids[:3]})
+    assert '"0 queries"' in response.headers["Server-Timing"]
+
+    assert client.get("/api/users/?ids=1,abc").status_code == 400
+    assert client.post("/api/users/lookup", json={"ids": []}).status_code == 400
+    app.config["USERS_LOOKUP_MAX_IDS"] = 2
+    assert client.get("/api/users/?ids=1,2,3").status_code == 400
+
+
+def test_bulk_delete_by_ids_and_filter(app, client, make_users):
+    """Bulk delete runs one DELETE ... RETURNING per chunk and releases images in one pass."""
+    first = _create_with_image(client, "a@partner.com").get_json()
+    second = _create_with_image(client, "b@partner.com").get_json()
+    keep = _create_with_image(client, "c@example.com", content=PNG_BYTES + b"keep").get_json()
+    shared = os.path.join(app.config["UPLOAD_FOLDER"], first["image"])
+    ids = make_users(3, prefix="churned")
+    app.config["USERS_BULK_DELETE_CHUNK_SIZE"] = 2
+
+    response = client.post("/api/users/bulk-delete", json={"ids": [ids[0], ids[1], 999]})
+    assert response.get_json() == {"deleted": 2, "images_released": 0, "missing": [999]}
+    # Per chunk: the DELETE, plus the counter UPDATE and tombstone INSERT at
+    # commit when rows were deleted
+    assert '"4 queries"' in response.headers["Server-Timing"]
+
+    response = client.post("/api/users/bulk-delete", json={"filter": {"email_domain": "partner.com"}})
+    assert response.get_json() == {"deleted": 2, "images_released": 1}
+    assert not os.path.exists(shared)
+    assert client.get(f"/api/users/{second['id']}").status_code == 404
+    assert client.get(f"/api/users/{keep['id']}").status_code == 200
+    assert client.get(f"/api/users/{ids[2]}").status_code == 200
+
+    assert client.post("/api/users/bulk-delete", json={"ids": ["1"]}).status_code == 400
+    assert client.post("/api/users/bulk-delete", json={"filter": {"name": "x"}}).status_code == 400
+
+
+def test_change_feed_returns_deltas_and_tombstones(app, client, make_users):
+    """The change feed returns only rows changed since the cursor, deletes included."""
+    import threading
+    import time
+    from datetime import timedelta
+
+    from app.utils.changes import prune_tombstones
+
+    ids = make_users(3)
+    full = client.get("/api/users/changes").get_json()
+    assert [(c["op"], c["id"]) for c in full["changes"]] == [("upsert", i) for i in ids]
+    assert "password" not in full["changes"][0]["user"]
+    cursor = full["next"]
+
+    # Nothing changed: empty page, same position
+    idle = client.get(f"/api/users/changes?since={cursor}").get_json()
+    assert idle == {"changes": [], "next": cursor, "has_more": False}
+
+    client.patch(f"/api/users/{ids[0]}", json={"last_name": "Changed"})
+    client.patch(f"/api/users/{ids[1]}", json={"password": "secret"})
+    client.delete(f"/api/users/{ids[2]}")
+    client.post("/api/users/bulk-delete", json={"ids": [ids[1]]})
+    client.post("/api/users/bulk", json=[
+        {"first_name": "B", "last_name": "C", "email": "bulk@example.com", "password": "x"}
+    ])
+
+    first = client.get(f"/api/users/changes?since={cursor}&limit=2")
+    page = first.get_json()
+    assert [(c["op"], c["id"]) for c in page["changes"]] == [
+        ("upsert", ids[0]), ("delete", ids[2])
+    ]
+    assert page["changes"][0]["user"]["last_name"] == "Changed"
+    assert page["has_more"] and 'rel="next"' in first.headers["Link"]
+    # Password-only changes are not published; the bulk paths are
+    rest = client.get(f"/api/users/changes?since={page['next']}").get_json()
+    assert [(c["op"], c["user"]["email"] if c["op"] == "upsert" else c["id"])
+            for c in rest["changes"]] == [("delete", ids[1]), ("upsert", "bulk@example.com")]
+    cursor = rest["next"]
+
+    # A long poll is woken by a write instead of waiting out its timeout
+    writer = threading.Timer(
+        0.2, lambda: app.test_client().patch(f"/api/users/{ids[0]}", json={"first_name": "Woken"})
+    )
+    started = time.monotonic()
+    writer.start()
+    woken = client.get(f"/api/users/changes?since={cursor}&wait=10").get_json()
+    writer.join()
+    assert time.monotonic() - started < 5
+    assert woken["changes"][0]["user"]["first_name"] == "Woken"
+
+    # Server-Sent Events resume from Last-Event-ID
+    app.config["CHANGES_STREAM_SECONDS"] = 0.3
+    stream = client.get("/api/users/changes", headers={
+        "Accept": "text/event-stream", "Last-Event-ID": cursor
+    })
+    assert stream.mimetype == "text/event-stream"
+    body = stream.get_data(as_text=True)
+    assert f"id: {woken['next']}\nevent: upsert\n" in body
+    assert body.count("event: ") == 1
+
+    # Cursors older than pruned tombstones must resync
+    with app.app_context():
+        assert prune_tombstones(timedelta(0)) == 2
+    assert client.get(f"/api/users/changes?since={full['next']}").status_code == 410
+    assert client.get(f"/api/users/changes?since={woken['next']}").status_code == 200
+    assert client.get("/api/users/changes?wait=-1").status_code == 400
+
+
+def test_benchmark_suite_runs_and_flags_regressions(tmp_path):
+    """The users API benchmark covers every route and compares against a baseline."""
+    import importlib.util
+
+    path = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "bench_users_api.py")
+    spec = importlib.util.spec_from_file_location("bench_users_api", path)
+    bench = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bench)
+
+    output = tmp_path / "results.json"
+    assert bench.main([
+        "--sizes", "200", "--requests", "2", "--hash-cost", "1000",
+        "--data-dir", str(tmp_path / "data"), "--output", str(output),
+    ]) == 0
+    results = json.loads(output.read_text())
+    scenarios = results["results"]["200"]
+    assert {"list", "get", "create", "create_image", "update", "delete"} <= set(scenarios)
+    assert all(result["errors"] == 0 for result in scenarios.values())
+
+    slower = json.loads(output.read_text())
+    slower["results"]["200"]["get"]["p99_ms"] = scenarios["get"]["p99_ms"] * 2 + 1
+    assert bench.compare_results(results, results, 0.25) == []
+    regressions = bench.compare_results(slower, results, 0.25)
+    assert len(regressions) == 1 and "get: p99_ms" in regressions[0]
+
+
+def test_captured_traffic_is_replayed(tmp_path):
+    """Capture records redacted API traffic that the replay tool can drive again."""
+    import importlib.util
+
+    trace = tmp_path / "requests.jsonl"
+    trace.write_text('{"request_id": "not-a-capture-record"}\n')
+
+    class CaptureConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'capture.db'}"
+        UPLOAD_FOLDER = str(tmp_path / "photos")
+        PASSWORD_HASH_WORKERS = 0
+        PASSWORD_HASH_COST = 1000
+        THUMBNAIL_WORKERS = 0
+        REQUEST_CAPTURE_ENABLED = True
+        REQUEST_CAPTURE_FILE = str(trace)
+
+    capture_app = create_app(CaptureConfig)
+    with capture_app.app_context():
+        db.create_all(bind_key=None)
+    client = capture_app.test_client()
+    created = _create_with_image(client, "trace@example.com").get_json()
+    client.get(f"/api/users/{created['id']}")
+    client.patch(f"/api/users/{created['id']}", json={"first_name": "Traced"})
+    client.get("/api/users/?limit=5")
+    client.get("/internal/pool")
+    capture = capture_app.extensions["request_capture"]
+    capture.join()
+    assert client.get("/internal/capture").get_json()["captured"] == 4
+    with capture_app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+    records = [json.loads(line) for line in trace.read_text().splitlines()[1:]]
+    assert [(r["method"], r["status"]) for r in records] == [
+        ("POST", 201), ("GET", 200), ("PATCH", 200), ("GET", 200)
+    ]
+    assert records[0]["form"]["password"] == ["<redacted>"]
+    assert records[0]["files"]["image"][0]["size"] == len(PNG_BYTES)
+    assert records[2]["json"] == {"first_name": "Traced"}
+    assert records[3]["query"] == "limit=5" and records[3]["db_queries"] == 1
+
+    path = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "replay_requests.py")
+    spec = importlib.util.spec_from_file_location("replay_requests", path)
+    replay = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(replay)
+
+    output = tmp_path / "replay.json"
+    assert replay.main([
+        str(trace), "--rate", "0", "--concurrency", "2", "--seed-users", "100",
+        "--hash-cost", "1000", "--data-dir", str(tmp_path / "data"), "--output", str(output),
+    ]) == 0
+    report = json.loads(output.read_text())
+    assert report["settings"]["skipped"] == 1
+    assert report["overall"]["requests"] == 4
+    assert report["overall"]["errors"] == 0
+    assert "PATCH /api/users/{id}" in report["routes"]
+    assert report["routes"]["POST /api/users/"]["status_mismatches"] == 0
+
+
+def test_requests_are_profiled_on_demand(tmp_path):
+    """Token-tagged requests are profiled to a rotating directory that can be downloaded."""
+    import pstats
+
+    class ProfilingConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'profiling.db'}"
+        UPLOAD_FOLDER = str(tmp_path / "photos")
+        REQUEST_PROFILING_ENABLED = True
+        REQUEST_PROFILING_TOKEN = "let-me-profile"
+        REQUEST_PROFILING_DIR = str(tmp_path / "profiles")
+        REQUEST_PROFILING_MAX_FILES = 2
+
+    profiling_app = create_app(ProfilingConfig)
+    with profiling_app.app_context():
+        db.create_all(bind_key=None)
+    client = profiling_app.test_client()
+
+    assert "X-Profile-Id" not in client.get("/api/users/").headers
+    assert "X-Profile-Id" not in client.get("/api/users/", headers={"X-Profile-Token": "nope"}).headers
+    names = [
+        client.get("/api/users/", headers={"X-Profile-Token": "let-me-profile"}).headers["X-Profile-Id"]
+        for _ in range(3)
+    ]
+    # Profiles can only be read with the token
+    assert client.get("/internal/profiles").status_code == 403
+    assert client.get(f"/internal/profiles/{names[-1]}").status_code == 403
+    client.environ_base["HTTP_X_PROFILE_TOKEN"] = "let-me-profile"
+    listing = client.get("/internal/profiles").get_json()
+    assert listing["written"] == 3
+    # Rotation keeps the two newest profiles
+    assert {profile["name"] for profile in listing["profiles"]} <= set(names)
+    assert len(listing["profiles"]) == 2
+    assert listing["profiles"][0]["endpoint"] == "users.get_all_users"
+    assert listing["profiles"][0]["method"] == "GET"
+
+    name = listing["profiles"][0]["name"]
+    download = client.get(f"/internal/profiles/{name}")
+    assert download.status_code == 200
+    (tmp_path / "download.prof").write_bytes(download.data)
+    assert pstats.Stats(str(tmp_path / "download.prof")).total_calls > 0
+    report = client.get(f"/internal/profiles/{name}?format=text&sort=tottime&limit=5")
+    assert report.status_code == 200 and b"function calls" in report.data
+    assert client.get(f"/internal/profiles/{name}?format=text&sort=bogus").status_code == 400
+    assert client.get("/internal/profiles/../test.db").status_code == 404
+    with profiling_app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_profiles_are_not_served_without_a_token(tmp_path):
+    """With profiling on but no token configured, stored profiles cannot be read."""
+    class SampledConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'sampled.db'}"
+        UPLOAD_FOLDER = str(tmp_path / "photos")
+        REQUEST_PROFILING_ENABLED = True
+        REQUEST_PROFILING_SAMPLE_RATE = 1.0
+        REQUEST_PROFILING_MIN_DURATION_MS = 0
+        REQUEST_PROFILING_DIR = str(tmp_path / "profiles")
+
+    sampled_app = create_app(SampledConfig)
+    with sampled_app.app_context():
+        db.create_all(bind_key=None)
+    client = sampled_app.test_client()
+
+    client.get("/api/users/")
+    name = os.listdir(tmp_path / "profiles")[0]
+    for headers in ({}, {"X-Profile-Token": ""}):
+        assert client.get("/internal/profiles", headers=headers).status_code == 403
+        assert client.get(f"/internal/profiles/{name}", headers=headers).status_code == 403
+    with sampled_app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_profiling_is_disabled_by_default(client):
+    """Without REQUEST_PROFILING_ENABLED no hook runs and the endpoints report it."""
+    response = client.get("/api/users/", headers={"X-Profile-Token": ""})
+    assert "X-Profile-Id" not in response.headers
+    assert client.get("/internal/profiles").get_json() == {"enabled": False}
+    assert client.get("/internal/profiles/1-GET-x-1ms-0123abcd.prof").status_code == 404
+
+
+def test_query_log_flags_slow_queries_and_n_plus_one(app, client, make_users):
+    """Slow statements are logged with their origin; strict mode fails N+1 requests."""
+    from flask import jsonify
+
+    ids = make_users(5)
+
+    def load_one_by_one():
+        # One SELECT per user: the pattern the budget exists to catch
+        return jsonify([db.session.get(User, user_id).email for user_id in ids])
+
+    app.add_url_rule("/test/n-plus-one", "n_plus_one", load_one_by_one)
+    with pytest.raises(QueryBudgetExceeded, match=r"5 x SELECT .* possible N\+1"):
+        client.get("/test/n-plus-one")
+    assert statement_shape("SELECT * FROM users WHERE id IN (?, ?, ?) AND email = 'x'") == (
+        "SELECT * FROM users WHERE id IN (?...) AND email = ?"
+    )
+
+    monitor = get_query_monitor()
+    monitor.slow_threshold = 1e-9
+    assert client.get(f"/api/users/{ids[0]}").status_code == 200
+    log = client.get("/internal/slow-queries").get_json()
+    assert log["budget_violations"] == 1 and log["slow_queries"] >= 1
+    slow = log["recent"][0]
+    assert slow["route"] == "GET users.get_user"
+    assert slow["statement"].startswith("SELECT") and "int" in slow["parameters"]
+    assert str(ids[0]) not in slow["parameters"]
+    assert any(frame.startswith("app/services/user_service.py") for frame in slow["stack"])
+
+
+def test_query_budget_grows_per_chunk_not_per_row(app, client, make_users):
+    """Chunked routes pass strict mode; an N+1 inside one round still fails."""
+    from flask import jsonify
+    from app.utils.query_log import extend_query_budget
+
+    ids = make_users(12, prefix="chunked")
+    kept = make_users(5, prefix="kept")
+
+    def one_round_one_by_one():
+        extend_query_budget(1)
+        return jsonify([db.session.get(User, user_id).email for user_id in kept])
+
+    app.add_url_rule("/test/one-round", "one_round", one_round_one_by_one)
+
+    app.config["USERS_BULK_DELETE_CHUNK_SIZE"] = 2
+    # Six chunks: well over the conftest limits of 20 statements and 3 repeats
+    response = client.post("/api/users/bulk-delete", json={"ids": ids})
+    assert response.status_code == 200 and response.get_json()["deleted"] == 12
+
+    with pytest.raises(QueryBudgetExceeded, match=r"5 x SELECT .* \(limit 4"):
+        client.get("/test/one-round")